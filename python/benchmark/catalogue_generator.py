@@ -0,0 +1,81 @@
+"""Generates synthetic video catalogues for the benchmarks.
+
+Titles and tags are drawn from Zipf distributed vocabularies so that a few
+words and tags are very common and most are rare, like in a real
+catalogue. The output uses the same format as src/videos.txt.
+
+Usage:
+    python3 benchmark/catalogue_generator.py <number_of_videos> <output_file>
+"""
+
+import itertools
+import random
+import sys
+
+_SYLLABLES = ("ka", "lo", "mi", "ne", "ru", "sa", "ti", "vo", "ze", "da",
+              "fi", "gu", "ha", "jo", "pe", "qui", "ro", "su", "to", "wa")
+
+
+def _vocabulary(size, rng):
+    """Returns size distinct made up words."""
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(_SYLLABLES)
+                          for _ in range(rng.randint(2, 4))))
+    # Shuffle so that the common words are not all alphabetically close.
+    words = sorted(words)
+    rng.shuffle(words)
+    return words
+
+
+def _zipf_cum_weights(size, exponent=1.1):
+    return list(itertools.accumulate(
+        1.0 / rank ** exponent for rank in range(1, size + 1)))
+
+
+def generate_rows(number_of_videos, seed=0, title_words=5000, tags=1000):
+    """Yields (title, video_id, tags, popularity) catalogue rows.
+
+    Args:
+        number_of_videos: How many rows to generate.
+        seed: Seed of the random number generator.
+        title_words: Size of the title vocabulary.
+        tags: Size of the tag vocabulary.
+    """
+    rng = random.Random(seed)
+    words = _vocabulary(title_words, rng)
+    word_weights = _zipf_cum_weights(len(words))
+    tag_names = ["#" + word for word in _vocabulary(tags, rng)]
+    tag_weights = _zipf_cum_weights(len(tag_names))
+    for index in range(number_of_videos):
+        title_length = rng.randint(2, 7)
+        title = " ".join(rng.choices(words, cum_weights=word_weights,
+                                     k=title_length)).capitalize()
+        tag_count = rng.choices((0, 1, 2, 3, 4, 5),
+                                weights=(5, 20, 30, 25, 15, 5))[0]
+        video_tags = dict.fromkeys(
+            rng.choices(tag_names, cum_weights=tag_weights, k=tag_count))
+        popularity = round(rng.paretovariate(1.2), 2)
+        yield title, f"video_{index:08d}", list(video_tags), popularity
+
+
+def write_catalogue(path, number_of_videos, seed=0):
+    """Writes a synthetic catalogue file.
+
+    Args:
+        path: The file to write.
+        number_of_videos: How many videos the catalogue holds.
+        seed: Seed of the random number generator.
+    """
+    with open(path, "w") as catalogue_file:
+        for title, video_id, video_tags, popularity in generate_rows(
+                number_of_videos, seed):
+            catalogue_file.write(
+                f"{title} | {video_id} | {' , '.join(video_tags)} | "
+                f"{popularity}\n")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit(__doc__)
+    write_catalogue(sys.argv[2], int(sys.argv[1]))
@@ -0,0 +1,34 @@
+import contextlib
+import os
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+from catalogue_generator import write_catalogue
+
+# Catalogue sizes to benchmark, e.g. YT_BENCH_SIZES=10000,1000000,10000000
+BENCH_SIZES = [int(size) for size in
+               os.environ.get("YT_BENCH_SIZES", "10000").split(",")]
+CATALOGUE_DIR = Path(__file__).parent / ".catalogues"
+
+
+@pytest.fixture(scope="session", params=BENCH_SIZES,
+                ids=lambda size: f"{size}_videos")
+def catalogue_path(request):
+    """Returns the path of a synthetic catalogue, generating it once."""
+    CATALOGUE_DIR.mkdir(exist_ok=True)
+    path = CATALOGUE_DIR / f"catalogue_{request.param}.txt"
+    if not path.exists():
+        write_catalogue(path.with_suffix(".tmp"), request.param)
+        path.with_suffix(".tmp").rename(path)
+    return path
+
+
+@pytest.fixture
+def quiet():
+    """Discards everything the player prints and answers 'no' to prompts."""
+    with open(os.devnull, "w") as devnull, \
+            contextlib.redirect_stdout(devnull), \
+            mock.patch("builtins.input", lambda *args: "No"):
+        yield
@@ -0,0 +1,98 @@
+import json
+import os
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+MEMORY_BASELINE = Path(__file__).parent / "memory_baseline.json"
+# How much the load memory may grow before the benchmark fails.
+MEMORY_TOLERANCE = 1.2
+
+
+@pytest.fixture(scope="module")
+def library(catalogue_path):
+    return VideoLibrary(catalogue_path)
+
+
+@pytest.fixture
+def player(library):
+    return VideoPlayer(library)
+
+
+def _common_words(library):
+    titles = [video.title for video in library.get_all_videos()[:1000]]
+    return titles[0].split()[0].lower()
+
+
+def _common_tag(library):
+    for video in library.get_all_videos():
+        if video.tags:
+            return video.tags[0]
+
+
+def test_load(benchmark, catalogue_path):
+    benchmark.pedantic(VideoLibrary, args=(catalogue_path,), rounds=3)
+
+
+def test_load_memory(catalogue_path):
+    tracemalloc.start()
+    library = VideoLibrary(catalogue_path)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    size = str(len(library.get_all_videos()))
+
+    baseline = {}
+    if MEMORY_BASELINE.exists():
+        baseline = json.loads(MEMORY_BASELINE.read_text())
+    if os.environ.get("YT_BENCH_UPDATE_BASELINE"):
+        baseline[size] = {"current": current, "peak": peak}
+        MEMORY_BASELINE.write_text(json.dumps(baseline, indent=2) + "\n")
+    elif size not in baseline:
+        pytest.skip(f"No memory baseline for {size} videos")
+    else:
+        assert current <= baseline[size]["current"] * MEMORY_TOLERANCE
+        assert peak <= baseline[size]["peak"] * MEMORY_TOLERANCE
+
+
+def test_show_all_videos(benchmark, player, quiet):
+    benchmark(player.show_all_videos)
+
+
+def test_search_videos(benchmark, player, library, quiet):
+    benchmark(player.search_videos, _common_words(library))
+
+
+def test_search_videos_tag(benchmark, player, library, quiet):
+    benchmark(player.search_videos_tag, _common_tag(library))
+
+
+def test_playlist_operations(benchmark, player, library, quiet):
+    video_ids = [video.video_id for video in library.get_all_videos()[:1000]]
+
+    def playlist_operations():
+        player.create_playlist("bench")
+        for video_id in video_ids:
+            player.add_to_playlist("bench", video_id)
+        player.show_playlist("bench")
+        for video_id in video_ids[::2]:
+            player.remove_from_playlist("bench", video_id)
+        player.clear_playlist("bench")
+        player.delete_playlist("bench")
+
+    benchmark(playlist_operations)
+
+
+def test_flagging(benchmark, player, library, quiet):
+    video_ids = [video.video_id for video in library.get_all_videos()[:1000]]
+
+    def flagging():
+        for video_id in video_ids:
+            player.flag_video(video_id, "benchmark")
+        for video_id in video_ids:
+            player.allow_video(video_id)
+
+    benchmark(flagging)
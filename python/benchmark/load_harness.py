@@ -0,0 +1,281 @@
+"""Replays recorded or synthetic command sessions against many players at
+once and reports throughput and latency percentiles per command.
+
+Every session gets its own VideoPlayer. Sessions are spread over a pool
+of worker processes, each loading the catalogue once, and the sessions of
+a worker are interleaved with asyncio, every command waiting for its
+recorded time divided by --speed, and its latency is measured from that
+time rather than from when it started. Sessions are recorded with
+`python3 -m src.run --record <file>`.
+
+Usage:
+    python3 benchmark/load_harness.py [--catalogue <file>]
+        [--session <file> ...] [--synthetic <commands>]
+        [--sessions <n>] [--workers <n>] [--speed <n>]
+        [--mix play=4,search=3,playlist=2,flag=1] [--rate <n>] [--seed <n>]
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import math
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.command_parser import CommandException, CommandParser  # noqa: E402
+from src.player_output import TextRenderer  # noqa: E402
+from src.session_log import read_session  # noqa: E402
+from src.video_library import VideoLibrary  # noqa: E402
+from src.video_player import VideoPlayer  # noqa: E402
+
+# Relative weights of the command families of synthetic sessions.
+DEFAULT_MIX = {"play": 4, "search": 3, "playlist": 2, "flag": 1}
+
+_library = None
+
+
+def _catalogue_words(library):
+    """Returns the video_ids, tags and title words synthetic commands are
+    made of."""
+    videos = library.get_all_videos()
+    video_ids = [video.video_id for video in videos]
+    tags = sorted(set(tag for video in videos[:10000] for tag in video.tags))
+    words = sorted(set(word for video in videos[:10000]
+                       for word in video.title.split()))
+    return video_ids, tags or ["#none"], words or ["none"]
+
+
+def synthetic_session(library, commands, mix=DEFAULT_MIX, rate=10.0,
+                      rng=random):
+    """Returns a session of random commands.
+
+    Args:
+        library: The VideoLibrary the commands refer to.
+        commands: How many commands the session has.
+        mix: Relative weights of the "play", "search", "playlist" and
+            "flag" command families.
+        rate: The mean number of commands per second; the time between
+            commands is exponentially distributed.
+        rng: The random number generator.
+
+    Returns:
+        A list of (seconds, command) pairs, like read_session.
+    """
+    video_ids, tags, words = _catalogue_words(library)
+    playlists = [f"playlist_{index}" for index in range(5)]
+    families = {
+        "play": lambda: rng.choice((
+            ["PLAY", rng.choice(video_ids)], ["STOP"], ["PAUSE"],
+            ["CONTINUE"], ["SHOW_PLAYING"], ["PLAY_RANDOM"])),
+        "search": lambda: rng.choice((
+            ["SEARCH_VIDEOS", rng.choice(words)],
+            ["SEARCH_VIDEOS_WITH_TAG", rng.choice(tags)],
+            ["SEARCH_RANKED", rng.choice(words), rng.choice(words)])),
+        "playlist": lambda: rng.choice((
+            ["CREATE_PLAYLIST", rng.choice(playlists)],
+            ["ADD_TO_PLAYLIST", rng.choice(playlists), rng.choice(video_ids)],
+            ["REMOVE_FROM_PLAYLIST", rng.choice(playlists),
+             rng.choice(video_ids)],
+            ["SHOW_PLAYLIST", rng.choice(playlists)],
+            ["CLEAR_PLAYLIST", rng.choice(playlists)])),
+        "flag": lambda: rng.choice((
+            ["FLAG_VIDEO", rng.choice(video_ids), "load_test"],
+            ["ALLOW_VIDEO", rng.choice(video_ids)])),
+    }
+    names = [name for name in mix if mix[name] > 0]
+    weights = [mix[name] for name in names]
+    session = []
+    offset = 0.0
+    for _ in range(commands):
+        offset += rng.expovariate(rate)
+        family = rng.choices(names, weights)[0]
+        session.append((offset, families[family]()))
+    return session
+
+
+async def _replay(parser, session, speed, latencies, errors):
+    start = time.perf_counter()
+    for offset, command in session:
+        if speed > 0:
+            # Latency is measured from when the command was due, so a
+            # command held up by slow earlier ones counts its wait too.
+            begin = start + offset / speed
+            delay = begin - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        else:
+            # Let the other sessions of this worker take turns.
+            await asyncio.sleep(0)
+            begin = time.perf_counter()
+        name = command[0].upper() if command else ""
+        try:
+            parser.execute_command(command)
+        except CommandException:
+            errors[name] = errors.get(name, 0) + 1
+        latencies.setdefault(name, []).append(time.perf_counter() - begin)
+
+
+def _load_library(catalogue):
+    global _library
+    _library = VideoLibrary(*([catalogue] if catalogue else []))
+
+
+def _run_sessions(jobs, speed):
+    """Replays sessions on one worker, each on a new player.
+
+    Args:
+        jobs: A list of ("file", path) or ("synthetic", commands, mix,
+            rate, seed) session descriptions.
+        speed: How many times faster than recorded to replay, 0 for as
+            fast as possible.
+
+    Returns:
+        A dict of command name to latencies, a dict of command name to
+        error counts, the number of commands replayed and the wall clock
+        times the replay started and ended at.
+    """
+    sessions = []
+    for job in jobs:
+        if job[0] == "file":
+            sessions.append(read_session(job[1]))
+        else:
+            commands, mix, rate, seed = job[1:]
+            sessions.append(synthetic_session(
+                _library, commands, mix, rate, random.Random(seed)))
+    latencies = {}
+    errors = {}
+    with open(os.devnull, "w") as devnull:
+        parsers = [CommandParser(
+            VideoPlayer(_library, output=TextRenderer(devnull)),
+            interactive=False) for _ in sessions]
+
+        async def replay_all():
+            await asyncio.gather(*[
+                _replay(parser, session, speed, latencies, errors)
+                for parser, session in zip(parsers, sessions)])
+
+        start = time.time()
+        asyncio.run(replay_all())
+        end = time.time()
+    return (latencies, errors, sum(len(session) for session in sessions),
+            start, end)
+
+
+def percentile(values, fraction):
+    """Returns the nearest-rank percentile of sorted values."""
+    return values[min(len(values) - 1,
+                      max(0, math.ceil(fraction * len(values)) - 1))]
+
+
+def run_load(jobs, catalogue=None, speed=1.0, workers=None):
+    """Replays sessions across a process pool.
+
+    Args:
+        jobs: Session descriptions, see _run_sessions.
+        catalogue: The catalogue file every player plays from, the
+            bundled videos.txt if not given.
+        speed: How many times faster than recorded to replay, 0 for as
+            fast as possible.
+        workers: The number of worker processes, one per CPU if not
+            given.
+
+    Returns:
+        A dict of command name to sorted latencies, a dict of command
+        name to error counts, the number of commands and the wall time.
+    """
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    shares = [jobs[index::workers] for index in range(workers)]
+    latencies = {}
+    errors = {}
+    commands = 0
+    starts, ends = [], []
+    with concurrent.futures.ProcessPoolExecutor(
+            workers, initializer=_load_library,
+            initargs=(catalogue,)) as executor:
+        for worker_latencies, worker_errors, worker_commands, start, end in \
+                executor.map(_run_sessions, shares, [speed] * len(shares)):
+            for name, values in worker_latencies.items():
+                latencies.setdefault(name, []).extend(values)
+            for name, count in worker_errors.items():
+                errors[name] = errors.get(name, 0) + count
+            commands += worker_commands
+            starts.append(start)
+            ends.append(end)
+    # Workers load the catalogue before they start replaying, so loading
+    # is not part of the elapsed time.
+    elapsed = max(ends) - min(starts)
+    for values in latencies.values():
+        values.sort()
+    return latencies, errors, commands, elapsed
+
+
+def format_report(latencies, errors, commands, elapsed):
+    """Returns the throughput and per-command latency table as text."""
+    lines = [f"{commands} commands in {elapsed:.2f} s "
+             f"({commands / elapsed if elapsed else 0:.0f} commands/s)",
+             f"{'command':<24}{'calls':>8}{'errors':>8}"
+             f"{'p50 ms':>10}{'p99 ms':>10}{'p999 ms':>10}"]
+    for name, values in sorted(latencies.items()):
+        lines.append(
+            f"{name:<24}{len(values):>8}{errors.get(name, 0):>8}"
+            + "".join(f"{percentile(values, fraction) * 1000:>10.3f}"
+                      for fraction in (0.5, 0.99, 0.999)))
+    return "\n".join(lines)
+
+
+def _parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown command family {name}")
+        mix[name] = float(weight)
+    return mix
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    arg_parser.add_argument(
+        "--catalogue", help="catalogue file to play from, videos.txt by "
+                            "default")
+    arg_parser.add_argument(
+        "--session", action="append", default=[],
+        help="session log to replay, may be given more than once")
+    arg_parser.add_argument(
+        "--synthetic", type=int, default=0,
+        help="length of the synthetic sessions to generate if no session "
+             "log is given")
+    arg_parser.add_argument(
+        "--sessions", type=int, default=8,
+        help="how many players replay the sessions at once; session logs "
+             "are cycled through")
+    arg_parser.add_argument("--workers", type=int,
+                            help="worker processes, one per CPU by default")
+    arg_parser.add_argument(
+        "--speed", type=float, default=1.0,
+        help="replay this many times faster than recorded, 0 for as fast "
+             "as possible")
+    arg_parser.add_argument("--mix", type=_parse_mix, default=DEFAULT_MIX,
+                            help="weights of the synthetic command families")
+    arg_parser.add_argument(
+        "--rate", type=float, default=10.0,
+        help="mean commands per second of every synthetic session")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    if args.session:
+        jobs = [("file", args.session[index % len(args.session)])
+                for index in range(args.sessions)]
+    elif args.synthetic > 0:
+        jobs = [("synthetic", args.synthetic, args.mix, args.rate,
+                 args.seed + index) for index in range(args.sessions)]
+    else:
+        sys.exit("Give --session or --synthetic")
+    print(format_report(*run_load(jobs, args.catalogue, args.speed,
+                                  args.workers)))
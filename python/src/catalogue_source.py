@@ -0,0 +1,156 @@
+"""Catalogue source classes used to load a video library."""
+
+from .video import Video
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import csv
+import gzip
+import io
+
+
+# Helper Wrapper around CSV reader to strip whitespace from around
+# each item.
+def _csv_reader_with_strip(reader):
+    yield from ((item.strip() for item in line) for line in reader)
+
+
+def parse_videos(lines):
+    """Parses catalogue lines in the videos.txt format.
+
+    Every line holds a title, a video_id, comma separated tags and an
+    optional popularity weight, separated by '|'.
+
+    Args:
+        lines: An iterable of text lines.
+
+    Returns:
+        A list of Video objects.
+    """
+    videos = []
+    reader = _csv_reader_with_strip(csv.reader(lines, delimiter="|"))
+    for video_info in reader:
+        # An optional fourth column holds the popularity weight.
+        title, url, tags, *extra = video_info
+        videos.append(Video(
+            title,
+            url,
+            [tag.strip() for tag in tags.split(",")] if tags else [],
+            float(extra[0]) if extra and extra[0] else 1.0,
+        ))
+    return videos
+
+
+def _open_zstd(path):
+    try:
+        from compression import zstd
+        return zstd.open(path, "rt")
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(
+            f"Reading {path} needs the zstandard package, install it with "
+            "'python3 -m pip install zstandard'") from None
+    return io.TextIOWrapper(
+        zstandard.ZstdDecompressor().stream_reader(open(path, "rb"),
+                                                  closefd=True))
+
+
+class CatalogueSource:
+    """A class used to represent somewhere videos can be loaded from."""
+
+    def expand(self):
+        """Returns the sources that can be loaded independently."""
+        return [self]
+
+    def load(self):
+        """Returns the list of Video objects held by the source."""
+        raise NotImplementedError
+
+
+class FileSource(CatalogueSource):
+    """A catalogue file, optionally gzip (.gz) or zstd (.zst) compressed."""
+
+    def __init__(self, path):
+        self._path = Path(path)
+
+    def load(self):
+        if self._path.suffix == ".gz":
+            video_file = gzip.open(self._path, "rt")
+        elif self._path.suffix == ".zst":
+            video_file = _open_zstd(self._path)
+        else:
+            video_file = open(self._path)
+        with video_file:
+            return parse_videos(video_file)
+
+
+class DirectorySource(CatalogueSource):
+    """A directory of catalogue shard files, loaded in file name order."""
+
+    def __init__(self, path):
+        self._path = Path(path)
+
+    def expand(self):
+        return [FileSource(path) for path in sorted(self._path.iterdir())
+                if path.is_file() and not path.name.startswith(".")]
+
+    def load(self):
+        videos = []
+        for source in self.expand():
+            videos.extend(source.load())
+        return videos
+
+
+class IterableSource(CatalogueSource):
+    """An in-memory iterable of Video objects or catalogue rows.
+
+    Rows are (title, video_id, tags) or (title, video_id, tags, popularity)
+    tuples.
+    """
+
+    def __init__(self, videos):
+        self._videos = videos
+
+    def load(self):
+        return [video if isinstance(video, Video) else Video(*video)
+                for video in self._videos]
+
+
+def as_source(source):
+    """Turns a path or an iterable into a CatalogueSource.
+
+    Args:
+        source: A CatalogueSource, a path to a file or directory, or an
+            iterable of videos.
+    """
+    if isinstance(source, CatalogueSource):
+        return source
+    if isinstance(source, (str, Path)):
+        if Path(source).is_dir():
+            return DirectorySource(source)
+        return FileSource(source)
+    return IterableSource(source)
+
+
+def load_sources(sources, max_workers=None):
+    """Loads several catalogue sources concurrently.
+
+    Directories are split into their shard files first so that every file
+    is loaded by its own worker thread.
+
+    Args:
+        sources: The sources to load, see as_source.
+        max_workers: The maximum number of loader threads.
+
+    Returns:
+        A list of Video objects in source order.
+    """
+    expanded = [part for source in sources
+                for part in as_source(source).expand()]
+    if len(expanded) <= 1:
+        return [video for source in expanded for video in source.load()]
+    with ThreadPoolExecutor(max_workers) as executor:
+        loaded = executor.map(lambda source: source.load(), expanded)
+        return [video for videos in loaded for video in videos]
@@ -1,24 +1,93 @@
 """A command parser class."""
 
+import contextlib
+import itertools
+import sys
 import textwrap
+import time
 from typing import Sequence
 
+from .playback_queue import REPEAT_MODES
+from .player_output import Result
+
 
 class CommandException(Exception):
     """A class used to represent a wrong command exception."""
     pass
 
 
+def _moderation_entries(lines):
+    """Yields a (video_id, flag_reason) pair for every line holding a
+    video_id and an optional reason, skipping blank lines and # comments."""
+    for line in lines:
+        fields = line.split(None, 1)
+        if not fields or fields[0].startswith("#"):
+            continue
+        yield fields[0], fields[1].strip() if len(fields) == 2 else ""
+
+
 class CommandParser:
     """A class used to parse and execute a user Command."""
 
-    def __init__(self, video_player):
+    def __init__(self, video_player, stats=None, interactive=True,
+                 profiler=None, recorder=None):
+        """The CommandParser class is initialized.
+
+        Args:
+            video_player: The VideoPlayer the commands are executed on.
+            stats: Optional CommandStats collecting per-command latency.
+            interactive: Whether searches ask the user which result to
+                play. Non-interactive searches only show their results.
+            profiler: Optional CommandProfiler sampling the stack of every
+                command.
+            recorder: Optional SessionRecorder every command is written to
+                before it is executed.
+        """
         self._player = video_player
+        self._stats = stats
+        self._interactive = interactive
+        self._profiler = profiler
+        self._recorder = recorder
+        self._command_names = frozenset(self.get_command_names())
 
     def execute_command(self, command: Sequence[str]):
         """Executes the user command. Expects the command to be upper case.
            Raises CommandException if a command cannot be parsed.
         """
+        if self._stats is None and self._profiler is None and \
+                self._recorder is None:
+            result = self._execute_command(command)
+        else:
+            if self._recorder is not None and command:
+                self._recorder.record(command)
+            # Unknown commands share one name, so mistyped input cannot
+            # grow the metrics without bound.
+            name = command[0].upper() if command else ""
+            if name not in self._command_names:
+                name = "INVALID"
+            if self._profiler is not None:
+                self._profiler.begin(name)
+            result = None
+            start = time.perf_counter()
+            try:
+                result = self._execute_command(command)
+            finally:
+                if self._profiler is not None:
+                    self._profiler.end()
+                # Searches return their results so the result size can be
+                # kept.
+                if self._stats is not None:
+                    self._stats.record(
+                        name, time.perf_counter() - start,
+                        len(result) if result is not None else None)
+        # Searches prompt only once they are timed, so the time the user
+        # takes to pick a result is not part of their latency.
+        if self._interactive and result:
+            self._player.choose_search_result(result)
+        return result
+
+    def _execute_command(self, command: Sequence[str]):
+        """Executes the user command without any instrumentation."""
         if not command:
             raise CommandException(
                 "Please enter a valid command, "
@@ -37,7 +106,18 @@ class CommandParser:
             self._player.play_video(command[1])
 
         elif command[0].upper() == "PLAY_RANDOM":
-            self._player.play_random_video()
+            if len(command) > 2:
+                raise CommandException(
+                    "Please enter PLAY_RANDOM command followed by an "
+                    "optional video tag.")
+            self._player.play_random_video(*command[1:])
+
+        elif command[0].upper() == "PLAY_RANDOM_POPULAR":
+            if len(command) > 2:
+                raise CommandException(
+                    "Please enter PLAY_RANDOM_POPULAR command followed by an "
+                    "optional video tag.")
+            self._player.play_random_video(*command[1:], weighted=True)
 
         elif command[0].upper() == "STOP":
             self._player.stop_video()
@@ -51,6 +131,25 @@ class CommandParser:
         elif command[0].upper() == "SHOW_PLAYING":
             self._player.show_playing()
 
+        elif command[0].upper() == "SHOW_POSITION":
+            self._player.show_position()
+
+        elif command[0].upper() == "ADVANCE":
+            if len(command) != 2:
+                raise CommandException(
+                    "Please enter ADVANCE command followed by a number of "
+                    "seconds.")
+            self._player.advance_clock(self._get_seconds(command, 1))
+
+        elif command[0].upper() == "HISTORY":
+            self._player.show_history(*self._get_count(command))
+
+        elif command[0].upper() == "TOP_PLAYED":
+            self._player.show_top_played(*self._get_count(command))
+
+        elif command[0].upper() == "TAG_PLAYS":
+            self._player.show_tag_plays()
+
         elif command[0].upper() == "CREATE_PLAYLIST":
             if len(command) != 2:
                 raise CommandException(
@@ -86,6 +185,17 @@ class CommandParser:
                     "playlist name.")
             self._player.delete_playlist(command[1])
 
+        elif command[0].upper() in ("PLAYLIST_UNION", "PLAYLIST_INTERSECT",
+                                    "PLAYLIST_DIFF"):
+            if len(command) < 5 or command[-2] != "->":
+                raise CommandException(
+                    f"Please enter {command[0].upper()} command followed by "
+                    "two or more playlist names, -> and the name of the new "
+                    "playlist.")
+            self._player.combine_playlists(
+                command[0].upper()[len("PLAYLIST_"):].lower(),
+                command[1:-2], command[-1])
+
         elif command[0].upper() == "SHOW_PLAYLIST":
             if len(command) != 2:
                 raise CommandException(
@@ -93,6 +203,34 @@ class CommandParser:
                     "playlist name.")
             self._player.show_playlist(command[1])
 
+        elif command[0].upper() == "PLAY_PLAYLIST":
+            if len(command) != 2:
+                raise CommandException(
+                    "Please enter PLAY_PLAYLIST command followed by a "
+                    "playlist name.")
+            self._player.play_playlist(command[1])
+
+        elif command[0].upper() == "NEXT":
+            self._player.play_next()
+
+        elif command[0].upper() == "PREVIOUS":
+            self._player.play_previous()
+
+        elif command[0].upper() == "SHUFFLE":
+            if len(command) != 2 or command[1].upper() not in ("ON", "OFF"):
+                raise CommandException(
+                    "Please enter SHUFFLE command followed by ON or OFF.")
+            self._player.set_shuffle(command[1].upper() == "ON")
+
+        elif command[0].upper() == "REPEAT":
+            if len(command) != 2 or command[1].lower() not in REPEAT_MODES:
+                raise CommandException(
+                    "Please enter REPEAT command followed by OFF, ONE or ALL.")
+            self._player.set_repeat(command[1].lower())
+
+        elif command[0].upper() == "SHOW_QUEUE":
+            self._player.show_queue()
+
         elif command[0].upper() == "SHOW_ALL_PLAYLISTS":
             self._player.show_all_playlists()
 
@@ -101,14 +239,22 @@ class CommandParser:
                 raise CommandException(
                     "Please enter SEARCH_VIDEOS command followed by a "
                     "search term.")
-            self._player.search_videos(command[1])
+            return self._player.search_videos(command[1], prompt=False)
 
         elif command[0].upper() == "SEARCH_VIDEOS_WITH_TAG":
             if len(command) != 2:
                 raise CommandException(
                     "Please enter SEARCH_VIDEOS_WITH_TAG command followed by a "
                     "video tag.")
-            self._player.search_videos_tag(command[1])
+            return self._player.search_videos_tag(command[1], prompt=False)
+
+        elif command[0].upper() == "SEARCH_RANKED":
+            if len(command) < 2:
+                raise CommandException(
+                    "Please enter SEARCH_RANKED command followed by one or "
+                    "more search words.")
+            return self._player.search_ranked(
+                " ".join(command[1:]), prompt=False)
 
         elif command[0].upper() == "FLAG_VIDEO":
             if len(command) == 3:
@@ -120,6 +266,16 @@ class CommandParser:
                     "Please enter FLAG_VIDEO command followed by a "
                     "video_id and an optional flag reason.")
 
+        elif command[0].upper() == "FLAG_VIDEO_FOR":
+            if len(command) not in (3, 4):
+                raise CommandException(
+                    "Please enter FLAG_VIDEO_FOR command followed by a "
+                    "video_id, a number of seconds and an optional flag "
+                    "reason.")
+            self._player.flag_video(
+                command[1], command[3] if len(command) == 4 else "",
+                ttl=self._get_seconds(command, 2))
+
         elif command[0].upper() == "ALLOW_VIDEO":
             if len(command) != 2:
                 raise CommandException(
@@ -127,37 +283,174 @@ class CommandParser:
                     "video_id.")
             self._player.allow_video(command[1])
 
+        elif command[0].upper() in ("FLAG_MANY", "ALLOW_MANY"):
+            max_arguments = 3 if command[0].upper() == "FLAG_MANY" else 2
+            if not 2 <= len(command) <= max_arguments:
+                raise CommandException(
+                    f"Please enter {command[0].upper()} command followed by "
+                    "a file of video_ids, or - to read them until an empty "
+                    "line.")
+            ttl = self._get_seconds(command, 2) if len(command) == 3 else None
+            with self._open_lines(command[1]) as lines:
+                entries = _moderation_entries(lines)
+                if command[0].upper() == "FLAG_MANY":
+                    self._player.flag_videos(entries, ttl)
+                else:
+                    self._player.allow_videos(
+                        video_id for video_id, flag_reason in entries)
+
+        elif command[0].upper() == "UNDO":
+            if len(command) != 1:
+                raise CommandException(
+                    "Please enter UNDO command without arguments.")
+            self._player.undo()
+
+        elif command[0].upper() == "REDO":
+            if len(command) != 1:
+                raise CommandException(
+                    "Please enter REDO command without arguments.")
+            self._player.redo()
+
+        elif command[0].upper() == "RELATED":
+            if len(command) not in (2, 3) or (
+                    len(command) == 3 and not (command[2].isdigit()
+                                               and int(command[2]) > 0)):
+                raise CommandException(
+                    "Please enter RELATED command followed by a video_id and "
+                    "an optional positive number.")
+            self._player.show_related(
+                command[1], *[int(count) for count in command[2:]])
+
+        elif command[0].upper() == "SUGGEST":
+            if len(command) != 2:
+                raise CommandException(
+                    "Please enter SUGGEST command followed by a prefix.")
+            self._player.show_suggestions(command[1])
+
+        elif command[0].upper() == "MEMORY":
+            if len(command) == 1:
+                self._player.show_memory()
+            elif len(command) == 2 and command[1].upper() == "DIFF":
+                self._player.show_memory_diff()
+            elif len(command) == 2 and command[1].upper() == "STOP":
+                self._player.stop_memory_trace()
+            else:
+                raise CommandException(
+                    "Please enter MEMORY command, optionally followed by "
+                    "DIFF or STOP.")
+
+        elif command[0].upper() == "CACHE_STATS":
+            self._player.show_cache_stats()
+
+        elif command[0].upper() == "STATS":
+            if self._stats is None:
+                self._player.output.render(Result("stats.disabled"))
+            else:
+                self._stats.show_stats(self._player.output)
+
         elif command[0].upper() == "HELP":
             self._get_help()
         else:
-            print(
-                "Please enter a valid command, type HELP for a list of "
-                "available commands.")
+            self._player.output.render(Result("invalid_command"))
+
+    def _open_lines(self, path):
+        """Opens a file to read lines from, or stdin up to the first empty
+        line if path is -."""
+        if path == "-":
+            # Without a prompt the input is not ours to read; a pipeline
+            # reads its requests from it on another thread.
+            if not self._interactive:
+                raise CommandException(
+                    "Cannot read video_ids from the input here, please "
+                    "give a file instead.")
+            return contextlib.nullcontext(
+                itertools.takewhile(str.strip, sys.stdin))
+        try:
+            return open(path, encoding="utf-8")
+        except OSError as e:
+            raise CommandException(f"Cannot read {path}: {e.strerror}")
+
+    def _get_seconds(self, command, index):
+        """Returns the argument at index as a non-negative number of
+        seconds."""
+        try:
+            seconds = float(command[index])
+        except ValueError:
+            seconds = -1
+        if not 0 <= seconds < float("inf"):
+            raise CommandException(
+                f"Please enter a number of seconds for {command[0].upper()}, "
+                f"not {command[index]}.")
+        return seconds
+
+    def _get_count(self, command):
+        """Returns the optional positive count argument of a command."""
+        if len(command) == 1:
+            return []
+        if len(command) == 2 and command[1].isdigit() and int(command[1]) > 0:
+            return [int(command[1])]
+        raise CommandException(
+            f"Please enter {command[0].upper()} command followed by an "
+            "optional positive number.")
+
+    def get_command_names(self):
+        """Returns the names of all available commands."""
+        return [line.split()[0] for line in self._help_text().splitlines()
+                if line.startswith("    ")]
 
     def _get_help(self):
         """Displays all available commands to the user."""
-        help_text = textwrap.dedent("""
+        self._player.output.render(Result("help", text=self._help_text()))
+
+    def _help_text(self):
+        """Returns the help text listing all available commands."""
+        return textwrap.dedent("""
         Available commands:
             NUMBER_OF_VIDEOS - Shows how many videos are in the library.
             SHOW_ALL_VIDEOS - Lists all videos from the library.
             PLAY <video_id> - Plays specified video.
-            PLAY_RANDOM - Plays a random video from the library.
+            PLAY_RANDOM [tag_name] - Plays a random video from the library, optionally only videos with the given tag.
+            PLAY_RANDOM_POPULAR [tag_name] - Plays a random video, favouring more popular videos.
             STOP - Stop the current video.
             PAUSE - Pause the current video.
             CONTINUE - Resume the current paused video.
             SHOW_PLAYING - Displays the title, url and paused status of the video that is currently playing (or paused).
+            SHOW_POSITION - Displays how far into the current video playback is.
+            ADVANCE <seconds> - Lets simulated playback time pass, moving on to the next video of a playlist when one ends.
+            HISTORY [count] - Displays the most recent playback events.
+            TOP_PLAYED [count] - Displays the most played videos.
+            TAG_PLAYS - Displays how many times videos with each tag were played.
             CREATE_PLAYLIST <playlist_name> - Creates a new (empty) playlist with the provided name.
             ADD_TO_PLAYLIST <playlist_name> <video_id> - Adds the requested video to the playlist.
             REMOVE_FROM_PLAYLIST <playlist_name> <video_id> - Removes the specified video from the specified playlist
             CLEAR_PLAYLIST <playlist_name> - Removes all the videos from the playlist.
             DELETE_PLAYLIST <playlist_name> - Deletes the playlist.
+            PLAYLIST_UNION <playlist_name>... -> <new_playlist_name> - Creates a playlist with the videos of any of the playlists.
+            PLAYLIST_INTERSECT <playlist_name>... -> <new_playlist_name> - Creates a playlist with the videos found in all of the playlists.
+            PLAYLIST_DIFF <playlist_name>... -> <new_playlist_name> - Creates a playlist with the videos of the first playlist that are in none of the others.
             SHOW_PLAYLIST <playlist_name> - List all the videos in this playlist.
             SHOW_ALL_PLAYLISTS - Display all the available playlists.
+            PLAY_PLAYLIST <playlist_name> - Plays the videos of the playlist one after the other.
+            NEXT - Plays the next video of the playing playlist.
+            PREVIOUS - Plays the video of the playing playlist that was played before.
+            SHUFFLE <ON|OFF> - Plays playlists in a random order, or in order.
+            REPEAT <OFF|ONE|ALL> - Repeats the current video or the whole playlist.
+            SHOW_QUEUE - Displays the next videos of the playing playlist.
             SEARCH_VIDEOS <search_term> - Display all the videos whose titles contain the search_term.
             SEARCH_VIDEOS_WITH_TAG <tag_name> -Display all videos whose tags contains the provided tag.
+            SEARCH_RANKED <words> - Display the videos whose titles and tags best match the words, best first.
             FLAG_VIDEO <video_id> <flag_reason> - Mark a video as flagged.
             ALLOW_VIDEO <video_id> - Removes a flag from a video.
+            FLAG_VIDEO_FOR <video_id> <seconds> <flag_reason> - Mark a video as flagged until the given number of seconds has passed on the playback clock.
+            FLAG_MANY <file> [seconds] - Flags every video listed in the file, one video_id and optional flag reason per line, optionally only for a number of seconds. Use - to read from the input.
+            ALLOW_MANY <file> - Removes the flags from every video listed in the file, one video_id per line.
+            UNDO - Reverses the most recent playlist or flag change.
+            REDO - Makes the most recently undone change again.
+            RELATED <video_id> [count] - Displays the videos sharing the most tags with a video, rare tags counting the most.
+            SUGGEST <prefix> - Suggests video titles, tags and playlist names starting with the prefix.
+            MEMORY [DIFF|STOP] - Displays the approximate memory used by the library, caches and indexes; DIFF shows the allocations that changed since the last MEMORY DIFF, STOP stops tracing them.
+            CACHE_STATS - Displays the size and hit rate of the search and listing caches.
+            STATS - Displays latency and call statistics for every command.
             HELP - Displays help.
             EXIT - Terminates the program execution.
         """)
-        print(help_text)
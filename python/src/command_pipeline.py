@@ -0,0 +1,185 @@
+"""A pipelined command executor.
+
+Clients send one request per line, a request id followed by a command:
+
+    7 SEARCH_VIDEOS cat
+    8 NUMBER_OF_VIDEOS
+    9 PLAY_RESULT 7 1
+
+without waiting for the replies to earlier requests. Every request is
+answered by one line of JSON holding its id and the results of its
+command, in the order the requests complete:
+
+    {"id":"8","results":[{"result":"number_of_videos","count":5}]}
+
+Read-only commands run concurrently. A command that changes state waits
+for every earlier request and is waited for by every later one, so each
+command sees the effects of the requests sent before it. Searches never
+prompt; PLAY_RESULT <search_request_id> <number> plays one of the results
+of an earlier search instead.
+"""
+
+import concurrent.futures
+import io
+import json
+import logging
+import sys
+import threading
+
+from .command_parser import CommandException
+from .command_parser import CommandParser
+from .lru_cache import LRUCache
+from .player_output import ContextRenderer, JsonRenderer, Result
+from .video_player import VideoPlayer
+
+# Commands that only read state and may run at the same time.
+READ_ONLY_COMMANDS = frozenset((
+    "NUMBER_OF_VIDEOS", "SHOW_ALL_VIDEOS", "SHOW_PLAYING", "HISTORY",
+    "TOP_PLAYED", "TAG_PLAYS", "SHOW_PLAYLIST", "SHOW_ALL_PLAYLISTS",
+    "SEARCH_VIDEOS", "SEARCH_VIDEOS_WITH_TAG", "SEARCH_RANKED", "SUGGEST",
+    "RELATED", "CACHE_STATS", "STATS", "HELP"))
+
+SEARCH_COMMANDS = frozenset((
+    "SEARCH_VIDEOS", "SEARCH_VIDEOS_WITH_TAG", "SEARCH_RANKED"))
+
+_logger = logging.getLogger(__name__)
+
+
+class CommandPipeline:
+    """A class used to execute tagged commands concurrently and write
+    their replies as they complete."""
+
+    def __init__(self, video_library=None, stats=None, stream=None,
+                 max_workers=None, saved_searches=1024, profiler=None,
+                 recorder=None):
+        """The CommandPipeline class is initialized.
+
+        Args:
+            video_library: The library to play from, the bundled videos if
+                not given.
+            stats: Optional CommandStats collecting per-command latency.
+            stream: The file replies are written to, sys.stdout if not
+                given.
+            max_workers: How many commands may run at once, chosen by
+                concurrent.futures if not given.
+            saved_searches: How many search results are kept for
+                PLAY_RESULT.
+            profiler: Optional CommandProfiler sampling the stack of every
+                command.
+            recorder: Optional SessionRecorder the executed commands are
+                written to.
+        """
+        self._output = ContextRenderer()
+        self._player = VideoPlayer(video_library, thread_safe=True,
+                                   output=self._output)
+        self._parser = CommandParser(
+            self._player, stats, interactive=False, profiler=profiler,
+            recorder=recorder)
+        self._stream = stream
+        self._write_lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers)
+        self._searches = LRUCache(saved_searches, thread_safe=True)
+        # Reads submitted since the last write, and the last write.
+        self._reads = []
+        self._last_write = None
+
+    @property
+    def player(self):
+        """Returns the VideoPlayer the commands are executed on."""
+        return self._player
+
+    def submit(self, request_id, command):
+        """Schedules a command and returns immediately.
+
+        Args:
+            request_id: The id the reply is tagged with.
+            command: The command and its arguments.
+
+        Returns:
+            A Future that is done once the reply is written.
+        """
+        name = command[0].upper() if command else ""
+        waits = [self._last_write] if self._last_write is not None else []
+        if name in READ_ONLY_COMMANDS:
+            future = self._executor.submit(
+                self._run, request_id, command, waits)
+            # Finished reads need not be waited for, so a long run of
+            # reads does not keep every one of them.
+            self._reads = [read for read in self._reads if not read.done()]
+            self._reads.append(future)
+        else:
+            # The executor starts tasks in the order they were submitted,
+            # so every task waited for is already running or done.
+            future = self._executor.submit(
+                self._run, request_id, command, waits + self._reads)
+            self._reads = []
+            self._last_write = future
+        return future
+
+    def run(self, lines):
+        """Executes requests until the lines run out or one is EXIT, then
+        waits for every reply to be written.
+
+        Args:
+            lines: An iterable of request lines.
+        """
+        for line in lines:
+            request = line.split()
+            if not request:
+                continue
+            if request[0].upper() == "EXIT":
+                break
+            self.submit(request[0], request[1:])
+        self.close()
+
+    def close(self):
+        """Waits for every submitted command to finish."""
+        self._executor.shutdown(wait=True)
+
+    def _run(self, request_id, command, waits):
+        concurrent.futures.wait(waits)
+        buffer = io.StringIO()
+        output = JsonRenderer(buffer)
+        with self._output.use(output):
+            try:
+                if command and command[0].upper() == "PLAY_RESULT":
+                    self._play_result(command)
+                else:
+                    result = self._parser.execute_command(command)
+                    if command[0].upper() in SEARCH_COMMANDS:
+                        self._searches.put(request_id, tuple(
+                            video.video_id for video in result))
+            except CommandException as e:
+                output.render(Result("error", message=str(e)))
+            except Exception as e:
+                # A failing command must still be answered, or the client
+                # waits for its reply forever.
+                _logger.exception("Request %s %s failed", request_id,
+                                  " ".join(command))
+                output.render(Result(
+                    "error", message=f"Internal error: {type(e).__name__}"))
+        results = buffer.getvalue().splitlines()
+        reply = (f'{{"id":{json.dumps(request_id)},'
+                 f'"results":[{",".join(results)}]}}\n')
+        with self._write_lock:
+            stream = self._stream or sys.stdout
+            stream.write(reply)
+            stream.flush()
+
+    def _play_result(self, command):
+        """Plays the chosen result of an earlier search."""
+        if len(command) != 3 or not command[2].isdigit():
+            raise CommandException(
+                "Please enter PLAY_RESULT command followed by the request "
+                "id of a search and the number of the video.")
+        video_ids = self._searches.get(command[1])
+        if video_ids is None:
+            raise CommandException(
+                f"Cannot play result: No search results for request "
+                f"{command[1]}")
+        number = int(command[2])
+        if number < 1 or number > len(video_ids):
+            raise CommandException(
+                f"Cannot play result: Search {command[1]} has no result "
+                f"number {number}")
+        self._player.play_video(video_ids[number - 1])
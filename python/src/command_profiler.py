@@ -0,0 +1,166 @@
+"""A sampling command profiler class."""
+
+import collections
+import json
+import os
+import sys
+import threading
+import time
+
+# How often the stacks of running commands are sampled, in seconds.
+DEFAULT_INTERVAL = 0.001
+
+
+def _frame_name(code):
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class CommandProfiler:
+    """A class used to find where commands spend their time by sampling
+    the stacks of the threads running them.
+
+    A background thread wakes every interval, reads the current frame of
+    every thread that is running a command from sys._current_frames() and
+    counts the stack between the command's entry point and that frame,
+    per command type. Commands themselves only register and unregister
+    their thread, so the cost on them is two dict updates, and the
+    sampler sleeps while no command runs.
+
+    The sampler can only run when a command thread gives up the GIL, so
+    the interpreter's switch interval is lowered to the sampling interval
+    while the profiler runs; otherwise samples would cluster on I/O.
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL):
+        """The CommandProfiler class is initialized and its sampling
+        thread started.
+
+        Args:
+            interval: Seconds between two samples.
+        """
+        self._interval = interval
+        # thread id to (command name, the frame the command started in).
+        self._running = {}
+        self._lock = threading.Lock()
+        self._busy = threading.Event()
+        self._stopped = False
+        # command name to a Counter of stacks, outermost frame first.
+        self._stacks = collections.defaultdict(collections.Counter)
+        self._samples = 0
+        self._switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(interval, self._switch_interval))
+        self._thread = threading.Thread(
+            target=self._sample_loop, name="command-profiler", daemon=True)
+        self._thread.start()
+
+    @property
+    def samples(self):
+        """Returns the number of stacks sampled so far."""
+        return self._samples
+
+    def begin(self, command, depth=1):
+        """Marks the calling thread as running a command, so its stack is
+        sampled until end() is called.
+
+        Args:
+            command: The upper case command name samples are kept under.
+            depth: How many frames above this call the command starts;
+                frames further out are left out of the samples.
+        """
+        frame = sys._getframe(depth)
+        with self._lock:
+            self._running[threading.get_ident()] = (command, frame)
+            self._busy.set()
+
+    def end(self):
+        """Marks the calling thread as no longer running a command."""
+        with self._lock:
+            self._running.pop(threading.get_ident(), None)
+            if not self._running and not self._stopped:
+                self._busy.clear()
+
+    def close(self):
+        """Stops the sampling thread."""
+        self._stopped = True
+        self._busy.set()
+        self._thread.join()
+        sys.setswitchinterval(self._switch_interval)
+
+    def _sample_loop(self):
+        while True:
+            self._busy.wait()
+            if self._stopped:
+                return
+            self.sample()
+            time.sleep(self._interval)
+
+    def sample(self):
+        """Samples the stack of every thread running a command once."""
+        with self._lock:
+            running = list(self._running.items())
+        frames = sys._current_frames()
+        for thread_id, (command, root) in running:
+            frame = frames.get(thread_id)
+            stack = []
+            while frame is not None and frame is not root:
+                stack.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            # The command finished while the frames were being read.
+            if frame is None:
+                continue
+            stack.append(_frame_name(root.f_code))
+            with self._lock:
+                self._stacks[command][tuple(reversed(stack))] += 1
+                self._samples += 1
+
+    def profiles(self):
+        """Returns a dict of command name to a dict of stack, as a tuple
+        of frame names outermost first, to the number of samples."""
+        with self._lock:
+            return {command: dict(stacks)
+                    for command, stacks in self._stacks.items()}
+
+    def write_collapsed(self, stream):
+        """Writes the samples in the collapsed stack format of
+        flamegraph.pl, one line per stack with the command name as its
+        outermost frame.
+
+        Args:
+            stream: The text file to write to.
+        """
+        for command, stacks in sorted(self.profiles().items()):
+            for stack, count in sorted(stacks.items()):
+                stream.write(f"{';'.join((command,) + stack)} {count}\n")
+
+    def write_speedscope(self, stream):
+        """Writes the samples as a speedscope file, with one profile per
+        command type.
+
+        Args:
+            stream: The text file to write to.
+        """
+        frames = {}
+        profiles = []
+        for command, stacks in sorted(self.profiles().items()):
+            samples = [[frames.setdefault(name, len(frames))
+                        for name in stack] for stack in stacks]
+            weights = [count * self._interval for count in stacks.values()]
+            profiles.append({
+                "type": "sampled", "name": command, "unit": "seconds",
+                "startValue": 0, "endValue": sum(weights),
+                "samples": samples, "weights": weights})
+        json.dump({
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": [{"name": name} for name in frames]},
+            "profiles": profiles,
+            "name": "Command profile",
+        }, stream)
+
+    def write(self, path):
+        """Writes the samples to a file, as speedscope JSON if the path
+        ends in .json and as collapsed stacks otherwise."""
+        with open(path, "w") as stream:
+            if path.endswith(".json"):
+                self.write_speedscope(stream)
+            else:
+                self.write_collapsed(stream)
@@ -0,0 +1,174 @@
+"""A command statistics class."""
+
+import bisect
+import contextlib
+import math
+import os
+import threading
+
+from .player_output import Result, TextRenderer
+
+# Upper bounds, in seconds, of the latency histogram buckets.
+LATENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+                   0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, math.inf)
+
+
+def _label(value):
+    """Returns a value escaped for a Prometheus label."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace(
+        "\n", "\\n")
+
+
+class CommandMetrics:
+    """A class used to hold the metrics of a single command type."""
+
+    def __init__(self):
+        self.calls = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.searches = 0
+        self.total_results = 0
+
+    def record(self, seconds, result_size=None):
+        """Adds one call to the metrics."""
+        self.calls += 1
+        self.total_seconds += seconds
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        if result_size is not None:
+            self.searches += 1
+            self.total_results += result_size
+
+    def quantile(self, fraction):
+        """Returns the upper bound of the bucket holding the quantile."""
+        rank = fraction * self.calls
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.buckets):
+            seen += count
+            if seen >= rank and count:
+                return min(bound, self.max_seconds)
+        return self.max_seconds
+
+
+class CommandStats:
+    """A class used to collect latency histograms and call counts per
+    command type."""
+
+    def __init__(self, metrics_path=None):
+        """The CommandStats class is initialized.
+
+        Args:
+            metrics_path: Optional file the metrics are written to in the
+                Prometheus text format whenever they are reported.
+        """
+        self._metrics = {}
+        self._metrics_path = metrics_path
+        # Commands may be recorded from several threads by a pipeline.
+        self._lock = threading.Lock()
+
+    def record(self, command, seconds, result_size=None):
+        """Records a single executed command.
+
+        Args:
+            command: The upper case command name.
+            seconds: How long the command took.
+            result_size: The number of results, for commands that search.
+        """
+        with self._lock:
+            metrics = self._metrics.get(command)
+            if metrics is None:
+                metrics = self._metrics[command] = CommandMetrics()
+            metrics.record(seconds, result_size)
+
+    def get_metrics(self, command):
+        """Returns the CommandMetrics of a command, or None if the command
+        was never executed."""
+        return self._metrics.get(command)
+
+    def show_stats(self, output=None):
+        """Displays the metrics of every executed command.
+
+        Args:
+            output: Optional renderer to write the metrics to, printed as
+                text if not given.
+        """
+        if output is None:
+            output = TextRenderer()
+        # Pipelines record commands while the stats are shown, so the
+        # rows are taken under the lock.
+        with self._lock:
+            items = [self._stats_item(command)
+                     for command in sorted(self._metrics)]
+        if len(items) == 0:
+            output.render(Result("stats.empty"))
+        else:
+            output.render(Result("command_stats", items=items))
+        if self._metrics_path is not None:
+            self.write_prometheus(self._metrics_path)
+
+    def _stats_item(self, command):
+        metrics = self._metrics[command]
+        mean_results = None
+        if metrics.searches:
+            mean_results = metrics.total_results / metrics.searches
+        return {"command": command, "calls": metrics.calls,
+                "mean_ms": metrics.total_seconds / metrics.calls * 1000,
+                "p99_ms": metrics.quantile(0.99) * 1000,
+                "max_ms": metrics.max_seconds * 1000,
+                "mean_results": mean_results}
+
+    def to_prometheus(self):
+        """Returns the metrics in the Prometheus text exposition format."""
+        with self._lock:
+            return self._format_prometheus()
+
+    def _format_prometheus(self):
+        lines = [
+            "# TYPE yt_command_latency_seconds histogram",
+        ]
+        for command in sorted(self._metrics):
+            metrics = self._metrics[command]
+            label = _label(command)
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, metrics.buckets):
+                cumulative += count
+                upper = "+Inf" if bound == math.inf else repr(bound)
+                lines.append(
+                    f'yt_command_latency_seconds_bucket{{command="{label}",'
+                    f'le="{upper}"}} {cumulative}')
+            lines.append(
+                f'yt_command_latency_seconds_sum{{command="{label}"}} '
+                f'{metrics.total_seconds!r}')
+            lines.append(
+                f'yt_command_latency_seconds_count{{command="{label}"}} '
+                f'{metrics.calls}')
+        lines.append("# TYPE yt_search_results_total counter")
+        for command in sorted(self._metrics):
+            metrics = self._metrics[command]
+            if metrics.searches:
+                lines.append(
+                    f'yt_search_results_total{{command="{_label(command)}"}} '
+                    f'{metrics.total_results}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Writes the metrics to a file in the Prometheus text format.
+
+        Args:
+            path: The file to write, replaced atomically.
+        """
+        # Every writer gets its own temporary file, as STATS may run on
+        # several threads at once.
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, "w") as metrics_file:
+                metrics_file.write(self.to_prometheus())
+            # Replace in one step so a scraper never reads a partial file.
+            os.replace(temp_path, path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(temp_path)
+            raise
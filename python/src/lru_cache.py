@@ -0,0 +1,130 @@
+"""A least recently used cache class."""
+
+from collections import OrderedDict
+import contextlib
+import itertools
+import sys
+import threading
+
+from .memory_usage import object_size
+
+
+# Returned by lookups of keys that are not cached.
+_MISSING = object()
+
+
+def _entry_size(key, value):
+    return object_size(key, 1) + object_size(value, 1)
+
+
+class LRUCache:
+    """A class used to represent a bounded cache that evicts the least
+    recently used entry first."""
+
+    def __init__(self, maxsize, thread_safe=False):
+        """The LRUCache class is initialized.
+
+        Args:
+            maxsize: The maximum number of entries to keep.
+            thread_safe: Whether the cache may be used from several threads.
+                Lookups still never wait for the lock, see get.
+        """
+        self._entries = OrderedDict()
+        self._thread_safe = thread_safe
+        self._lock = threading.Lock() if thread_safe else \
+            contextlib.nullcontext()
+        self._maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def keys(self):
+        """Returns a list of the cached keys, least recently used first."""
+        with self._lock:
+            return list(self._entries)
+
+    def sample(self, count):
+        """Returns up to count (key, value) pairs, least recently used
+        first, without marking them as used."""
+        with self._lock:
+            return list(itertools.islice(self._entries.items(), count))
+
+    def memory_usage(self, sample=256, size=None):
+        """Returns the approximate size in bytes of the cache, from the
+        mean size of at most sample of its entries.
+
+        Args:
+            sample: How many entries to size at most.
+            size: Callable returning the size of a key and its value,
+                object_size of both to depth 1 if not given.
+        """
+        if size is None:
+            size = _entry_size
+        entries = self.sample(sample)
+        total = sys.getsizeof(self._entries)
+        if entries:
+            total += round(sum(size(key, value) for key, value in entries)
+                           * len(self) / len(entries))
+        return total
+
+    def get(self, key, default=None):
+        """Returns the cached value of a key and marks it as recently used.
+
+        In thread-safe mode the lookup takes no lock, and the entry is only
+        marked as used if the lock is free, so recency and the hit counts
+        are approximate while other threads write to the cache.
+
+        Args:
+            key: The key to look up.
+            default: The value to return if the key is not cached.
+        """
+        value = self._entries.get(key, _MISSING)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        if not self._thread_safe:
+            self._entries.move_to_end(key)
+        elif self._lock.acquire(blocking=False):
+            try:
+                self._entries.move_to_end(key)
+            except KeyError:
+                # Evicted since it was read.
+                pass
+            finally:
+                self._lock.release()
+        return value
+
+    def put(self, key, value):
+        """Caches a value, evicting the least recently used entry if the
+        cache is full.
+
+        Returns:
+            The evicted (key, value) pair, or None if nothing was evicted.
+        """
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self._maxsize:
+                return self._entries.popitem(last=False)
+            return None
+
+    def pop(self, key, default=None):
+        """Removes a key from the cache and returns its value."""
+        with self._lock:
+            return self._entries.pop(key, default)
+
+    def clear(self):
+        """Removes every entry from the cache."""
+        with self._lock:
+            self._entries.clear()
+
+    def hit_rate(self):
+        """Returns the fraction of lookups that were hits."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
@@ -0,0 +1,125 @@
+"""Approximate memory accounting and allocation tracing."""
+
+from collections.abc import Sequence
+import itertools
+import os
+import random
+import sys
+import tracemalloc
+
+# Sampling has its own generator so it never moves the state of the
+# global one, which random plays may be seeded from.
+_rng = random.Random()
+
+
+def object_size(obj, depth=2):
+    """Returns the approximate size in bytes of an object and of what it
+    holds, up to depth levels down.
+
+    Strings, bytes and numbers are leaves, and an object reached twice is
+    counted once. Objects shared with other structures, such as the Video
+    objects a cache holds, are counted wherever they are reached, so depth
+    should stop before them.
+
+    Args:
+        obj: The object to size.
+        depth: How many levels of contents to include, 0 for the object
+            alone.
+    """
+    return _size(obj, depth, set())
+
+
+def _size(obj, depth, seen):
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if depth <= 0 or isinstance(obj, (str, bytes, bytearray, int, float)):
+        return size
+    if isinstance(obj, dict):
+        return size + sum(_size(key, depth - 1, seen)
+                          + _size(value, depth - 1, seen)
+                          for key, value in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return size + sum(_size(item, depth - 1, seen) for item in obj)
+    attributes = getattr(obj, "__dict__", None)
+    if attributes is not None:
+        # Attribute names are interned and shared by every instance.
+        size += sys.getsizeof(attributes) + sum(
+            _size(value, depth - 1, seen) for value in attributes.values())
+    return size
+
+
+def sampled_size(items, size=object_size, sample=256, rng=None):
+    """Returns the approximate total size of a collection's items, from the
+    mean size of at most sample of them.
+
+    Sequences are sampled at random; other collections, such as dict
+    views, by their first items, as they have no random access.
+
+    Args:
+        items: A sized collection of the items to size.
+        size: Callable returning the size of one item.
+        sample: How many items to size at most.
+        rng: The random number generator sequences are sampled with, a
+            private one if not given.
+    """
+    if rng is None:
+        rng = _rng
+    count = len(items)
+    if count == 0:
+        return 0
+    if count <= sample:
+        return sum(size(item) for item in items)
+    if isinstance(items, Sequence):
+        picked = [items[index] for index in rng.sample(range(count), sample)]
+    else:
+        picked = list(itertools.islice(items, sample))
+    return round(sum(size(item) for item in picked) * count / sample)
+
+
+class AllocationTracer:
+    """A class used to compare tracemalloc snapshots taken between
+    commands, to find what keeps growing in a long-running session."""
+
+    def __init__(self, frames=1):
+        """The AllocationTracer class is initialized.
+
+        Args:
+            frames: How many stack frames tracemalloc keeps for every
+                allocation.
+        """
+        self._frames = frames
+        self._snapshot = None
+
+    def diff(self, limit=10):
+        """Takes a snapshot and returns the allocation sites that changed
+        most since the previous one.
+
+        Tracing is started by the first call, which returns None.
+
+        Args:
+            limit: The maximum number of allocation sites to return.
+
+        Returns:
+            A list of tracemalloc.StatisticDiff, largest change first, or
+            None if there was no snapshot to compare with.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self._frames)
+            self._snapshot = None
+        # Allocations of tracemalloc itself are not of interest.
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, os.path.abspath(__file__)),))
+        previous, self._snapshot = self._snapshot, snapshot
+        if previous is None:
+            return None
+        return [stat for stat in snapshot.compare_to(previous, "lineno")
+                if stat.size_diff != 0 or stat.count_diff != 0][:limit]
+
+    def stop(self):
+        """Stops tracing and drops the last snapshot."""
+        self._snapshot = None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
@@ -0,0 +1,207 @@
+"""A simulated playback clock and playback session classes."""
+
+import heapq
+import itertools
+import threading
+
+# How long a video lasts, in seconds, if no duration is given for it.
+DEFAULT_DURATION = 300.0
+
+
+class Timer:
+    """A class used to represent a callback scheduled on a PlaybackClock."""
+
+    __slots__ = ("when", "callback", "cancelled")
+
+    def __init__(self, when, callback):
+        self.when = when
+        self.callback = callback
+        self.cancelled = False
+
+
+class PlaybackClock:
+    """A class used to keep virtual time and run timers when it passes.
+
+    Time only moves when advance() is called, so any number of sessions
+    can share one clock and be simulated from a single thread. Timers are
+    kept in a heap, which makes scheduling and firing O(log n); cancelled
+    timers are dropped lazily and the heap is compacted once they make up
+    most of it.
+    """
+
+    def __init__(self, start=0.0):
+        """The PlaybackClock class is initialized.
+
+        Args:
+            start: The virtual time to start at, in seconds.
+        """
+        self._now = start
+        self._heap = []
+        self._sequence = itertools.count()
+        self._cancelled = 0
+        self._lock = threading.Lock()
+
+    def now(self):
+        """Returns the current virtual time."""
+        return self._now
+
+    def schedule(self, delay, callback):
+        """Runs callback once delay seconds of virtual time have passed.
+
+        Args:
+            delay: Seconds from now, at least 0.
+            callback: Called without arguments.
+
+        Returns:
+            A Timer that can be passed to cancel().
+        """
+        with self._lock:
+            timer = Timer(self._now + max(delay, 0.0), callback)
+            heapq.heappush(
+                self._heap, (timer.when, next(self._sequence), timer))
+            return timer
+
+    def cancel(self, timer):
+        """Stops a timer from running, if it has not run yet."""
+        with self._lock:
+            if timer.cancelled or timer.callback is None:
+                return
+            timer.cancelled = True
+            self._cancelled += 1
+            if self._cancelled > 64 and self._cancelled * 2 > len(self._heap):
+                self._heap = [entry for entry in self._heap
+                              if not entry[2].cancelled]
+                heapq.heapify(self._heap)
+                self._cancelled = 0
+
+    def advance(self, seconds):
+        """Moves virtual time forward, running every timer that comes due
+        on the way at its own time and in order.
+
+        Args:
+            seconds: How far to move, at least 0.
+
+        Returns:
+            The number of timers that ran.
+        """
+        target = self._now + max(seconds, 0.0)
+        fired = 0
+        while True:
+            with self._lock:
+                if not self._heap or self._heap[0][0] > target:
+                    self._now = target
+                    return fired
+                when, _, timer = heapq.heappop(self._heap)
+                if timer.cancelled:
+                    self._cancelled -= 1
+                    continue
+                self._now = when
+                callback, timer.callback = timer.callback, None
+            # Callbacks run without the lock, so they can schedule timers.
+            callback()
+            fired += 1
+
+    def __len__(self):
+        """Returns the number of timers waiting to run."""
+        return len(self._heap) - self._cancelled
+
+
+class PlaybackSession:
+    """A class used to track the position of the video a player plays
+    and how long it has been playing in total.
+
+    Positions are worked out from the clock when asked for, so nothing is
+    updated while time passes; the only timer is the one for the end of
+    the current video.
+    """
+
+    def __init__(self, clock, on_end, duration=None):
+        """The PlaybackSession class is initialized.
+
+        Args:
+            clock: The PlaybackClock the session runs on.
+            on_end: Called with the Video when it plays to its end.
+            duration: Optional callable returning the length of a Video
+                in seconds, DEFAULT_DURATION for every video if not given.
+        """
+        self._clock = clock
+        self._on_end = on_end
+        self._duration = duration or (lambda video: DEFAULT_DURATION)
+        self._video = None
+        self._length = 0.0
+        self._position = 0.0
+        self._started = None
+        self._elapsed = 0.0
+        self._timer = None
+
+    @property
+    def video(self):
+        """Returns the Video of the session, or None if it is stopped."""
+        return self._video
+
+    @property
+    def duration(self):
+        """Returns the length of the current video in seconds."""
+        return self._length
+
+    @property
+    def position(self):
+        """Returns how far into the current video playback is."""
+        if self._started is None:
+            return self._position
+        return min(self._position + self._clock.now() - self._started,
+                   self._length)
+
+    @property
+    def elapsed(self):
+        """Returns the total time spent playing, over every video."""
+        if self._started is None:
+            return self._elapsed
+        return self._elapsed + self.position - self._position
+
+    @property
+    def paused(self):
+        """Returns whether the current video is paused."""
+        return self._video is not None and self._started is None
+
+    def start(self, video):
+        """Starts playing a video from its beginning."""
+        self.stop()
+        self._video = video
+        self._length = float(self._duration(video))
+        self._position = 0.0
+        self.resume()
+
+    def pause(self):
+        """Stops the position from moving on."""
+        if self._started is None:
+            return
+        self._elapsed = self.elapsed
+        self._position = self.position
+        self._started = None
+        if self._timer is not None:
+            self._clock.cancel(self._timer)
+            self._timer = None
+
+    def resume(self):
+        """Lets the position move on again."""
+        if self._video is None or self._started is not None:
+            return
+        self._started = self._clock.now()
+        video = self._video
+        self._timer = self._clock.schedule(
+            self._length - self._position, lambda: self._end(video))
+
+    def stop(self):
+        """Stops the current video."""
+        self.pause()
+        self._video = None
+        self._position = 0.0
+        self._length = 0.0
+
+    def _end(self, video):
+        if video is not self._video:
+            return
+        self._timer = None
+        self.pause()
+        self._on_end(video)
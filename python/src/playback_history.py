@@ -0,0 +1,117 @@
+"""A playback history class."""
+
+from array import array
+from collections import Counter
+import sys
+import time
+
+from .memory_usage import object_size, sampled_size
+from .tag_dictionary import TAGS
+
+PLAY, STOP, PAUSE, CONTINUE = range(4)
+EVENT_NAMES = ("PLAY", "STOP", "PAUSE", "CONTINUE")
+
+
+class PlaybackHistory:
+    """A class used to record playback events and play counts.
+
+    Events are kept in a bounded ring buffer made of array-backed columns,
+    so the oldest events are overwritten once the buffer is full. Play
+    counts per video and per tag are kept as running counters and are
+    never rebuilt from the buffer.
+    """
+
+    def __init__(self, capacity=1024, clock=time.time):
+        """The PlaybackHistory class is initialized.
+
+        Args:
+            capacity: The maximum number of events to remember.
+            clock: Callable returning the current timestamp.
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self._clock = clock
+        self._timestamps = array("d", [0.0]) * capacity
+        self._events = array("B", [0]) * capacity
+        self._video_ids = [None] * capacity
+        self._next = 0
+        self._size = 0
+        self._play_counts = Counter()
+        self._tag_play_counts = Counter()
+
+    def __len__(self):
+        return self._size
+
+    def memory_usage(self, sample=256):
+        """Returns the approximate size in bytes of the history and its
+        play counts.
+
+        Args:
+            sample: How many play counts to size at most.
+        """
+        return (sys.getsizeof(self._timestamps) + sys.getsizeof(self._events)
+                + sys.getsizeof(self._video_ids)
+                + object_size(self._play_counts, 0)
+                + sampled_size(self._play_counts.values(), sys.getsizeof,
+                               sample)
+                + object_size(self._tag_play_counts, 1))
+
+    def record(self, event, video):
+        """Records a playback event.
+
+        Args:
+            event: One of PLAY, STOP, PAUSE or CONTINUE.
+            video: The Video the event happened to.
+        """
+        index = self._next
+        self._timestamps[index] = self._clock()
+        self._events[index] = event
+        self._video_ids[index] = video.video_id
+        self._next = (index + 1) % len(self._video_ids)
+        self._size = min(self._size + 1, len(self._video_ids))
+        if event == PLAY:
+            self._play_counts[video.video_id] += 1
+            for tag in set(TAGS.key(tag_id) for tag_id in video.tag_ids):
+                self._tag_play_counts[tag] += 1
+
+    def recent(self, count=None):
+        """Returns the most recent events, newest first.
+
+        Args:
+            count: The maximum number of events to return.
+
+        Returns:
+            A list of (timestamp, event name, video_id) tuples.
+        """
+        if count is None or count > self._size:
+            count = self._size
+        capacity = len(self._video_ids)
+        events = []
+        for offset in range(1, count + 1):
+            index = (self._next - offset) % capacity
+            events.append((self._timestamps[index],
+                           EVENT_NAMES[self._events[index]],
+                           self._video_ids[index]))
+        return events
+
+    def forget(self, video_ids):
+        """Drops the play counts of videos, e.g. once they left the
+        library. Their past events are kept.
+
+        Args:
+            video_ids: The video_ids to forget.
+        """
+        for video_id in video_ids:
+            self._play_counts.pop(video_id, None)
+
+    def play_count(self, video_id):
+        """Returns how many times a video has been played."""
+        return self._play_counts[video_id]
+
+    def top_played(self, count):
+        """Returns the most played videos as (video_id, plays) tuples."""
+        return self._play_counts.most_common(count)
+
+    def tag_play_counts(self):
+        """Returns (tag, plays) tuples, most played tag first."""
+        return self._tag_play_counts.most_common()
@@ -0,0 +1,239 @@
+"""A playlist playback queue class."""
+
+import collections
+import itertools
+import random
+
+REPEAT_OFF, REPEAT_ONE, REPEAT_ALL = "off", "one", "all"
+REPEAT_MODES = (REPEAT_OFF, REPEAT_ONE, REPEAT_ALL)
+
+
+class PlaybackQueue:
+    """A class used to play through a playlist one video at a time.
+
+    In order, the queue walks the playlist's own OrderedDict with an
+    iterator, so no copy is made however long the playlist is. Shuffled,
+    it draws from a list of the playlist's video ids with a lazy
+    Fisher-Yates shuffle, one swap per video played. Flagged videos are
+    skipped by looking them up in the flag dict as they are reached.
+
+    The next videos are looked up in the library ahead of time, and the
+    videos played before are remembered, so NEXT and PREVIOUS are O(1).
+    """
+
+    def __init__(self, playlist, video_library, is_flagged, shuffle=False,
+                 repeat=REPEAT_OFF, prefetch=10, history=1000, rng=random):
+        """The PlaybackQueue class is initialized.
+
+        Args:
+            playlist: The Playlist to play.
+            video_library: The library the videos are looked up in.
+            is_flagged: Callable telling whether a video_id is flagged.
+            shuffle: Whether to play the playlist in a random order.
+            repeat: One of REPEAT_MODES.
+            prefetch: How many of the next videos to look up in advance.
+            history: How many played videos PREVIOUS can go back through.
+            rng: The random number generator shuffling draws from.
+        """
+        self._playlist = playlist
+        self._video_library = video_library
+        self._is_flagged = is_flagged
+        self._prefetch = max(prefetch, 1)
+        self._rng = rng
+        self._repeat = repeat
+        self._current = None
+        self._back = collections.deque(maxlen=history)
+        self._forward = []
+        self._ahead = collections.deque()
+        self._shuffle = shuffle
+        self._restart()
+
+    @property
+    def playlist(self):
+        """Returns the Playlist being played."""
+        return self._playlist
+
+    @property
+    def current(self):
+        """Returns the Video the queue is at, or None before the first."""
+        return self._current
+
+    @property
+    def shuffle(self):
+        """Returns whether the playlist is played in a random order."""
+        return self._shuffle
+
+    @property
+    def repeat(self):
+        """Returns the repeat mode, one of REPEAT_MODES."""
+        return self._repeat
+
+    def set_shuffle(self, shuffle):
+        """Switches shuffling on or off for the videos still to come."""
+        if shuffle == self._shuffle:
+            return
+        self._shuffle = shuffle
+        self._forward.clear()
+        self._ahead.clear()
+        self._restart(after=self._current)
+
+    def set_repeat(self, repeat):
+        """Sets one of REPEAT_MODES."""
+        if repeat not in REPEAT_MODES:
+            raise ValueError(f"repeat must be one of {REPEAT_MODES}")
+        self._repeat = repeat
+
+    def next(self):
+        """Moves to the next video and returns it, or returns None at the
+        end of the playlist."""
+        if self._repeat == REPEAT_ONE and self._current is not None:
+            return self._current
+        video = None
+        while self._forward and video is None:
+            video = self._forward.pop()
+            if not self._playable(video):
+                video = None
+        if video is None:
+            video = self._take()
+        if video is None:
+            return None
+        if self._current is not None:
+            self._back.append(self._current)
+        self._current = video
+        return video
+
+    def previous(self):
+        """Moves back to the video played before and returns it, or
+        returns None if there is none."""
+        while self._back:
+            video = self._back.pop()
+            if not self._is_flagged(video.video_id):
+                self._forward.append(self._current)
+                self._current = video
+                return video
+        return None
+
+    def upcoming(self):
+        """Returns the next videos that would be played, as far as they
+        were looked up in advance."""
+        self._ahead = collections.deque(
+            video for video in self._ahead if self._playable(video))
+        self._fill()
+        videos = list(reversed(self._forward)) + list(self._ahead)
+        return [video for video in videos if self._playable(video)]
+
+    def _playable(self, video):
+        """Returns whether a video looked up earlier is still in the
+        playlist and not flagged."""
+        return video.video_id in self._playlist._videos and \
+            not self._is_flagged(video.video_id)
+
+    def _take(self):
+        while True:
+            self._fill()
+            if not self._ahead:
+                return None
+            video = self._ahead.popleft()
+            # Videos may have been flagged or removed since they were
+            # looked up.
+            if self._playable(video):
+                self._fill()
+                return video
+
+    def _fill(self):
+        """Looks up videos until prefetch of them are waiting."""
+        while len(self._ahead) < self._prefetch:
+            video_id = self._pull()
+            if video_id is None:
+                return
+            self._ahead.append(self._video_library.get_video(video_id))
+
+    def _pull(self):
+        """Returns the next unflagged video_id of the playlist, starting
+        over once if it repeats, or None if there is none."""
+        restarted = False
+        while True:
+            video_id = (self._pull_shuffled() if self._shuffle
+                        else self._pull_in_order())
+            if video_id is not None:
+                if not self._is_flagged(video_id):
+                    return video_id
+                continue
+            if self._repeat != REPEAT_ALL or restarted:
+                return None
+            # Nothing at all is playable if the second pass finds nothing.
+            restarted = True
+            self._restart()
+
+    def _restart(self, after=None):
+        """Starts pulling from the beginning of the playlist, or right
+        after the given video when playing in order."""
+        with self._playlist._lock:
+            self._videos = self._playlist._videos
+            if self._shuffle:
+                self._order = list(self._videos)
+                self._position = 0
+                if after is not None and after.video_id in self._videos:
+                    # The current video is not drawn again this round.
+                    index = self._order.index(after.video_id)
+                    self._order[0], self._order[index] = \
+                        self._order[index], self._order[0]
+                    self._position = 1
+            else:
+                self._iterator = iter(self._videos)
+                self._last = None
+                if after is not None:
+                    self._seek(after.video_id)
+
+    def _seek(self, video_id):
+        """Moves the in-order iterator past video_id, or to the end if the
+        playlist no longer has it."""
+        for key in self._iterator:
+            if key == video_id:
+                self._last = key
+                return
+
+    def _pull_in_order(self):
+        with self._playlist._lock:
+            if self._playlist._videos is not self._videos:
+                # The playlist was cleared, start over on its new videos.
+                self._videos = self._playlist._videos
+                self._iterator = iter(self._videos)
+                self._last = None
+            try:
+                self._last = next(self._iterator, None)
+            except RuntimeError:
+                # The playlist changed, find our place in it again.
+                anchor = self._anchor()
+                self._iterator = iter(self._videos)
+                if anchor is not None:
+                    self._seek(anchor)
+                self._last = next(self._iterator, None)
+            return self._last
+
+    def _anchor(self):
+        """Returns the video_id pulled most recently that the playlist
+        still has, or None if it has none of them."""
+        pulled = itertools.chain(
+            [self._last],
+            (video.video_id for video in reversed(self._ahead)),
+            [self._current.video_id] if self._current is not None else [],
+            (video.video_id for video in reversed(self._back)))
+        for video_id in pulled:
+            if video_id is not None and video_id in self._videos:
+                return video_id
+        return None
+
+    def _pull_shuffled(self):
+        videos = self._playlist._videos
+        order = self._order
+        while self._position < len(order):
+            index = self._rng.randrange(self._position, len(order))
+            order[self._position], order[index] = \
+                order[index], order[self._position]
+            video_id = order[self._position]
+            self._position += 1
+            # Videos removed since the shuffle started are passed over.
+            if video_id in videos:
+                return video_id
+        return None
@@ -0,0 +1,398 @@
+"""Structured results of VideoPlayer commands and their renderers.
+
+Every command reports what happened as Result objects. A renderer turns
+them into output: TextRenderer prints the human readable text and
+JsonRenderer writes one JSON object per line for machine consumers.
+"""
+
+import contextlib
+import contextvars
+import json
+import sys
+import time
+
+from .lru_cache import LRUCache
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# The renderer ContextRenderer delegates to in the current context.
+_current_renderer = contextvars.ContextVar("current_renderer", default=None)
+
+
+class Result:
+    """A class used to represent a single result of a command.
+
+    Results holding a listing have an 'items' field, an iterable that is
+    only consumed once while the result is rendered.
+    """
+
+    __slots__ = ("code", "fields")
+
+    def __init__(self, code, **fields):
+        self.code = code
+        self.fields = fields
+
+    def __repr__(self):
+        return f"Result({self.code!r}, {self.fields!r})"
+
+
+# Listings whose items are (video, flag_reason) pairs.
+VIDEO_LISTS = {"all_videos", "playlist", "search_results", "queue",
+               "related"}
+
+MESSAGES = {
+    "error": "{message}",
+    "invalid_command":
+        "Please enter a valid command, type HELP for a list of available "
+        "commands.",
+    "help": "{text}",
+    "stats.disabled": "Command statistics are not enabled",
+    "stats.empty": "No commands executed yet",
+    "number_of_videos": "{count} videos in the library",
+    "play.not_found": "Cannot play video: Video does not exist",
+    "play.flagged":
+        "Cannot play video: Video is currently flagged (reason: {reason})",
+    "stopping": "Stopping video: {title}",
+    "playing": "Playing video: {title}",
+    "stop.not_playing": "Cannot stop video: No video is currently playing",
+    "random.unavailable": "No videos available",
+    "pause.not_playing": "Cannot pause video: No video is currently playing",
+    "pausing": "Pausing video: {title}",
+    "pause.already_paused": "Video already paused: {title}",
+    "continue.not_playing":
+        "Cannot continue video: No video is currently playing",
+    "continuing": "Continuing video: {title}",
+    "continue.not_paused": "Cannot continue video: Video is not paused",
+    "playing_video.none": "No video is currently playing",
+    "play_playlist.no_playlist":
+        "Cannot play playlist {playlist_name}: Playlist does not exist",
+    "play_playlist.empty":
+        "Cannot play playlist {playlist_name}: No videos to play",
+    "next.no_queue": "Cannot play next video: No playlist is playing",
+    "next.end": "Cannot play next video: Reached the end of {playlist_name}",
+    "previous.no_queue":
+        "Cannot play previous video: No playlist is playing",
+    "previous.none": "Cannot play previous video: No previous video",
+    "shuffle_set": "Shuffle is now {state}",
+    "repeat_set": "Repeat is now {mode}",
+    "queue.none": "No playlist is playing",
+    "clock_advanced": "Advanced the playback clock by {seconds:g} seconds",
+    "history.empty": "No playback history yet",
+    "top_played.empty": "No videos have been played yet",
+    "tag_plays.empty": "No videos have been played yet",
+    "create_playlist.exists":
+        "Cannot create playlist: A playlist with the same name already exists",
+    "playlist_created": "Successfully created new playlist: {playlist_name}",
+    "add_to_playlist.no_playlist":
+        "Cannot add video to {playlist_name}: Playlist does not exist",
+    "add_to_playlist.no_video":
+        "Cannot add video to {playlist_name}: Video does not exist",
+    "add_to_playlist.flagged":
+        "Cannot add video to {playlist_name}: Video is currently flagged "
+        "(reason: {reason})",
+    "add_to_playlist.already_added":
+        "Cannot add video to {playlist_name}: Video already added",
+    "added_to_playlist": "Added video to {playlist_name}: {title}",
+    "playlists.empty": "No playlists exist yet",
+    "show_playlist.no_playlist":
+        "Cannot show playlist {playlist_name}: Playlist does not exist",
+    "remove_from_playlist.no_playlist":
+        "Cannot remove video from {playlist_name}: Playlist does not exist",
+    "remove_from_playlist.no_video":
+        "Cannot remove video from {playlist_name}: Video does not exist",
+    "remove_from_playlist.not_in_playlist":
+        "Cannot remove video from {playlist_name}: Video is not in playlist",
+    "removed_from_playlist": "Removed video from {playlist_name}: {title}",
+    "clear_playlist.no_playlist":
+        "Cannot clear playlist {playlist_name}: Playlist does not exist",
+    "playlist_cleared": "Successfully removed all videos from {playlist_name}",
+    "delete_playlist.no_playlist":
+        "Cannot delete playlist {playlist_name}: Playlist does not exist",
+    "playlist_deleted": "Deleted playlist: {playlist_name}",
+    "combine_playlists.no_playlist":
+        "Cannot create playlist {playlist_name}: Playlist {source} does not "
+        "exist",
+    "playlist_combined":
+        "Successfully created new playlist: {playlist_name} ({count} videos)",
+    "search.no_results": "No search results for {search_term}",
+    "search.prompt":
+        "Would you like to play any of the above? If yes, specify the number "
+        "of the video.\n"
+        "If your answer is not a valid number, we will assume it's a no.",
+    "suggest.none": "No suggestions for {prefix}",
+    "related.no_video": "Cannot show related videos: Video does not exist",
+    "related.none": "No related videos for {title}",
+    "flag.already_flagged": "Cannot flag video: Video is already flagged",
+    "flag.no_video": "Cannot flag video: Video does not exist",
+    "video_flagged": "Successfully flagged video: {title} (reason: {reason})",
+    "allow.no_video": "Cannot remove flag from video: Video does not exist",
+    "allow.not_flagged": "Cannot remove flag from video: Video is not flagged",
+    "video_flagged_for":
+        "Successfully flagged video: {title} (reason: {reason}) for "
+        "{ttl:g} seconds",
+    "video_allowed": "Successfully removed flag from video: {title}",
+    "flag_expired": "Flag expired on video: {title}",
+    "videos_flagged":
+        "Successfully flagged {count} videos ({already_flagged} already "
+        "flagged, {missing} not found)",
+    "videos_allowed":
+        "Successfully removed flags from {count} videos ({not_flagged} not "
+        "flagged, {missing} not found)",
+    "memory.tracing":
+        "Tracing memory allocations, enter MEMORY DIFF again to see what "
+        "changed",
+    "memory.no_changes": "No memory allocations changed",
+    "memory.trace_stopped": "Stopped tracing memory allocations",
+    "undo.empty": "Cannot undo: Nothing to undo",
+    "undone": "Undid: {command}",
+    "redo.empty": "Cannot redo: Nothing to redo",
+    "redone": "Redid: {command}",
+}
+
+# Header and item template of every listing.
+LISTS = {
+    "all_videos": ("Here's a list of all available videos:", None),
+    "playlist": ("Showing playlist: {playlist_name}", None),
+    "search_results": ("Here are the results for {search_term}:", None),
+    "related": ("Here are the videos related to {title}:", None),
+    "queue": ("Up next in {playlist_name} (shuffle {shuffle}, "
+              "repeat {repeat}):", None),
+    "history": ("Showing playback history:", "  {clock} {event} {title}"),
+    "top_played": ("Showing most played videos:",
+                   "  {rank}) {title} ({video_id}) - {plays} plays"),
+    "tag_plays": ("Showing plays per tag:", "  {tag}: {plays} plays"),
+    "playlists": ("Showing all playlists:", "  {name}"),
+    "suggestions": ("Here are the suggestions for {prefix}:",
+                    "  {word} ({kind})"),
+    "cache_stats": ("Showing cache statistics:",
+                    "  {name}: {size} entries, {hits} hits, {misses} misses, "
+                    "{hit_rate_percent:.1f}% hit rate"),
+    "memory": ("Showing approximate memory usage ({total_size} in total):",
+               "  {name}: {size} ({count} entries)"),
+    "memory_diff": ("Showing the largest memory changes since the last "
+                    "MEMORY DIFF:",
+                    "  {location}: {size_change} ({count_diff:+d} blocks, "
+                    "{total_size} now)"),
+    "command_stats": ("Showing command statistics:",
+                      "  {command}: {calls} calls, mean {mean_ms:.3f} ms, "
+                      "p99 {p99_ms:.3f} ms, max {max_ms:.3f} ms"),
+}
+
+
+class TextRenderer:
+    """A class used to print results as human readable text.
+
+    The formatted row of every listed video is cached, together with the
+    flag reason it was formatted with, so listings mostly join cached
+    strings.
+    """
+
+    def __init__(self, stream=None, row_cache_size=100000,
+                 thread_safe=False):
+        """The TextRenderer class is initialized.
+
+        Args:
+            stream: The file to write to, sys.stdout if not given.
+            row_cache_size: How many formatted video rows to cache.
+            thread_safe: Whether results may be rendered from several
+                threads at once.
+        """
+        self._stream = stream
+        self.row_cache = LRUCache(row_cache_size, thread_safe)
+
+    def render(self, result):
+        """Writes a result as text."""
+        # Most results are a single message, so they are looked up first.
+        template = MESSAGES.get(result.code)
+        if template is not None:
+            text = template.format(**result.fields)
+        elif result.code in LISTS:
+            text = self._format_list(result)
+        elif result.code == "now_playing":
+            video, flag_reason = result.fields["video"]
+            text = f"Currently playing: {self.video_row(video, flag_reason)}"
+            if result.fields["paused"]:
+                text += " - PAUSED"
+        elif result.code == "position":
+            fields = result.fields
+            text = (f"Position: {_clock_time(fields['position'])} of "
+                    f"{_clock_time(fields['duration'])} in {fields['title']}"
+                    f" (played {_clock_time(fields['elapsed'])} in total)")
+            if fields["paused"]:
+                text += " - PAUSED"
+        else:
+            raise KeyError(result.code)
+        print(text, file=self._stream or sys.stdout)
+
+    def video_row(self, video, flag_reason=None):
+        """Returns the listing row of a video, with the flag reason if it
+        is flagged."""
+        cached = self.row_cache.get(video.video_id)
+        if cached is not None and cached[0] == flag_reason:
+            return cached[1]
+        row = f"{video.title} ({video.video_id}) [{' '.join(video.tags)}]"
+        if flag_reason != None:
+            row += f" - FLAGGED (reason: {flag_reason})"
+        self.row_cache.put(video.video_id, (flag_reason, row))
+        return row
+
+    def _format_list(self, result):
+        header, item_template = LISTS[result.code]
+        if result.code == "memory":
+            lines = [header.format(
+                total_size=_byte_size(result.fields["total"]))]
+        else:
+            lines = [header.format(**result.fields)]
+        items = result.fields["items"]
+        if result.code == "all_videos":
+            lines.extend(self.video_row(video, flag_reason)
+                         for video, flag_reason in items)
+        elif result.code == "playlist":
+            # Flagged videos are not indented in playlists.
+            lines.extend(self.video_row(video, flag_reason)
+                         if flag_reason != None
+                         else "  " + self.video_row(video)
+                         for video, flag_reason in items)
+            if len(lines) == 1:
+                lines.append("No videos here yet")
+        elif result.code in ("search_results", "queue", "related"):
+            lines.extend(f"  {index}) {self.video_row(video, flag_reason)}"
+                         for index, (video, flag_reason)
+                         in enumerate(items, 1))
+            if result.code == "queue" and len(lines) == 1:
+                lines.append("Nothing else to play")
+        elif result.code == "history":
+            lines.extend(item_template.format(
+                clock=time.strftime("%H:%M:%S",
+                                    time.localtime(item["timestamp"])),
+                **item) for item in items)
+        elif result.code == "cache_stats":
+            lines.extend(item_template.format(
+                hit_rate_percent=item["hit_rate"] * 100, **item)
+                for item in items)
+        elif result.code == "memory":
+            lines.extend(item_template.format(
+                size=_byte_size(item["bytes"]), **item) for item in items)
+        elif result.code == "memory_diff":
+            lines.extend(item_template.format(
+                size_change=("+" if item["size_diff"] >= 0 else "-")
+                + _byte_size(abs(item["size_diff"])),
+                total_size=_byte_size(item["size"]), **item)
+                for item in items)
+        elif result.code == "command_stats":
+            for item in items:
+                line = item_template.format(**item)
+                if item["mean_results"] is not None:
+                    line += f", mean {item['mean_results']:.1f} results"
+                lines.append(line)
+        else:
+            lines.extend(item_template.format(**item) for item in items)
+        return "\n".join(lines)
+
+
+def _clock_time(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}:{seconds:02d}"
+
+
+def _byte_size(size):
+    if size < 1024:
+        return f"{size} bytes"
+    for unit in ("KiB", "MiB", "GiB"):
+        size /= 1024
+        if size < 1024 or unit == "GiB":
+            return f"{size:.1f} {unit}"
+
+
+def _video_dict(video, flag_reason):
+    return {"title": video.title, "video_id": video.video_id,
+            "tags": list(video.tags), "flag_reason": flag_reason}
+
+
+class JsonRenderer:
+    """A class used to write results as JSON Lines.
+
+    Every result is one JSON object with a "result" code and its fields.
+    Listings are streamed: the items array is written element by element
+    as the items are produced, never built in memory as a whole.
+    """
+
+    def __init__(self, stream=None):
+        """The JsonRenderer class is initialized.
+
+        Args:
+            stream: The file to write to, sys.stdout if not given.
+        """
+        self._stream = stream
+        if orjson is not None:
+            self._encode = lambda value: orjson.dumps(value).decode()
+        else:
+            self._encode = json.JSONEncoder(
+                ensure_ascii=False, separators=(",", ":")).encode
+
+    def render(self, result):
+        """Writes a result as one line of JSON."""
+        stream = self._stream or sys.stdout
+        fields = dict(result.fields)
+        items = fields.pop("items", None)
+        if result.code == "now_playing":
+            fields["video"] = _video_dict(*fields["video"])
+        head = self._encode({"result": result.code, **fields})
+        if items is None:
+            stream.write(head + "\n")
+            return
+        stream.write(head[:-1] + ',"items":[')
+        separator = ""
+        for item in items:
+            if result.code in VIDEO_LISTS:
+                item = _video_dict(*item)
+            stream.write(separator + self._encode(item))
+            separator = ","
+        stream.write("]}\n")
+
+
+class RecordingRenderer:
+    """A class used to keep results as objects instead of writing them,
+    with listings materialised into lists."""
+
+    def __init__(self):
+        self.results = []
+
+    def render(self, result):
+        """Records a result."""
+        if "items" in result.fields:
+            result = Result(result.code, **{**result.fields,
+                                            "items": list(result.fields["items"])})
+        self.results.append(result)
+
+
+class ContextRenderer:
+    """A class used to send results to a renderer chosen per context, so
+    commands running concurrently on different threads each get their
+    own output."""
+
+    def __init__(self, default=None):
+        """The ContextRenderer class is initialized.
+
+        Args:
+            default: The renderer used outside of use(), a TextRenderer if
+                not given.
+        """
+        self._default = default if default is not None else TextRenderer()
+
+    @contextlib.contextmanager
+    def use(self, renderer):
+        """Sends the results rendered in the current context to renderer
+        until the with block ends."""
+        token = _current_renderer.set(renderer)
+        try:
+            yield renderer
+        finally:
+            _current_renderer.reset(token)
+
+    def render(self, result):
+        """Passes a result to the renderer of the current context."""
+        (_current_renderer.get() or self._default).render(result)
@@ -0,0 +1,72 @@
+"""A prefix index class."""
+
+import bisect
+import sys
+
+from .memory_usage import object_size, sampled_size
+from .text_key import fold
+
+
+class PrefixIndex:
+    """A class used to find the words starting with a prefix.
+
+    Words are kept in a sorted array of (key, word) pairs, where the key is
+    the case-folded word, so a lookup is a binary search followed by a scan
+    over the matches only.
+    """
+
+    def __init__(self, words=()):
+        """The PrefixIndex class is initialized.
+
+        Args:
+            words: The words to index.
+        """
+        self._entries = sorted(set((fold(word), word) for word in words))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def memory_usage(self, sample=256):
+        """Returns the approximate size in bytes of the index.
+
+        Args:
+            sample: How many entries to size at most.
+        """
+        return sys.getsizeof(self._entries) + sampled_size(
+            self._entries, lambda entry: object_size(entry, 1), sample)
+
+    def add(self, word):
+        """Adds a word to the index."""
+        entry = (fold(word), word)
+        index = bisect.bisect_left(self._entries, entry)
+        if index == len(self._entries) or self._entries[index] != entry:
+            self._entries.insert(index, entry)
+
+    def remove(self, word):
+        """Removes a word from the index, if it is indexed."""
+        entry = (fold(word), word)
+        index = bisect.bisect_left(self._entries, entry)
+        if index < len(self._entries) and self._entries[index] == entry:
+            del self._entries[index]
+
+    def complete(self, prefix, count=10):
+        """Returns the first words, in alphabetical order, that start with
+        the prefix, ignoring case.
+
+        Args:
+            prefix: The prefix to complete.
+            count: The maximum number of words to return.
+
+        Returns:
+            A list of (key, word) pairs.
+        """
+        key = fold(prefix)
+        index = bisect.bisect_left(self._entries, (key,))
+        matches = []
+        while index < len(self._entries) and len(matches) < count:
+            entry = self._entries[index]
+            if not entry[0].startswith(key):
+                break
+            matches.append(entry)
+            index += 1
+        return matches
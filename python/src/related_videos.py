@@ -0,0 +1,138 @@
+"""A related videos recommender class."""
+
+import numpy as np
+
+from .memory_usage import object_size, sampled_size
+from .tag_dictionary import TAGS
+
+
+class RelatedVideos:
+    """A class used to find the videos that share the most tags with a
+    video, rare tags counting for more than common ones.
+
+    Every video is a sparse TF-IDF vector over its tags, normalised to
+    unit length, and kept in CSR form: row_ptr, the tag column of every
+    entry and its weight. The same entries are also kept by tag (CSC, the
+    tag posting lists), so a query only visits the videos that share at
+    least one tag with the queried video and never compares it with the
+    rest of the library.
+    """
+
+    def __init__(self, video_library):
+        """Builds the tag vectors of every video in the library.
+
+        Args:
+            video_library: The VideoLibrary to recommend from.
+        """
+        self._videos = list(video_library.get_all_videos())
+        self._rows = {video.video_id: row
+                      for row, video in enumerate(self._videos)}
+        columns = {}
+        row_ptr = [0]
+        row_columns = []
+        for video in self._videos:
+            tags = set(TAGS.key(tag_id) for tag_id in video.tag_ids)
+            row_columns.extend(columns.setdefault(tag, len(columns))
+                               for tag in sorted(tags))
+            row_ptr.append(len(row_columns))
+        self._row_ptr = np.array(row_ptr, dtype=np.int64)
+        self._columns = np.array(row_columns, dtype=np.int64)
+
+        # Tags every video has tell nothing apart, rare tags the most.
+        document_counts = np.bincount(self._columns, minlength=len(columns))
+        idf = np.log((1 + len(self._videos)) / (1 + document_counts)) + 1
+        row_lengths = np.diff(self._row_ptr)
+        rows = np.repeat(np.arange(len(self._videos)), row_lengths)
+        weights = idf[self._columns]
+        norms = np.sqrt(np.bincount(rows, weights=weights ** 2,
+                                    minlength=len(self._videos)))
+        self._weights = weights / norms[rows] if len(rows) else weights
+
+        # The posting lists: the same entries, sorted by tag.
+        order = np.argsort(self._columns, kind="stable")
+        self._posting_ptr = np.concatenate(
+            ([0], np.cumsum(document_counts))).astype(np.int64)
+        self._posting_rows = rows[order]
+        self._posting_weights = self._weights[order]
+        # video_id to (rows, scores, whether no neighbour was cut off).
+        self._neighbours = {}
+
+    def __len__(self):
+        return len(self._videos)
+
+    def memory_usage(self, sample=256):
+        """Returns the approximate size in bytes of the tag matrix and of
+        the neighbours found so far.
+
+        Args:
+            sample: How many videos' neighbours to size at most.
+        """
+        return object_size(self, 1) + sampled_size(
+            self._neighbours.values(),
+            lambda neighbours: object_size(neighbours, 1), sample)
+
+    def related(self, video_id, count=5, is_flagged=lambda video_id: False):
+        """Returns up to count (video, score) pairs of the videos most
+        similar to a video, best first, leaving out flagged videos.
+
+        Args:
+            video_id: The video to find related videos for.
+            count: The maximum number of videos to return.
+            is_flagged: Callable telling whether a video_id is flagged.
+        """
+        precomputed = self._neighbours.get(video_id)
+        if precomputed is not None:
+            rows, scores, complete = precomputed
+            result = self._first_unflagged(rows, scores, count, is_flagged)
+            # Only rank again if flags left too few precomputed neighbours.
+            if len(result) == count or complete:
+                return result
+        rows, scores = self._rank(video_id)
+        return self._first_unflagged(rows, scores, count, is_flagged)
+
+    def precompute(self, video_ids, count=50):
+        """Keeps the best count neighbours of some videos, typically the
+        most played ones, so asking for them costs no ranking.
+
+        Args:
+            video_ids: The videos to precompute neighbour lists for.
+            count: How many neighbours to keep for each video.
+        """
+        for video_id in video_ids:
+            if video_id in self._rows:
+                rows, scores = self._rank(video_id)
+                self._neighbours[video_id] = (
+                    rows[:count], scores[:count], len(rows) <= count)
+
+    def _first_unflagged(self, rows, scores, count, is_flagged):
+        result = []
+        for row, score in zip(rows, scores):
+            video = self._videos[row]
+            if not is_flagged(video.video_id):
+                result.append((video, float(score)))
+                if len(result) == count:
+                    break
+        return result
+
+    def _rank(self, video_id):
+        """Returns the rows and scores of every other video sharing a tag
+        with the video, best first, ties in catalogue order."""
+        row = self._rows.get(video_id)
+        if row is None:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        start, end = self._row_ptr[row], self._row_ptr[row + 1]
+        columns = self._columns[start:end]
+        # Sparse dot products: only the posting lists of the video's tags.
+        starts = self._posting_ptr[columns]
+        lengths = self._posting_ptr[columns + 1] - starts
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) \
+            + np.arange(lengths.sum())
+        products = self._posting_weights[offsets] * np.repeat(
+            self._weights[start:end], lengths)
+        rows, inverse = np.unique(self._posting_rows[offsets],
+                                  return_inverse=True)
+        scores = np.bincount(inverse, weights=products, minlength=len(rows))
+        keep = rows != row
+        rows, scores = rows[keep], scores[keep]
+        order = np.lexsort((rows, -scores))
+        return rows[order], scores[order]
@@ -1,21 +1,147 @@
 """A youtube terminal simulator."""
+import argparse
+
+from .video_library import VideoLibrary
 from .video_player import VideoPlayer
 from .command_parser import CommandException
 from .command_parser import CommandParser
+from .command_pipeline import CommandPipeline
+from .command_profiler import CommandProfiler
+from .command_stats import CommandStats
+from .playback_clock import PlaybackClock
+from .session_log import SessionRecorder
+from .player_output import JsonRenderer, Result
+from . import shared_catalogue
+import os
+import sys
+import time
+
+
+def _enable_tab_completion(parser, video_player):
+    """Completes command names and video titles, tags and playlist names
+    when TAB is pressed, if readline is available."""
+    try:
+        import readline
+    except ImportError:
+        return
+
+    def complete(text, state):
+        if readline.get_line_buffer()[:readline.get_begidx()].strip():
+            matches = [word for word, kind in video_player.suggest(text)]
+        else:
+            matches = [name for name in parser.get_command_names()
+                       if name.startswith(text.upper())]
+        return matches[state] if state < len(matches) else None
+
+    readline.set_completer_delims(" ")
+    readline.set_completer(complete)
+    readline.parse_and_bind("tab: complete")
+
+
+def _write_outputs(args, stats, profiler, recorder):
+    """Writes the metrics file and the profile and closes the session log,
+    whichever of them were asked for."""
+    if stats is not None and args.metrics_file:
+        stats.write_prometheus(args.metrics_file)
+    if profiler is not None:
+        profiler.close()
+        profiler.write(args.profile)
+    if recorder is not None:
+        recorder.close()
 
 
 if __name__ == "__main__":
-    print("""Hello and welcome to YouTube, what would you like to do?
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument(
+        "--catalogue", action="append", default=[],
+        help="catalogue file or directory of shard files to load instead "
+             "of the bundled videos.txt, may be given more than once")
+    arg_parser.add_argument(
+        "--shared-catalogue",
+        help="attach to a catalogue published with src.shared_catalogue, "
+             "given as a file path or a shared memory segment name")
+    arg_parser.add_argument(
+        "--stats", action="store_true",
+        help="collect latency statistics for every command")
+    arg_parser.add_argument(
+        "--metrics-file",
+        help="write the statistics to this file in the Prometheus text "
+             "format (implies --stats)")
+    arg_parser.add_argument(
+        "--json", action="store_true",
+        help="write the result of every command as one line of JSON")
+    arg_parser.add_argument(
+        "--pipeline", action="store_true",
+        help="read requests of the form '<request_id> <command>' from "
+             "stdin and answer each with a line of JSON as soon as it "
+             "completes, running read-only commands concurrently")
+    arg_parser.add_argument(
+        "--real-time", action="store_true",
+        help="move the playback clock with the wall clock, so videos end "
+             "and time-limited flags expire on their own instead of only "
+             "with ADVANCE")
+    arg_parser.add_argument(
+        "--profile",
+        help="sample the stack of every command and write the samples to "
+             "this file on exit, per command type, as speedscope JSON if it "
+             "ends in .json and as collapsed stacks otherwise")
+    arg_parser.add_argument(
+        "--record",
+        help="write every command with its time to this session log, to "
+             "be replayed by benchmark/load_harness.py")
+    args = arg_parser.parse_args()
+
+    # Pipelines and JSON output write nothing but JSON to stdout.
+    interactive = not (args.pipeline or args.json)
+    if interactive:
+        print("""Hello and welcome to YouTube, what would you like to do?
     Enter HELP for list of available commands or EXIT to terminate.""")
-    video_player = VideoPlayer()
-    parser = CommandParser(video_player)
-    while True:
-        command = input("YT> ")
-        if command.upper() == "EXIT":
-            break
+    if args.shared_catalogue and os.path.exists(args.shared_catalogue):
+        video_library = shared_catalogue.SharedVideoLibrary(
+            shared_catalogue.attach(path=args.shared_catalogue))
+    elif args.shared_catalogue:
+        video_library = shared_catalogue.SharedVideoLibrary(
+            shared_catalogue.attach(name=args.shared_catalogue))
+    else:
+        video_library = VideoLibrary(*args.catalogue)
+    stats = None
+    if args.stats or args.metrics_file:
+        stats = CommandStats(args.metrics_file)
+    profiler = CommandProfiler() if args.profile else None
+    recorder = SessionRecorder(args.record) if args.record else None
+    if args.pipeline:
         try:
-            parser.execute_command(command.split())
-        except CommandException as e:
-            print(e)
-    print("YouTube has now terminated its execution. "
-          "Thank you and goodbye!")
+            CommandPipeline(video_library, stats, profiler=profiler,
+                            recorder=recorder).run(sys.stdin)
+        finally:
+            _write_outputs(args, stats, profiler, recorder)
+        sys.exit()
+    output = JsonRenderer() if args.json else None
+    clock = PlaybackClock()
+    video_player = VideoPlayer(video_library, output=output, clock=clock)
+    parser = CommandParser(video_player, stats, interactive=interactive,
+                           profiler=profiler, recorder=recorder)
+    _enable_tab_completion(parser, video_player)
+    last_time = time.monotonic()
+    try:
+        while True:
+            try:
+                command = input("YT> " if interactive else "")
+            except EOFError:
+                # The end of piped input ends the session like EXIT.
+                break
+            if args.real_time:
+                now = time.monotonic()
+                clock.advance(now - last_time)
+                last_time = now
+            if command.upper() == "EXIT":
+                break
+            try:
+                parser.execute_command(command.split())
+            except CommandException as e:
+                video_player.output.render(Result("error", message=str(e)))
+    finally:
+        _write_outputs(args, stats, profiler, recorder)
+    if interactive:
+        print("YouTube has now terminated its execution. "
+              "Thank you and goodbye!")
@@ -0,0 +1,63 @@
+"""Recording and reading of command sessions."""
+
+import threading
+import time
+
+
+class SessionRecorder:
+    """A class used to write every command a parser executes to a session
+    log, so the session can be replayed later.
+
+    Every line of the log is the number of seconds since recording started
+    and the command, separated by a tab.
+    """
+
+    def __init__(self, path, clock=time.monotonic):
+        """The SessionRecorder class is initialized and the log file
+        created.
+
+        Args:
+            path: The file to write the session to.
+            clock: Callable returning the current time in seconds.
+        """
+        self._file = open(path, "w")
+        self._clock = clock
+        self._start = clock()
+        # Pipelines execute commands from several threads.
+        self._lock = threading.Lock()
+
+    def record(self, command):
+        """Appends a command to the log.
+
+        Args:
+            command: The command and its arguments.
+        """
+        line = f"{self._clock() - self._start:.6f}\t{' '.join(command)}\n"
+        with self._lock:
+            # Every line is flushed, so a session that crashes is still
+            # recorded up to the command that crashed it.
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        """Flushes and closes the log."""
+        with self._lock:
+            self._file.close()
+
+
+def read_session(path):
+    """Returns the commands of a session log.
+
+    Args:
+        path: The file the session was recorded to.
+
+    Returns:
+        A list of (seconds, command) pairs in the order they were
+        recorded, where command is the list of the command's words.
+    """
+    session = []
+    with open(path) as session_file:
+        for line in session_file:
+            offset, _, command = line.rstrip("\n").partition("\t")
+            session.append((float(offset), command.split()))
+    return session
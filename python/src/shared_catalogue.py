@@ -0,0 +1,390 @@
+"""A read-only video catalogue shared between processes.
+
+One process publishes a VideoLibrary into a shared memory segment or a
+memory-mapped file with publish(). Other processes attach to it with
+attach() and get a SharedVideoLibrary that reads titles, ids, tags and the
+tag index straight from the shared buffer, so N workers use roughly the
+memory of one and attaching takes no parsing at all.
+
+To publish a catalogue file from the command line:
+    python3 -m src.shared_catalogue <output_file> [catalogue ...]
+"""
+
+from .tag_dictionary import TAGS
+from .text_key import fold
+from .video import Video
+from .video_library import VideoLibrary
+from array import array
+from collections.abc import Sequence
+from multiprocessing import shared_memory
+import bisect
+import mmap
+import struct
+import sys
+
+_MAGIC = b"YTCAT002"
+# Magic, then the number of videos, tags and tag groups, then the byte
+# offset of every section in _SECTIONS order.
+_SECTIONS = ("string_offsets", "strings", "tag_indptr", "tag_list",
+             "popularity", "id_order", "group_indptr", "group_postings")
+_HEADER = struct.Struct(f"<8s{3 + len(_SECTIONS)}Q")
+_TYPECODES = {"string_offsets": "Q", "tag_indptr": "Q", "tag_list": "I",
+              "popularity": "d", "id_order": "I", "group_indptr": "Q",
+              "group_postings": "I"}
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def _serialise(video_library):
+    """Returns the catalogue of a library as a header and a list of
+    (section name, bytes) pairs."""
+    videos = list(video_library.get_all_videos())
+    tag_ids = {}
+    tag_list = array("I")
+    tag_indptr = array("Q", [0])
+    for video in videos:
+        for tag in video.tags:
+            tag_list.append(tag_ids.setdefault(tag, len(tag_ids)))
+        tag_indptr.append(len(tag_list))
+    tag_names = list(tag_ids)
+
+    groups = {}
+    for index, video in enumerate(videos):
+        for group in dict.fromkeys(TAGS.fold(tag) for tag in video.tags):
+            groups.setdefault(group, array("I")).append(index)
+    group_keys = sorted(groups)
+    group_indptr = array("Q", [0])
+    group_postings = array("I")
+    for group in group_keys:
+        group_postings.extend(groups[group])
+        group_indptr.append(len(group_postings))
+
+    # Strings: title and id of every video, then tag names, then the
+    # sorted tag group keys, then the key searches compare every title by,
+    # left empty when it is the title itself.
+    strings = []
+    for video in videos:
+        strings.append(video.title)
+        strings.append(video.video_id)
+    strings.extend(tag_names)
+    strings.extend(group_keys)
+    strings.extend("" if video.title_key == video.title else video.title_key
+                   for video in videos)
+    encoded = [string.encode() for string in strings]
+    string_offsets = array("Q", [0])
+    for value in encoded:
+        string_offsets.append(string_offsets[-1] + len(value))
+
+    sections = {
+        "string_offsets": string_offsets.tobytes(),
+        "strings": b"".join(encoded),
+        "tag_indptr": tag_indptr.tobytes(),
+        "tag_list": tag_list.tobytes(),
+        "popularity": array(
+            "d", [video.popularity for video in videos]).tobytes(),
+        "id_order": array("I", sorted(
+            range(len(videos)),
+            key=lambda index: videos[index].video_id)).tobytes(),
+        "group_indptr": group_indptr.tobytes(),
+        "group_postings": group_postings.tobytes(),
+    }
+    return (len(videos), len(tag_names), len(group_keys)), sections
+
+
+def _write(buffer, counts, sections):
+    offset = _HEADER.size
+    offsets = []
+    for name in _SECTIONS:
+        offset = _align(offset)
+        offsets.append(offset)
+        buffer[offset:offset + len(sections[name])] = sections[name]
+        offset += len(sections[name])
+    buffer[:_HEADER.size] = _HEADER.pack(_MAGIC, *counts, *offsets)
+
+
+def _size(sections):
+    offset = _HEADER.size
+    for name in _SECTIONS:
+        offset = _align(offset) + len(sections[name])
+    return offset
+
+
+def publish(video_library, name=None, path=None):
+    """Publishes the catalogue of a library for other processes.
+
+    Args:
+        video_library: The VideoLibrary to publish.
+        name: Name of the shared memory segment to create. A random name
+            is used if neither name nor path are given.
+        path: File to write the catalogue to instead, for memory mapping.
+
+    Returns:
+        A SharedCatalogue over the published data. Call unlink() on it once
+        no worker needs a shared memory segment any more.
+    """
+    counts, sections = _serialise(video_library)
+    size = _size(sections)
+    if path is not None:
+        with open(path, "wb") as catalogue_file:
+            catalogue_file.truncate(size)
+        with open(path, "r+b") as catalogue_file, \
+                mmap.mmap(catalogue_file.fileno(), size) as buffer:
+            _write(buffer, counts, sections)
+        return attach(path=path)
+    segment = shared_memory.SharedMemory(name, create=True, size=size)
+    _write(segment.buf, counts, sections)
+    return SharedCatalogue(segment.buf, segment)
+
+
+def attach(name=None, path=None):
+    """Attaches to a catalogue published by publish().
+
+    Args:
+        name: Name of the shared memory segment.
+        path: Catalogue file to memory map instead.
+
+    Returns:
+        A SharedCatalogue.
+    """
+    if path is not None:
+        with open(path, "rb") as catalogue_file:
+            buffer = mmap.mmap(catalogue_file.fileno(), 0,
+                               access=mmap.ACCESS_READ)
+        return SharedCatalogue(memoryview(buffer), buffer)
+    try:
+        segment = shared_memory.SharedMemory(name, track=False)
+    except TypeError:
+        # Before Python 3.13 every process that attaches registers the
+        # segment and would unlink it on exit.
+        from multiprocessing import resource_tracker
+        segment = shared_memory.SharedMemory(name)
+        resource_tracker.unregister(segment._name, "shared_memory")
+    return SharedCatalogue(segment.buf, segment)
+
+
+class SharedCatalogue:
+    """A class used to read a published catalogue from a shared buffer."""
+
+    def __init__(self, buffer, owner):
+        """The SharedCatalogue class is initialized.
+
+        Args:
+            buffer: A memoryview of the published data.
+            owner: The SharedMemory or mmap object backing the buffer.
+        """
+        magic, *fields = _HEADER.unpack_from(buffer)
+        if magic != _MAGIC:
+            raise ValueError("Not a published video catalogue")
+        self._buffer = buffer
+        self._owner = owner
+        self.video_count, self.tag_count, self.group_count = fields[:3]
+        offsets = fields[3:]
+        ends = offsets[1:] + [len(buffer)]
+        self._sections = {}
+        # Every view must be released before the buffer can be closed.
+        self._views = []
+        for name, start, end in zip(_SECTIONS, offsets, ends):
+            typecode = _TYPECODES.get(name)
+            view = buffer[start:end]
+            self._views.append(view)
+            if typecode is not None:
+                itemsize = array(typecode).itemsize
+                view = view[:len(view) - len(view) % itemsize]
+                self._views.append(view)
+                view = view.cast(typecode)
+                self._views.append(view)
+            self._sections[name] = view
+        self._string_offsets = self._sections["string_offsets"]
+        self._strings = self._sections["strings"]
+        # Shared tag indexes are mapped to this process' tag dictionary
+        # lazily; there are only as many as there are distinct tags.
+        self._local_tag_ids = [None] * self.tag_count
+
+    @property
+    def nbytes(self):
+        """Returns the size of the published data in bytes."""
+        return len(self._buffer)
+
+    def close(self):
+        """Releases this process' view of the catalogue."""
+        for view in reversed(self._views):
+            view.release()
+        self._views.clear()
+        self._sections.clear()
+        self._string_offsets = self._strings = None
+        self._buffer.release()
+        self._owner.close()
+
+    def unlink(self):
+        """Removes a shared memory segment once every worker is done."""
+        self._owner.unlink()
+
+    def string(self, index):
+        """Returns a string of the string table."""
+        offsets = self._string_offsets
+        return str(self._strings[offsets[index]:offsets[index + 1]], "utf-8")
+
+    def tag_indexes(self, video_index):
+        """Returns the shared tag indexes of a video."""
+        indptr = self._sections["tag_indptr"]
+        return self._sections["tag_list"][
+            indptr[video_index]:indptr[video_index + 1]]
+
+    def tag_name(self, tag_index):
+        """Returns the name of a shared tag index."""
+        return self.string(2 * self.video_count + tag_index)
+
+    def title_key(self, video_index):
+        """Returns the case-folded title of a video, folded when the
+        catalogue was published."""
+        key = self.string(2 * self.video_count + self.tag_count
+                          + self.group_count + video_index)
+        return key or self.string(2 * video_index)
+
+    def local_tag_id(self, tag_index):
+        """Returns the id of a shared tag in this process' TAGS."""
+        tag_id = self._local_tag_ids[tag_index]
+        if tag_id is None:
+            tag_id = self._local_tag_ids[tag_index] = TAGS.add(
+                self.tag_name(tag_index))
+        return tag_id
+
+    def popularity(self, video_index):
+        """Returns the popularity of a video."""
+        return self._sections["popularity"][video_index]
+
+    def find_video(self, video_id):
+        """Returns the index of a video, or None if it does not exist."""
+        id_order = self._sections["id_order"]
+        low, high = 0, self.video_count
+        while low < high:
+            middle = (low + high) // 2
+            if self.string(2 * id_order[middle] + 1) < video_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.video_count and \
+                self.string(2 * id_order[low] + 1) == video_id:
+            return id_order[low]
+        return None
+
+    def find_group(self, video_tag):
+        """Returns the indexes of the videos with a tag, ignoring case."""
+        first = 2 * self.video_count + self.tag_count
+        key = TAGS.fold(video_tag)
+        keys = _StringRange(self, first, self.group_count)
+        group = bisect.bisect_left(keys, key)
+        if group == self.group_count or keys[group] != key:
+            return []
+        indptr = self._sections["group_indptr"]
+        return self._sections["group_postings"][
+            indptr[group]:indptr[group + 1]]
+
+
+class _StringRange(Sequence):
+    """A sequence view over consecutive strings of the string table."""
+
+    def __init__(self, catalogue, first, count):
+        self._catalogue = catalogue
+        self._first = first
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        return self._catalogue.string(self._first + index)
+
+
+class SharedVideo(Video):
+    """A class used to represent a Video read from a shared catalogue."""
+
+    def __init__(self, catalogue, index):
+        self._catalogue = catalogue
+        self._index = index
+
+    @property
+    def title(self):
+        return self._catalogue.string(2 * self._index)
+
+    @property
+    def title_key(self):
+        return self._catalogue.title_key(self._index)
+
+    @property
+    def video_id(self):
+        return self._catalogue.string(2 * self._index + 1)
+
+    @property
+    def tags(self):
+        return tuple(self._catalogue.tag_name(tag_index) for tag_index
+                     in self._catalogue.tag_indexes(self._index))
+
+    @property
+    def tag_ids(self):
+        return tuple(self._catalogue.local_tag_id(tag_index) for tag_index
+                     in self._catalogue.tag_indexes(self._index))
+
+    @property
+    def popularity(self):
+        return self._catalogue.popularity(self._index)
+
+
+class _SharedVideoList(Sequence):
+    """A sequence of SharedVideo views over video indexes."""
+
+    def __init__(self, catalogue, indexes):
+        self._catalogue = catalogue
+        self._indexes = indexes
+
+    def __len__(self):
+        return len(self._indexes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return _SharedVideoList(self._catalogue, self._indexes[index])
+        return SharedVideo(self._catalogue, self._indexes[index])
+
+
+class SharedVideoLibrary:
+    """A class used to represent a read-only Video Library backed by a
+    SharedCatalogue. It can be passed to VideoPlayer in place of a
+    VideoLibrary."""
+
+    def __init__(self, catalogue):
+        """The SharedVideoLibrary class is initialized.
+
+        Args:
+            catalogue: The SharedCatalogue to read videos from.
+        """
+        self._catalogue = catalogue
+
+    def get_all_videos(self):
+        """Returns a sequence of all videos in the library."""
+        return _SharedVideoList(self._catalogue,
+                                range(self._catalogue.video_count))
+
+    def get_video(self, video_id):
+        """Returns the Video for a video_id, or None if it does not exist."""
+        index = self._catalogue.find_video(video_id)
+        if index is None:
+            return None
+        return SharedVideo(self._catalogue, index)
+
+    def get_videos_with_tag(self, video_tag):
+        """Returns all videos that have the given tag."""
+        return list(_SharedVideoList(self._catalogue,
+                                     self._catalogue.find_group(video_tag)))
+
+    def memory_usage(self, sample=256):
+        """Returns the size in bytes of the shared catalogue, which every
+        process attached to it shares."""
+        return self._catalogue.nbytes
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    publish(VideoLibrary(*sys.argv[2:]), path=sys.argv[1]).close()
@@ -0,0 +1,99 @@
+"""A tag dictionary class."""
+
+from array import array
+import sys
+import threading
+
+from .memory_usage import sampled_size
+from .text_key import fold
+
+
+class TagDictionary:
+    """A class used to map tag strings to small integer ids.
+
+    Every distinct tag string is stored (interned) only once, and videos
+    keep their tags as packed arrays of ids. Tags that only differ in case
+    share a group id, which is what tag searches compare.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._names = []
+        self._group_ids = array("I")
+        self._groups = {}
+        # The case-folded key of every group id.
+        self._keys = []
+        # Sources may be loaded on several threads at once.
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._names)
+
+    def memory_usage(self, sample=256):
+        """Returns the approximate size in bytes of the dictionary.
+
+        Args:
+            sample: How many tag names and groups to size at most.
+        """
+        return (sys.getsizeof(self._ids) + sys.getsizeof(self._names)
+                + sys.getsizeof(self._group_ids) + sys.getsizeof(self._groups)
+                + sys.getsizeof(self._keys)
+                + sampled_size(self._names, sys.getsizeof, sample)
+                + sampled_size(self._groups.keys(), sys.getsizeof, sample))
+
+    def add(self, tag):
+        """Returns the id of a tag, adding the tag if it is new."""
+        tag_id = self._ids.get(tag)
+        if tag_id is None:
+            with self._lock:
+                tag_id = self._ids.get(tag)
+                if tag_id is None:
+                    tag_id = len(self._names)
+                    tag = sys.intern(tag)
+                    self._names.append(tag)
+                    key = self.fold(tag)
+                    group_id = self._groups.get(key)
+                    if group_id is None:
+                        group_id = self._groups[key] = len(self._keys)
+                        self._keys.append(key)
+                    self._group_ids.append(group_id)
+                    self._ids[tag] = tag_id
+        return tag_id
+
+    def encode(self, tags):
+        """Returns the tags packed into an immutable bytes array of ids."""
+        if not tags:
+            return b""
+        return array("I", [self.add(tag) for tag in tags]).tobytes()
+
+    def decode(self, tag_ids):
+        """Returns the tuple of tag strings packed by encode."""
+        names = self._names
+        return tuple(names[tag_id] for tag_id in memoryview(tag_ids).cast("I"))
+
+    def name(self, tag_id):
+        """Returns the tag string of an id."""
+        return self._names[tag_id]
+
+    def group(self, tag_id):
+        """Returns the case-insensitive group id of a tag id."""
+        return self._group_ids[tag_id]
+
+    def key(self, tag_id):
+        """Returns the case-folded key of a tag id, the same for every
+        tag of its group."""
+        return self._keys[self._group_ids[tag_id]]
+
+    def find_group(self, tag):
+        """Returns the group id matching a tag case-insensitively, or None
+        if no video has the tag."""
+        return self._groups.get(self.fold(tag))
+
+    @staticmethod
+    def fold(tag):
+        """Returns the key tags are compared by."""
+        return fold(tag)
+
+
+# The dictionary shared by every video.
+TAGS = TagDictionary()
@@ -0,0 +1,20 @@
+"""The key titles, tags and playlist names are compared by."""
+
+import unicodedata
+
+
+def fold(text):
+    """Returns the case-insensitive comparison key of a text.
+
+    The text is NFKC normalised and case folded, so e.g. "STRASSE" and
+    "Straße", or full-width and ordinary letters, get the same key. It is
+    normalised again after folding, as folding can undo the first
+    normalisation. ASCII text only needs lower().
+
+    Args:
+        text: The text to fold.
+    """
+    if text.isascii():
+        return text.lower()
+    return unicodedata.normalize(
+        "NFKC", unicodedata.normalize("NFKC", text).casefold())
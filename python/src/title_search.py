@@ -0,0 +1,183 @@
+"""A ranked full-text video search class."""
+
+import heapq
+import math
+import re
+import sys
+from array import array
+
+from .memory_usage import object_size, sampled_size
+from .tag_dictionary import TAGS
+from .text_key import fold
+
+_WORD = re.compile(r"[^\W_]+")
+
+# Suffixes the stemmer strips, longest first, with what replaces them.
+_SUFFIXES = (("ingly", ""), ("edly", ""), ("ing", ""), ("ies", "y"),
+             ("ied", "y"), ("ed", ""), ("es", ""), ("s", ""))
+
+
+def stem(word):
+    """Returns a light stem of a lower case English word, so that e.g.
+    "cats", "playing" and "played" match "cat" and "play".
+
+    Args:
+        word: The word to stem.
+    """
+    for suffix, replacement in _SUFFIXES:
+        if not word.endswith(suffix):
+            continue
+        base = word[:-len(suffix)]
+        if len(base) + len(replacement) < 3:
+            return word
+        if suffix == "s" and base.endswith(("s", "u")):
+            # "class" and "virus" are not plurals.
+            return word
+        if suffix == "es" and not base.endswith(("s", "x", "z", "ch", "sh")):
+            # "games" is "game" + "s", which the last rule strips.
+            continue
+        if suffix in ("ing", "ed", "ingly", "edly") and len(base) > 3 and \
+                base[-1] == base[-2] and base[-1] not in "lsz":
+            # "running" is "run" + "ing".
+            base = base[:-1]
+        return base + replacement
+    return word
+
+
+def tokenize(text):
+    """Returns the stemmed lower case words of a text, in order.
+
+    Args:
+        text: The text to split into words.
+    """
+    return [stem(word) for word in _WORD.findall(fold(text))]
+
+
+def _encode(values, out):
+    """Appends unsigned integers to a bytearray as varints."""
+    for value in values:
+        while value >= 0x80:
+            out.append(value & 0x7F | 0x80)
+            value >>= 7
+        out.append(value)
+
+
+def _decode(data):
+    """Yields the unsigned integers of a varint encoded bytearray."""
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            yield value
+            value = shift = 0
+
+
+class TitleSearch:
+    """A class used to find the videos that best match a free text query,
+    using BM25 over the words of their titles and tags.
+
+    The index maps every word to a posting list of (video, count) pairs
+    in catalogue order. Posting lists are stored as varint encoded gaps
+    between videos followed by the count, which takes a byte or two per
+    entry. A query only decodes the posting lists of its own words and
+    keeps the best results with a heap, so it never visits the videos
+    that share no word with it.
+    """
+
+    def __init__(self, video_library, include_tags=True, k1=1.2, b=0.75):
+        """Builds the index of every video in the library.
+
+        Args:
+            video_library: The VideoLibrary to search.
+            include_tags: Whether the words of tags are searched as well
+                as the words of titles.
+            k1: How quickly repeating a word stops raising the score.
+            b: How much long titles are penalised, from 0 to 1.
+        """
+        self._videos = list(video_library.get_all_videos())
+        self._include_tags = include_tags
+        self._k1 = k1
+        self._b = b
+        self._lengths = array("I")
+        postings = {}
+        for row, video in enumerate(self._videos):
+            words = self.terms_of(video, unique=False)
+            self._lengths.append(len(words))
+            counts = {}
+            for word in words:
+                counts[word] = counts.get(word, 0) + 1
+            for word, count in counts.items():
+                postings.setdefault(word, []).append((row, count))
+        self._average_length = (sum(self._lengths) / len(self._lengths)
+                                if len(self._lengths) else 0.0)
+        # word to (number of videos, varint encoded postings).
+        self._postings = {}
+        for word, entries in postings.items():
+            data = bytearray()
+            previous = 0
+            for row, count in entries:
+                _encode((row - previous, count), data)
+                previous = row
+            self._postings[word] = (len(entries), bytes(data))
+
+    def __len__(self):
+        return len(self._videos)
+
+    def memory_usage(self, sample=256):
+        """Returns the approximate size in bytes of the index, leaving out
+        the videos it refers to.
+
+        Args:
+            sample: How many posting lists to size at most.
+        """
+        return (sys.getsizeof(self._postings) + sys.getsizeof(self._lengths)
+                + sys.getsizeof(self._videos) + sampled_size(
+                    self._postings.items(), lambda item: object_size(item, 2),
+                    sample))
+
+    def terms_of(self, video, unique=True):
+        """Returns the indexed words of a video.
+
+        Args:
+            video: The Video to split into words.
+            unique: Whether to return a set rather than every word.
+        """
+        words = tokenize(video.title)
+        if self._include_tags:
+            for tag_id in video.tag_ids:
+                words.extend(tokenize(TAGS.name(tag_id)))
+        return set(words) if unique else words
+
+    def search(self, query, count=10, is_flagged=lambda video_id: False):
+        """Returns up to count (video, score) pairs of the videos that
+        best match a query, best first, leaving out flagged videos.
+
+        Args:
+            query: The words to search for.
+            count: The maximum number of videos to return.
+            is_flagged: Callable telling whether a video_id is flagged.
+        """
+        scores = {}
+        total = len(self._videos)
+        k1, b = self._k1, self._b
+        average = self._average_length or 1.0
+        for word in dict.fromkeys(tokenize(query)):
+            documents, data = self._postings.get(word, (0, b""))
+            if documents == 0:
+                continue
+            idf = math.log(1 + (total - documents + 0.5) / (documents + 0.5))
+            values = _decode(data)
+            row = 0
+            # The posting list alternates gaps and counts.
+            for gap, frequency in zip(values, values):
+                row += gap
+                norm = k1 * (1 - b + b * self._lengths[row] / average)
+                scores[row] = scores.get(row, 0.0) + \
+                    idf * frequency * (k1 + 1) / (frequency + norm)
+        # Ties are kept in catalogue order.
+        best = heapq.nlargest(
+            count, ((score, -row) for row, score in scores.items()
+                    if not is_flagged(self._videos[row].video_id)))
+        return [(self._videos[-row], score) for score, row in best]
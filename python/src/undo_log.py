@@ -0,0 +1,96 @@
+"""An undo log class."""
+
+import collections
+import contextlib
+import sys
+import threading
+
+from .memory_usage import object_size, sampled_size
+
+
+class UndoLog:
+    """A class used to keep the most recent changes that can be undone
+    and redone.
+
+    Every change is recorded as a small tuple naming the operation and
+    whatever is needed to reverse it, never as a copy of the state it
+    changed. Only the last depth changes are kept.
+    """
+
+    def __init__(self, depth=100, thread_safe=False):
+        """The UndoLog class is initialized.
+
+        Args:
+            depth: How many changes can be undone. 0 disables the log.
+            thread_safe: Whether changes may be recorded from several
+                threads at once.
+        """
+        self._undo = collections.deque(maxlen=depth)
+        self._redo = collections.deque(maxlen=depth)
+        self._lock = threading.Lock() if thread_safe else \
+            contextlib.nullcontext()
+
+    @property
+    def enabled(self):
+        """Returns whether changes are recorded at all."""
+        return self._undo.maxlen > 0
+
+    def record(self, change):
+        """Records a new change, which discards every change that was
+        undone and could have been redone."""
+        with self._lock:
+            self._undo.append(change)
+            self._redo.clear()
+
+    def pop_undo(self):
+        """Returns the most recent change and moves it to the redo
+        stack, or returns None if there is nothing to undo."""
+        with self._lock:
+            if len(self._undo) == 0:
+                return None
+            change = self._undo.pop()
+            self._redo.append(change)
+            return change
+
+    def pop_redo(self):
+        """Returns the most recently undone change and moves it back to
+        the undo stack, or returns None if there is nothing to redo."""
+        with self._lock:
+            if len(self._redo) == 0:
+                return None
+            change = self._redo.pop()
+            self._undo.append(change)
+            return change
+
+    def discard(self, predicate):
+        """Drops every change, undone or not, that a predicate is true
+        for, e.g. because it cannot be reversed or made again any more.
+
+        Args:
+            predicate: Callable taking a change.
+        """
+        with self._lock:
+            for changes in (self._undo, self._redo):
+                kept = [change for change in changes if not predicate(change)]
+                if len(kept) != len(changes):
+                    changes.clear()
+                    changes.extend(kept)
+
+    def changes(self):
+        """Returns every change that can be undone or redone."""
+        with self._lock:
+            return list(self._undo) + list(self._redo)
+
+    def memory_usage(self, sample=256):
+        """Returns the approximate size in bytes of the recorded changes,
+        leaving out the playlists they refer to.
+
+        Args:
+            sample: How many changes to size at most.
+        """
+        return sys.getsizeof(self._undo) + sys.getsizeof(self._redo) + \
+            sampled_size(self.changes(), lambda change: object_size(change, 1),
+                         sample)
+
+    def __len__(self):
+        return len(self._undo)
@@ -1,25 +1,57 @@
 """A video class."""
 
+import math
+
+from .tag_dictionary import TAGS
+from .text_key import fold
 from typing import Sequence
 
 
 class Video:
     """A class used to represent a Video."""
 
-    def __init__(self, video_title: str, video_id: str, video_tags: Sequence[str]):
-        """Video constructor."""
+    def __init__(self, video_title: str, video_id: str,
+                 video_tags: Sequence[str], popularity: float = 1.0):
+        """Video constructor.
+
+        Raises ValueError if the popularity is negative or not finite, as
+        random plays weighted by it could not be drawn.
+        """
+        if not 0 <= popularity < math.inf:
+            raise ValueError(
+                f"Invalid popularity {popularity} for video {video_id}")
         self._title = video_title
+        # The key searches compare the title by, shared with the title
+        # itself when folding does not change it.
+        title_key = fold(video_title)
+        self._title_key = video_title if title_key == video_title \
+            else title_key
         self._video_id = video_id
+        self._popularity = popularity
+
+        # Store the tags as packed ids from the shared tag dictionary. The
+        # bytes are unmodifiable, in case the caller changes the
+        # 'video_tags' they passed to us
+        self._tag_ids = TAGS.encode(video_tags)
 
-        # Turn the tags into a tuple here so it's unmodifiable,
-        # in case the caller changes the 'video_tags' they passed to us
-        self._tags = tuple(video_tags)
+    def __eq__(self, other):
+        if not isinstance(other, Video):
+            return NotImplemented
+        return self.video_id == other.video_id
+
+    def __hash__(self):
+        return hash(self.video_id)
 
     @property
     def title(self) -> str:
         """Returns the title of a video."""
         return self._title
 
+    @property
+    def title_key(self) -> str:
+        """Returns the case-folded title searches compare by."""
+        return self._title_key
+
     @property
     def video_id(self) -> str:
         """Returns the video id of a video."""
@@ -28,4 +60,14 @@ class Video:
     @property
     def tags(self) -> Sequence[str]:
         """Returns the list of tags of a video."""
-        return self._tags
+        return TAGS.decode(self._tag_ids)
+
+    @property
+    def tag_ids(self) -> Sequence[int]:
+        """Returns the ids of the tags of a video in the tag dictionary."""
+        return memoryview(self._tag_ids).cast("I")
+
+    @property
+    def popularity(self) -> float:
+        """Returns the popularity weight of a video."""
+        return self._popularity
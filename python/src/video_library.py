@@ -1,32 +1,36 @@
 """A video library class."""
 
-from .video import Video
+from .catalogue_source import load_sources
+from .memory_usage import sampled_size
+from .tag_dictionary import TAGS
 from pathlib import Path
-import csv
-
-
-# Helper Wrapper around CSV reader to strip whitespace from around
-# each item.
-def _csv_reader_with_strip(reader):
-    yield from ((item.strip() for item in line) for line in reader)
+import sys
 
 
 class VideoLibrary:
     """A class used to represent a Video Library."""
 
-    def __init__(self):
-        """The VideoLibrary class is initialized."""
+    def __init__(self, *sources, max_workers=None):
+        """The VideoLibrary class is initialized.
+
+        Args:
+            sources: Catalogue sources to load and merge, see
+                catalogue_source.as_source. Files, directories of shard
+                files, compressed files and iterables of videos can be
+                mixed. The bundled videos.txt is loaded if none are given.
+            max_workers: The maximum number of threads loading sources.
+        """
         self._videos = {}
-        with open(Path(__file__).parent / "videos.txt") as video_file:
-            reader = _csv_reader_with_strip(
-                csv.reader(video_file, delimiter="|"))
-            for video_info in reader:
-                title, url, tags = video_info
-                self._videos[url] = Video(
-                    title,
-                    url,
-                    [tag.strip() for tag in tags.split(",")] if tags else [],
-                )
+        self._tag_index = {}
+        if not sources:
+            sources = [Path(__file__).parent / "videos.txt"]
+        # Later sources win if the same video_id appears more than once.
+        for video in load_sources(sources, max_workers):
+            self._videos[video.video_id] = video
+        for video in self._videos.values():
+            for group in dict.fromkeys(
+                    TAGS.group(tag_id) for tag_id in video.tag_ids):
+                self._tag_index.setdefault(group, []).append(video)
 
     def get_all_videos(self):
         """Returns all available video information from the video library."""
@@ -43,3 +47,25 @@ class VideoLibrary:
             does not exist.
         """
         return self._videos.get(video_id, None)
+
+    def get_videos_with_tag(self, video_tag):
+        """Returns all videos that have the given tag.
+
+        Args:
+            video_tag: The tag to look up, compared case-insensitively.
+
+        Returns:
+            A list of Video objects, empty if no video has the tag.
+        """
+        return list(self._tag_index.get(TAGS.find_group(video_tag), ()))
+
+    def memory_usage(self, sample=256):
+        """Returns the approximate size in bytes of the video and tag
+        indexes, leaving out the videos themselves.
+
+        Args:
+            sample: How many tag index entries to size at most.
+        """
+        return (sys.getsizeof(self._videos) + sys.getsizeof(self._tag_index)
+                + sampled_size(self._tag_index.values(), sys.getsizeof,
+                               sample))
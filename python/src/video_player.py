@@ -2,41 +2,191 @@
 
 from numpy import true_divide
 from .video_library import VideoLibrary
-import random
+from .video import Video
 from .video_playlist import Playlist
+from .lru_cache import LRUCache
+from .player_output import Result, TextRenderer
+from .tag_dictionary import TAGS
+from .text_key import fold
+from .prefix_index import PrefixIndex
+from .related_videos import RelatedVideos
+from .title_search import TitleSearch, tokenize
+import heapq
+import contextlib
+import threading
+from .video_sampler import VideoSampler
+from . import playback_history
+from .playback_history import PlaybackHistory
+from .playback_queue import PlaybackQueue, REPEAT_OFF
+from .playback_clock import PlaybackClock, PlaybackSession
+from .undo_log import UndoLog
+from .memory_usage import AllocationTracer, object_size, sampled_size
+from collections import OrderedDict
+import itertools
+import sys
+
+# Command names of the changes kept in the undo log.
+_CHANGE_COMMANDS = {
+    "create": "CREATE_PLAYLIST",
+    "add": "ADD_TO_PLAYLIST",
+    "remove": "REMOVE_FROM_PLAYLIST",
+    "clear": "CLEAR_PLAYLIST",
+    "delete": "DELETE_PLAYLIST",
+    "flag": "FLAG_VIDEO",
+    "allow": "ALLOW_VIDEO",
+    "flag_many": "FLAG_MANY",
+    "allow_many": "ALLOW_MANY",
+}
 
 
 class VideoPlayer:
     """A class used to represent a Video Player."""
 
-    def __init__(self):
-        self._video_library = VideoLibrary()
+    def __init__(self, video_library=None, row_cache_size=100000,
+                 search_cache_size=1024, thread_safe=False, output=None,
+                 undo_depth=100, queue_prefetch=10, clock=None,
+                 video_duration=None):
+        """The VideoPlayer class is initialized.
+
+        Args:
+            video_library: Optional VideoLibrary to play videos from. The
+                bundled library is loaded if none is given.
+            row_cache_size: How many formatted video rows the default
+                text output caches.
+            search_cache_size: How many search results to cache.
+            thread_safe: Whether commands may be run from several threads
+                at once. The library is read-only and needs no locks;
+                playback state, the playlist dict and every playlist get
+                their own lock, and flags are replaced copy-on-write so
+                readers never lock them.
+            output: Optional renderer the results of every command are
+                written to, a TextRenderer printing to stdout by default.
+            undo_depth: How many playlist and flag changes can be undone.
+            queue_prefetch: How many of the next videos of a playing
+                playlist are looked up in advance.
+            clock: Optional PlaybackClock the playback position is kept
+                on. Players sharing a clock are simulated together.
+            video_duration: Optional callable returning the length of a
+                Video in seconds.
+        """
+        if video_library is None:
+            video_library = VideoLibrary()
+        self._video_library = video_library
+        self._thread_safe = thread_safe
+        self._playback_lock = self._new_lock(reentrant=True)
+        self._playlists_lock = self._new_lock()
+        self._flag_lock = self._new_lock()
+        self._flag_version = 0
+        self._flag_timers = {}
         self._current_video = None
         self._paused = False
+        self._queue = None
+        self._shuffle = False
+        self._repeat = REPEAT_OFF
+        self._queue_prefetch = queue_prefetch
+        self._clock = clock if clock is not None else PlaybackClock()
+        self._session = PlaybackSession(
+            self._clock, self._video_ended, video_duration)
         self._playlists = {}
+        # Playlists map each video_id to the order it was added in.
+        self._playlist_order = itertools.count()
         self._flagged = {}
+        self._playlist_index = PrefixIndex()
+        # The title and tag name PrefixIndexes, replaced together.
+        self._suggest_indexes = None
+        self._related = None
+        self._ranked_index = None
+        self._history = PlaybackHistory()
+        if output is None:
+            output = TextRenderer(row_cache_size=row_cache_size,
+                                  thread_safe=thread_safe)
+        self._output = output
+        self._search_cache = LRUCache(search_cache_size, thread_safe)
+        self._undo_log = UndoLog(undo_depth, thread_safe)
+        self._tracer = AllocationTracer()
+        self._sampler = VideoSampler(
+            self._video_library, lambda video_id: video_id in self._flagged)
+
+    def _new_lock(self, reentrant=False):
+        """Returns a new lock, or a no-op stand-in if the player is not
+        thread-safe."""
+
+        if not self._thread_safe:
+            return contextlib.nullcontext()
+        return threading.RLock() if reentrant else threading.Lock()
+
+    def _cache_put(self, cache, key, value, flag_version):
+        """Caches a value computed from the flags of flag_version, unless
+        the flags changed while it was being computed."""
+
+        cache.put(key, value)
+        if flag_version != self._flag_version:
+            cache.pop(key)
+
+    def _update_flags(self, flagged=None, allowed=(), ttl=None):
+        """Flags and allows videos. Must be called with the flag lock held.
+
+        In thread-safe mode the flag dict is replaced by an updated copy,
+        so readers can use self._flagged without locking.
+
+        Args:
+            flagged: Optional dict of video_id to flag reason to add.
+            allowed: The video_ids whose flags should be removed.
+            ttl: Optional number of seconds after which the new flags
+                expire on their own.
+        """
+
+        flags = dict(self._flagged) if self._thread_safe else self._flagged
+        if flagged:
+            flags.update(flagged)
+        for video_id in allowed:
+            flags.pop(video_id, None)
+        # Every flag that is replaced or removed loses its expiry timer.
+        if self._flag_timers:
+            for video_id in itertools.chain(flagged or (), allowed):
+                timer = self._flag_timers.pop(video_id, None)
+                if timer is not None:
+                    self._clock.cancel(timer)
+        if ttl is not None:
+            for video_id in flagged or ():
+                self._flag_timers[video_id] = self._clock.schedule(
+                    ttl, lambda video_id=video_id: self._expire_flag(video_id))
+        self._flag_version += 1
+        self._flagged = flags
+
+    def _expire_flag(self, video_id):
+        """Removes a time-limited flag once its time is up."""
+
+        with self._flag_lock:
+            if self._flag_timers.pop(video_id, None) is None:
+                return
+            self._update_flags(allowed=[video_id])
+            video = self._video_library.get_video(video_id)
+            self._invalidate_video(video)
+        self._emit("flag_expired", title=video.title)
+
+    @property
+    def output(self):
+        """Returns the renderer command results are written to."""
+        return self._output
+
+    def _emit(self, code, **fields):
+        """Writes a result of the current command to the output."""
+
+        self._output.render(Result(code, **fields))
 
     def number_of_videos(self):
         num_videos = len(self._video_library.get_all_videos())
-        print(f"{num_videos} videos in the library")
+        self._emit("number_of_videos", count=num_videos)
 
     def show_all_videos(self):
         """Returns all videos."""
 
-        video_list = self._video_library.get_all_videos()
-        video_titles = []
-        for video in video_list:
-            video_titles.append(video.title)
-        sorted_titles = sorted(video_titles)
-        print("Here's a list of all available videos:")
-        for sorted_title in sorted_titles:
-            for video in video_list:
-                if sorted_title == video.title:
-                    if self._flagged.get(video.video_id) != None:
-                        print(f"{video.title} ({video.video_id}) [{' '.join(video.tags)}] - FLAGGED (reason: {self._flagged[video.video_id]})")
-                    else:
-                        print(
-                            f"{video.title} ({video.video_id}) [{' '.join(video.tags)}]")
+        video_list = sorted(self._video_library.get_all_videos(),
+                            key=lambda video: video.title)
+        flagged = self._flagged
+        self._emit("all_videos", items=(
+            (video, flagged.get(video.video_id)) for video in video_list))
 
     def play_video(self, video_id):
         """Plays the respective video.
@@ -47,71 +197,280 @@ class VideoPlayer:
 
         video = self._video_library.get_video(video_id)
 
-        if not video:
-            print("Cannot play video: Video does not exist")
-        elif self._flagged.get(video_id) != None:
-            print(
-                f"Cannot play video: Video is currently flagged (reason: {self._flagged[video_id]})")
-        elif self._current_video != None:
-            print(f"Stopping video: {self._current_video.title}")
-            print(f"Playing video: {video.title}")
-            self._current_video = video
-            self._paused = False
-        else:
-            print(f"Playing video: {video.title}")
-            self._current_video = video
+        # Flags are checked under the playback lock, so a video flagged
+        # concurrently is either refused here or stopped by flag_video.
+        with self._playback_lock:
+            flagged = self._flagged
+            if not video:
+                self._emit("play.not_found")
+            elif flagged.get(video_id) != None:
+                self._emit("play.flagged", reason=flagged[video_id])
+            elif self._current_video != None:
+                self._emit("stopping", title=self._current_video.title)
+                self._history.record(
+                    playback_history.STOP, self._current_video)
+                self._emit("playing", title=video.title)
+                self._current_video = video
+                self._paused = False
+                self._history.record(playback_history.PLAY, video)
+                self._session.start(video)
+            else:
+                self._emit("playing", title=video.title)
+                self._current_video = video
+                self._paused = False
+                self._history.record(playback_history.PLAY, video)
+                self._session.start(video)
 
     def stop_video(self):
         """Stops the current video."""
 
-        if self._current_video == None:
-            print("Cannot stop video: No video is currently playing")
-        else:
-            print(f"Stopping video: {self._current_video.title}")
-            self._current_video = None
+        with self._playback_lock:
+            if self._current_video == None:
+                self._emit("stop.not_playing")
+            else:
+                self._emit("stopping", title=self._current_video.title)
+                self._history.record(
+                    playback_history.STOP, self._current_video)
+                self._current_video = None
+                self._session.stop()
 
-    def play_random_video(self):
-        """Plays a random video from the video library."""
+    def _video_ended(self, video):
+        """Moves on from a video that played to its end, to the next video
+        of the playing playlist if there is one."""
 
-        for key in self._video_library._videos:
-            if self._flagged.get(key) == None:
-                self.play_video(key)
+        with self._playback_lock:
+            if self._current_video != video:
                 return
-        print("No videos available")
+            if self._queue != None:
+                next_video = self._queue.next()
+                if next_video != None:
+                    self.play_video(next_video.video_id)
+                    return
+            self.stop_video()
+
+    def advance_clock(self, seconds):
+        """Lets simulated time pass, playing videos on as they end.
+
+        Args:
+            seconds: How many seconds to advance the playback clock by.
+        """
+
+        self._clock.advance(seconds)
+        self._emit("clock_advanced", seconds=seconds)
+
+    def show_position(self):
+        """Displays how far into the current video playback is."""
+
+        with self._playback_lock:
+            session = self._session
+            if self._current_video == None:
+                self._emit("playing_video.none")
+            else:
+                self._emit("position", title=self._current_video.title,
+                           position=session.position,
+                           duration=session.duration,
+                           elapsed=session.elapsed, paused=session.paused)
+
+    def play_random_video(self, video_tag=None, weighted=False):
+        """Plays a random video from the video library.
+
+        Args:
+            video_tag: Optional tag the random video must have.
+            weighted: Whether to favour videos by their popularity.
+        """
+
+        video = self._sampler.sample(video_tag, weighted)
+        if video == None:
+            self._emit("random.unavailable")
+        else:
+            self.play_video(video.video_id)
 
     def pause_video(self):
         """Pauses the current video."""
 
-        if self._current_video == None:
-            print("Cannot pause video: No video is currently playing")
-        elif self._paused == False:
-            self._paused = True
-            print(f"Pausing video: {self._current_video.title}")
-        else:
-            print(f"Video already paused: {self._current_video.title}")
+        with self._playback_lock:
+            if self._current_video == None:
+                self._emit("pause.not_playing")
+            elif self._paused == False:
+                self._paused = True
+                self._emit("pausing", title=self._current_video.title)
+                self._history.record(
+                    playback_history.PAUSE, self._current_video)
+                self._session.pause()
+            else:
+                self._emit("pause.already_paused",
+                           title=self._current_video.title)
 
     def continue_video(self):
         """Resumes playing the current video."""
 
-        if self._current_video == None:
-            print("Cannot continue video: No video is currently playing")
-        elif self._paused == True:
-            self._paused = False
-            print(f"Continuing video: {self._current_video.title}")
-        else:
-            print(f"Cannot continue video: Video is not paused")
+        with self._playback_lock:
+            if self._current_video == None:
+                self._emit("continue.not_playing")
+            elif self._paused == True:
+                self._paused = False
+                self._emit("continuing", title=self._current_video.title)
+                self._history.record(
+                    playback_history.CONTINUE, self._current_video)
+                self._session.resume()
+            else:
+                self._emit("continue.not_paused")
 
     def show_playing(self):
         """Displays video currently playing."""
 
-        if self._current_video == None:
-            print("No video is currently playing")
-        elif self._paused == False:
-            print(
-                f"Currently playing: {self._current_video.title} ({self._current_video.video_id}) [{' '.join(self._current_video.tags)}]")
-        else:
-            print(
-                f"Currently playing: {self._current_video.title} ({self._current_video.video_id}) [{' '.join(self._current_video.tags)}] - PAUSED")
+        with self._playback_lock:
+            if self._current_video == None:
+                self._emit("playing_video.none")
+            else:
+                self._emit("now_playing", video=(self._current_video, None),
+                           paused=self._paused)
+
+    def play_playlist(self, playlist_name):
+        """Plays a playlist from its first video, or in a random order if
+        shuffle is on.
+
+        Args:
+            playlist_name: The playlist name.
+        """
+
+        playlist = self._playlists.get(fold(playlist_name))
+        if playlist == None:
+            self._emit("play_playlist.no_playlist",
+                       playlist_name=playlist_name)
+            return
+        queue = PlaybackQueue(
+            playlist, self._video_library,
+            lambda video_id: video_id in self._flagged,
+            shuffle=self._shuffle, repeat=self._repeat,
+            prefetch=self._queue_prefetch)
+        with self._playback_lock:
+            video = queue.next()
+            if video == None:
+                self._emit("play_playlist.empty", playlist_name=playlist_name)
+            else:
+                self._queue = queue
+                self.play_video(video.video_id)
+
+    def play_next(self):
+        """Plays the next video of the playing playlist."""
+
+        with self._playback_lock:
+            if self._queue == None:
+                self._emit("next.no_queue")
+                return
+            video = self._queue.next()
+            if video == None:
+                self._emit("next.end",
+                           playlist_name=self._queue.playlist._name)
+            else:
+                self.play_video(video.video_id)
+
+    def play_previous(self):
+        """Plays the video of the playing playlist that was played before
+        the current one."""
+
+        with self._playback_lock:
+            if self._queue == None:
+                self._emit("previous.no_queue")
+                return
+            video = self._queue.previous()
+            if video == None:
+                self._emit("previous.none")
+            else:
+                self.play_video(video.video_id)
+
+    def set_shuffle(self, shuffle):
+        """Switches shuffling playlists on or off, including the rest of
+        the playlist that is playing.
+
+        Args:
+            shuffle: Whether to play playlists in a random order.
+        """
+
+        with self._playback_lock:
+            self._shuffle = shuffle
+            if self._queue != None:
+                self._queue.set_shuffle(shuffle)
+        self._emit("shuffle_set", state="on" if shuffle else "off")
+
+    def set_repeat(self, repeat):
+        """Sets whether playlists repeat.
+
+        Args:
+            repeat: "off", "one" to repeat the current video or "all" to
+                start the playlist over once it ends.
+        """
+
+        with self._playback_lock:
+            self._repeat = repeat
+            if self._queue != None:
+                self._queue.set_repeat(repeat)
+        self._emit("repeat_set", mode=repeat)
+
+    def show_queue(self):
+        """Displays the next videos of the playing playlist."""
+
+        with self._playback_lock:
+            queue = self._queue
+            if queue == None:
+                self._emit("queue.none")
+                return
+            upcoming = queue.upcoming()
+        self._emit("queue", playlist_name=queue.playlist._name,
+                   shuffle="on" if queue.shuffle else "off",
+                   repeat=queue.repeat,
+                   items=((video, None) for video in upcoming))
+
+    def show_history(self, count=10):
+        """Displays the most recent playback events.
+
+        Args:
+            count: The maximum number of events to display.
+        """
+
+        with self._playback_lock:
+            events = self._history.recent(count)
+        library = self._video_library
+        items = []
+        for timestamp, event, video_id in events:
+            video = library.get_video(video_id)
+            # Videos removed by reload_library are left out.
+            if video != None:
+                items.append({"timestamp": timestamp, "event": event,
+                              "video_id": video_id, "title": video.title})
+        if len(items) == 0:
+            self._emit("history.empty")
+            return
+        self._emit("history", items=iter(items))
+
+    def show_top_played(self, count=10):
+        """Displays the most played videos.
+
+        Args:
+            count: The maximum number of videos to display.
+        """
+
+        with self._playback_lock:
+            top_played = self._history.top_played(count)
+        if len(top_played) == 0:
+            self._emit("top_played.empty")
+            return
+        self._emit("top_played", items=(
+            {"rank": index + 1, "video_id": video_id, "plays": plays,
+             "title": self._video_library.get_video(video_id).title}
+            for index, (video_id, plays) in enumerate(top_played)))
+
+    def show_tag_plays(self):
+        """Displays how many times videos with each tag were played."""
+
+        with self._playback_lock:
+            tag_plays = self._history.tag_play_counts()
+        if len(tag_plays) == 0:
+            self._emit("tag_plays.empty")
+            return
+        self._emit("tag_plays", items=(
+            {"tag": tag, "plays": plays} for tag, plays in tag_plays))
 
     def create_playlist(self, playlist_name):
         """Creates a playlist with a given name.
@@ -120,11 +479,15 @@ class VideoPlayer:
             playlist_name: The playlist name.
         """
 
-        if self._playlists.get(playlist_name.lower()) != None:
-            print("Cannot create playlist: A playlist with the same name already exists")
-        else:
-            self._playlists[playlist_name.lower()] = Playlist(playlist_name)
-            print(f"Successfully created new playlist: {playlist_name}")
+        with self._playlists_lock:
+            if self._playlists.get(fold(playlist_name)) != None:
+                self._emit("create_playlist.exists")
+            else:
+                playlist = Playlist(playlist_name, self._thread_safe)
+                self._playlists[fold(playlist_name)] = playlist
+                self._playlist_index.add(playlist_name)
+                self._undo_log.record(("create", playlist))
+                self._emit("playlist_created", playlist_name=playlist_name)
 
     def add_to_playlist(self, playlist_name, video_id):
         """Adds a video to a playlist with a given name.
@@ -134,30 +497,38 @@ class VideoPlayer:
             video_id: The video_id to be added.
         """
 
-        if self._playlists.get(playlist_name.lower()) == None:
-            print(
-                f"Cannot add video to {playlist_name}: Playlist does not exist")
-        elif self._video_library.get_video(video_id) == None:
-            print(f"Cannot add video to {playlist_name}: Video does not exist")
-        elif self._flagged.get(video_id) != None:
-            print(
-                f"Cannot add video to {playlist_name}: Video is currently flagged (reason: {self._flagged[video_id]})")
-        elif self._playlists.get(playlist_name.lower())._videos.get(video_id) != None:
-            print(f"Cannot add video to {playlist_name}: Video already added")
+        playlist = self._playlists.get(fold(playlist_name))
+        video = self._video_library.get_video(video_id)
+        flagged = self._flagged
+        if playlist == None:
+            self._emit("add_to_playlist.no_playlist",
+                       playlist_name=playlist_name)
+        elif video == None:
+            self._emit("add_to_playlist.no_video", playlist_name=playlist_name)
+        elif flagged.get(video_id) != None:
+            self._emit("add_to_playlist.flagged", playlist_name=playlist_name,
+                       reason=flagged[video_id])
         else:
-            self._playlists.get(playlist_name.lower())._videos[video_id] = True
-            print(
-                f"Added video to {playlist_name}: {self._video_library.get_video(video_id).title}")
+            with playlist._lock:
+                if playlist._videos.get(video_id) != None:
+                    self._emit("add_to_playlist.already_added",
+                               playlist_name=playlist_name)
+                else:
+                    playlist._videos[video_id] = next(self._playlist_order)
+                    self._undo_log.record(("add", playlist, video_id))
+                    self._emit("added_to_playlist",
+                               playlist_name=playlist_name, title=video.title)
 
     def show_all_playlists(self):
         """Display all playlists."""
 
-        if len(self._playlists) == 0:
-            print("No playlists exist yet")
+        with self._playlists_lock:
+            playlists = sorted(self._playlists.items())
+        if len(playlists) == 0:
+            self._emit("playlists.empty")
         else:
-            print("Showing all playlists:")
-            for key in sorted(self._playlists):
-                print(f"  {self._playlists[key]._name}")
+            self._emit("playlists", items=(
+                {"name": playlist._name} for key, playlist in playlists))
 
     def show_playlist(self, playlist_name):
         """Display all videos in a playlist with a given name.
@@ -166,21 +537,17 @@ class VideoPlayer:
             playlist_name: The playlist name.
         """
 
-        if self._playlists.get(playlist_name.lower()) == None:
-            print(
-                f"Cannot show playlist {playlist_name}: Playlist does not exist")
+        playlist = self._playlists.get(fold(playlist_name))
+        if playlist == None:
+            self._emit("show_playlist.no_playlist",
+                       playlist_name=playlist_name)
         else:
-            print(f"Showing playlist: {playlist_name}")
-            if len(self._playlists[playlist_name.lower()]._videos.keys()) == 0:
-                print("No videos here yet")
-            else:
-                for key in self._playlists[playlist_name.lower()]._videos.keys():
-                    video = self._video_library.get_video(key)
-                    if self._flagged.get(video.video_id) != None:
-                        print(f"{video.title} ({video.video_id}) [{' '.join(video.tags)}] - FLAGGED (reason: {self._flagged[video.video_id]})")
-                    else:
-                        print(
-                            f"  {video.title} ({video.video_id}) [{' '.join(video.tags)}]")
+            with playlist._lock:
+                video_ids = list(playlist._videos.keys())
+            flagged = self._flagged
+            self._emit("playlist", playlist_name=playlist_name, items=(
+                (self._video_library.get_video(key), flagged.get(key))
+                for key in video_ids))
 
     def remove_from_playlist(self, playlist_name, video_id):
         """Removes a video to a playlist with a given name.
@@ -190,19 +557,26 @@ class VideoPlayer:
             video_id: The video_id to be removed.
         """
 
-        if self._playlists.get(playlist_name.lower()) == None:
-            print(
-                f"Cannot remove video from {playlist_name}: Playlist does not exist")
-        elif self._video_library.get_video(video_id) == None:
-            print(
-                f"Cannot remove video from {playlist_name}: Video does not exist")
-        elif self._playlists.get(playlist_name.lower())._videos.get(video_id) == None:
-            print(
-                f"Cannot remove video from {playlist_name}: Video is not in playlist")
+        playlist = self._playlists.get(fold(playlist_name))
+        video = self._video_library.get_video(video_id)
+        if playlist == None:
+            self._emit("remove_from_playlist.no_playlist",
+                       playlist_name=playlist_name)
+        elif video == None:
+            self._emit("remove_from_playlist.no_video",
+                       playlist_name=playlist_name)
         else:
-            self._playlists.get(playlist_name.lower())._videos.pop(video_id)
-            print(
-                f"Removed video from {playlist_name}: {self._video_library.get_video(video_id).title}")
+            with playlist._lock:
+                if playlist._videos.get(video_id) == None:
+                    self._emit("remove_from_playlist.not_in_playlist",
+                               playlist_name=playlist_name)
+                else:
+                    # Undoing puts the video back where it was.
+                    order = playlist._videos.pop(video_id)
+                    self._undo_log.record(
+                        ("remove", playlist, video_id, order))
+                    self._emit("removed_from_playlist",
+                               playlist_name=playlist_name, title=video.title)
 
     def clear_playlist(self, playlist_name):
         """Removes all videos from a playlist with a given name.
@@ -211,13 +585,18 @@ class VideoPlayer:
             playlist_name: The playlist name.
         """
 
-        if self._playlists.get(playlist_name.lower()) == None:
-            print(
-                f"Cannot clear playlist {playlist_name}: Playlist does not exist")
+        playlist = self._playlists.get(fold(playlist_name))
+        if playlist == None:
+            self._emit("clear_playlist.no_playlist",
+                       playlist_name=playlist_name)
         else:
-            for key in self._playlists[playlist_name.lower()]._videos.keys():
-                self._playlists.get(playlist_name.lower())._videos.pop(key)
-            print(f"Successfully removed all videos from {playlist_name}")
+            # The videos are swapped out rather than copied, so undoing
+            # only swaps them back in.
+            with playlist._lock:
+                videos = playlist._videos
+                playlist._videos = OrderedDict()
+            self._undo_log.record(("clear", playlist, videos))
+            self._emit("playlist_cleared", playlist_name=playlist_name)
 
     def delete_playlist(self, playlist_name):
         """Deletes a playlist with a given name.
@@ -226,97 +605,550 @@ class VideoPlayer:
             playlist_name: The playlist name.
         """
 
-        if self._playlists.get(playlist_name.lower()) == None:
-            print(
-                f"Cannot delete playlist {playlist_name}: Playlist does not exist")
-        else:
-            self._playlists.pop(playlist_name.lower())
-            print(f"Deleted playlist: {playlist_name}")
+        with self._playlists_lock:
+            if self._playlists.get(fold(playlist_name)) == None:
+                self._emit("delete_playlist.no_playlist",
+                           playlist_name=playlist_name)
+            else:
+                playlist = self._playlists.pop(fold(playlist_name))
+                self._playlist_index.remove(playlist._name)
+                self._undo_log.record(("delete", playlist))
+                self._emit("playlist_deleted", playlist_name=playlist_name)
+
+    def combine_playlists(self, operation, source_names, playlist_name):
+        """Creates a playlist from the videos of other playlists, in the
+        order they were added, leaving out flagged videos.
+
+        Args:
+            operation: "union" for the videos in any source playlist,
+                "intersect" for the videos in all of them, or "diff" for
+                the videos of the first playlist that are in none of the
+                others.
+            source_names: The names of the source playlists.
+            playlist_name: The name of the new playlist.
+        """
+
+        sources = []
+        for source_name in source_names:
+            source = self._playlists.get(fold(source_name))
+            if source == None:
+                self._emit("combine_playlists.no_playlist",
+                           playlist_name=playlist_name, source=source_name)
+                return
+            sources.append(source)
+        if self._playlists.get(fold(playlist_name)) != None:
+            self._emit("create_playlist.exists")
+            return
+
+        flagged = self._flagged
+        with contextlib.ExitStack() as stack:
+            # Locks are taken in a fixed order, once per playlist.
+            for source in sorted(set(sources), key=id):
+                stack.enter_context(source._lock)
+            first = sources[0]._videos
+            others = [source._videos for source in sources[1:]]
+            if operation == "union":
+                video_ids = itertools.chain.from_iterable(
+                    source._videos for source in sources)
+            else:
+                # The set operations hash every video once, the order is
+                # then taken from the first playlist.
+                if operation == "intersect":
+                    kept = set(first).intersection(*others)
+                else:
+                    kept = set(first).difference(*others)
+                video_ids = (video_id for video_id in first
+                             if video_id in kept)
+            playlist = Playlist(playlist_name, self._thread_safe)
+            playlist._videos = OrderedDict(
+                (video_id, next(self._playlist_order))
+                for video_id in video_ids if video_id not in flagged)
+
+        with self._playlists_lock:
+            if self._playlists.get(fold(playlist_name)) != None:
+                self._emit("create_playlist.exists")
+                return
+            self._playlists[fold(playlist_name)] = playlist
+            self._playlist_index.add(playlist_name)
+            self._undo_log.record(("create", playlist))
+        self._emit("playlist_combined", playlist_name=playlist_name,
+                   count=len(playlist._videos))
 
-    def search_videos(self, search_term):
+    def search_videos(self, search_term, prompt=True):
         """Display all the videos whose titles contain the search_term.
 
         Args:
             search_term: The query to be used in search.
+            prompt: Whether to ask the user which result to play.
+
+        Returns:
+            The list of matching videos.
         """
 
-        video_list = self._video_library.get_all_videos()
-        correct_videos = []
-        for video in video_list:
-            if search_term.lower() in video.title.lower() and self._flagged.get(video.video_id) == None:
-                correct_videos.append(video)
-        if len(correct_videos) == 0:
-            print(f"No search results for {search_term}")
-            return
-        sorted(correct_videos, key=lambda x: x.title)
-        print(f"Here are the results for {search_term}:")
-        for index, video in enumerate(correct_videos):
-            print(
-                f"  {index+1}) {video.title} ({video.video_id}) [{' '.join(video.tags)}]")
-        print("Would you like to play any of the above? If yes, specify the number of the video.")
-        print("If your answer is not a valid number, we will assume it's a no.")
-        try:
-            user_input = int(input(""))
-        except ValueError:
-            return
-        else:
-            if user_input >= 1 and user_input <= len(correct_videos):
-                self.play_video(correct_videos[user_input-1].video_id)
+        key = ("title", fold(search_term))
+        correct_videos = self._search_cache.get(key)
+        if correct_videos is None:
+            flag_version = self._flag_version
+            flagged = self._flagged
+            video_list = self._video_library.get_all_videos()
+            correct_videos = []
+            for video in video_list:
+                if key[1] in video.title_key and flagged.get(video.video_id) == None:
+                    correct_videos.append(video)
+            correct_videos = tuple(correct_videos)
+            self._cache_put(
+                self._search_cache, key, correct_videos, flag_version)
+        return self._show_search_results(search_term, correct_videos, prompt)
 
-    def search_videos_tag(self, video_tag):
+    def search_videos_tag(self, video_tag, prompt=True):
         """Display all videos whose tags contains the provided tag.
 
         Args:
             video_tag: The video tag to be used in search.
+            prompt: Whether to ask the user which result to play.
+
+        Returns:
+            The list of matching videos.
         """
 
-        video_list = self._video_library.get_all_videos()
-        correct_videos = []
-        for video in video_list:
-            if self._flagged.get(video.video_id) != None:
-                continue
-            for tag in video.tags:
-                if video_tag.lower() == tag.lower():
+        key = ("tag", TAGS.fold(video_tag))
+        correct_videos = self._search_cache.get(key)
+        if correct_videos is None:
+            flag_version = self._flag_version
+            flagged = self._flagged
+            correct_videos = []
+            for video in self._video_library.get_videos_with_tag(video_tag):
+                if flagged.get(video.video_id) == None:
                     correct_videos.append(video)
-                    break
+            correct_videos = tuple(correct_videos)
+            self._cache_put(
+                self._search_cache, key, correct_videos, flag_version)
+        return self._show_search_results(video_tag, correct_videos, prompt)
+
+    def search_ranked(self, query, prompt=True, count=10):
+        """Display the videos whose titles and tags best match a query,
+        best first.
+
+        Args:
+            query: The words to search for.
+            prompt: Whether to ask the user which result to play.
+            count: The maximum number of videos to display.
+
+        Returns:
+            The list of matching videos.
+        """
+
+        index = self._ranked_index
+        if index is None:
+            index = self._ranked_index = TitleSearch(self._video_library)
+        key = ("ranked", " ".join(dict.fromkeys(tokenize(query))), count)
+        correct_videos = self._search_cache.get(key)
+        if correct_videos is None:
+            flag_version = self._flag_version
+            flagged = self._flagged
+            correct_videos = tuple(video for video, score in index.search(
+                query, count, lambda video_id: video_id in flagged))
+            self._cache_put(
+                self._search_cache, key, correct_videos, flag_version)
+        return self._show_search_results(query, correct_videos, prompt)
+
+    def _show_search_results(self, search_term, correct_videos, prompt):
+        """Displays search results and plays the one the user picks.
+
+        Args:
+            search_term: The search term or tag the user searched for.
+            correct_videos: The videos that matched the search.
+            prompt: Whether to ask the user which result to play.
+
+        Returns:
+            The list of matching videos.
+        """
+
+        correct_videos = list(correct_videos)
         if len(correct_videos) == 0:
-            print(f"No search results for {video_tag}")
-            return
+            self._emit("search.no_results", search_term=search_term)
+            return correct_videos
         sorted(correct_videos, key=lambda x: x.title)
-        print(f"Here are the results for {video_tag}:")
-        for index, video in enumerate(correct_videos):
-            print(
-                f"  {index+1}) {video.title} ({video.video_id}) [{' '.join(video.tags)}]")
-        print("Would you like to play any of the above? If yes, specify the number of the video.")
-        print("If your answer is not a valid number, we will assume it's a no.")
+        self._emit("search_results", search_term=search_term, items=(
+            (video, None) for video in correct_videos))
+        if prompt:
+            self.choose_search_result(correct_videos)
+        return correct_videos
+
+    def choose_search_result(self, videos):
+        """Asks the user which of the shown search results to play and
+        plays it.
+
+        Args:
+            videos: The list of videos the search returned.
+        """
+        self._emit("search.prompt")
         try:
             user_input = int(input(""))
         except ValueError:
             return
+        if user_input >= 1 and user_input <= len(videos):
+            self.play_video(videos[user_input-1].video_id)
+
+    def _invalidate_video(self, video):
+        """Drops every cached search result and random play table the
+        given video appears in, after its flag status changed.
+
+        Args:
+            video: The Video that was flagged or allowed.
+        """
+
+        self._invalidate_videos([video])
+
+    def _invalidate_videos(self, videos):
+        """Drops every cached search result and random play table any of
+        the given videos appear in, after their flag status changed or
+        they were added to or removed from the library.
+
+        Args:
+            videos: The Videos that were flagged, allowed, added or
+                removed.
+        """
+
+        if len(videos) > 64:
+            self._sampler.invalidate_all()
         else:
-            if user_input >= 1 and user_input <= len(correct_videos):
-                self.play_video(correct_videos[user_input-1].video_id)
+            for video in videos:
+                self._sampler.invalidate_video(video)
+        if len(self._search_cache) == 0:
+            return
+        # Search terms never contain a newline, so no term can match
+        # across two titles.
+        titles = "\n".join(video.title_key for video in videos)
+        tags = set(TAGS.key(tag_id) for video in videos
+                   for tag_id in video.tag_ids)
+        words = set()
+        if self._ranked_index is not None:
+            for video in videos:
+                words.update(self._ranked_index.terms_of(video))
+        stale_keys = [key for key in self._search_cache.keys()
+                      if (key[0] == "title" and key[1] in titles)
+                      or (key[0] == "tag" and key[1] in tags)
+                      or (key[0] == "ranked"
+                          and not words.isdisjoint(key[1].split()))]
+        for key in stale_keys:
+            self._search_cache.pop(key)
+
+    def reload_library(self, video_library):
+        """Replaces the video library, e.g. after the catalogue changed.
+
+        Videos that no longer exist are removed from playlists, flags and
+        cleared playlists that can be restored by UNDO. Only the cached
+        searches the added, removed or changed videos appear in are
+        dropped, while the indexes are rebuilt when next needed.
+
+        Args:
+            video_library: The new VideoLibrary.
+        """
+
+        with self._flag_lock, self._playback_lock, self._playlists_lock:
+            if self._current_video != None and \
+                    video_library.get_video(self._current_video.video_id) == None:
+                self.stop_video()
+            changed = self._changed_videos(self._video_library, video_library)
+            self._video_library = video_library
+            for playlist in self._playlists.values():
+                with playlist._lock:
+                    for video_id in [video_id for video_id in playlist._videos
+                                     if video_library.get_video(video_id) == None]:
+                        playlist._videos.pop(video_id)
+            self._update_flags(allowed=[
+                video_id for video_id in self._flagged
+                if video_library.get_video(video_id) == None])
+            # Cleared playlists come back without the removed videos.
+            for change in self._undo_log.changes():
+                if change[0] == "clear":
+                    for video_id in [video_id for video_id in change[2]
+                                     if video_library.get_video(video_id) == None]:
+                        change[2].pop(video_id)
+            self._history.forget(
+                video.video_id for video in changed
+                if video_library.get_video(video.video_id) == None)
+        if changed:
+            self._invalidate_videos(changed)
+            # Rows are cached by video_id, so a changed video would still
+            # be shown as it was.
+            row_cache = getattr(self._output, "row_cache", None)
+            if row_cache is not None:
+                for video in changed:
+                    row_cache.pop(video.video_id)
+            # Ranked scores depend on the whole catalogue.
+            for key in [key for key in self._search_cache.keys()
+                        if key[0] == "ranked"]:
+                self._search_cache.pop(key)
+        self._suggest_indexes = None
+        self._related = None
+        self._ranked_index = None
+        self._sampler = VideoSampler(
+            self._video_library, lambda video_id: video_id in self._flagged)
+
+    def _changed_videos(self, old_library, new_library):
+        """Returns the videos only one of two libraries has, and both
+        versions of the videos whose title or tags differ between them."""
+
+        changed = []
+        for video in old_library.get_all_videos():
+            if new_library.get_video(video.video_id) == None:
+                changed.append(video)
+        for video in new_library.get_all_videos():
+            old_video = old_library.get_video(video.video_id)
+            if old_video == None:
+                changed.append(video)
+            elif old_video.title != video.title or \
+                    tuple(old_video.tags) != tuple(video.tags):
+                changed.extend((old_video, video))
+        return changed
+
+    def _related_videos(self):
+        """Returns the related videos recommender, building it the first
+        time it is needed."""
 
-    def flag_video(self, video_id, flag_reason=""):
+        related = self._related
+        if related is None:
+            related = self._related = RelatedVideos(self._video_library)
+        return related
+
+    def show_related(self, video_id, count=5):
+        """Displays the videos sharing the most tags with a video, rare
+        tags counting for more than common ones.
+
+        Args:
+            video_id: The video to find related videos for.
+            count: The maximum number of videos to show.
+        """
+
+        video = self._video_library.get_video(video_id)
+        if video == None:
+            self._emit("related.no_video")
+            return
+        flagged = self._flagged
+        related = self._related_videos().related(
+            video_id, count, lambda video_id: video_id in flagged)
+        if len(related) == 0:
+            self._emit("related.none", title=video.title)
+        else:
+            self._emit("related", title=video.title, items=(
+                (related_video, None) for related_video, score in related))
+
+    def precompute_related(self, count=100, neighbours=50):
+        """Precomputes the related videos of the most played videos, so
+        RELATED answers for them without ranking.
+
+        Args:
+            count: How many of the most played videos to precompute.
+            neighbours: How many related videos to keep for each.
+        """
+
+        self._related_videos().precompute(
+            (video_id for video_id, plays in self._history.top_played(count)),
+            neighbours)
+
+    def suggest(self, prefix, count=10):
+        """Returns completions for a prefix among video titles, tags and
+        playlist names.
+
+        Args:
+            prefix: The prefix to complete, ignoring case.
+            count: The maximum number of completions to return.
+
+        Returns:
+            A list of (completion, kind) pairs in alphabetical order, where
+            kind is "title", "tag" or "playlist".
+        """
+
+        indexes = self._suggest_indexes
+        if indexes is None:
+            # Titles and tags only change with the library, so build the
+            # indexes on first use. They are published in one assignment,
+            # so a concurrent SUGGEST never sees only one of them.
+            videos = self._video_library.get_all_videos()
+            indexes = self._suggest_indexes = (
+                PrefixIndex(video.title for video in videos),
+                PrefixIndex(tag for video in videos for tag in video.tags))
+        title_index, tag_name_index = indexes
+        completions = heapq.merge(
+            *[[(key, word, kind) for key, word in index.complete(prefix, count)]
+              for index, kind in ((title_index, "title"),
+                                  (tag_name_index, "tag"),
+                                  (self._playlist_index, "playlist"))])
+        return [(word, kind) for key, word, kind in
+                list(completions)[:count]]
+
+    def show_suggestions(self, prefix, count=10):
+        """Displays completions for a prefix among video titles, tags and
+        playlist names.
+
+        Args:
+            prefix: The prefix to complete.
+            count: The maximum number of completions to display.
+        """
+
+        suggestions = self.suggest(prefix, count)
+        if len(suggestions) == 0:
+            self._emit("suggest.none", prefix=prefix)
+            return
+        self._emit("suggestions", prefix=prefix, items=(
+            {"word": word, "kind": kind} for word, kind in suggestions))
+
+    def show_cache_stats(self):
+        """Displays the size and hit rate of the player caches."""
+
+        caches = [("Search results", self._search_cache)]
+        if getattr(self._output, "row_cache", None) is not None:
+            caches.append(("Video rows", self._output.row_cache))
+        self._emit("cache_stats", items=(
+            {"name": name, "size": len(cache), "hits": cache.hits,
+             "misses": cache.misses, "hit_rate": cache.hit_rate()}
+            for name, cache in caches))
+
+    def memory_usage(self, sample=256):
+        """Returns the approximate memory footprint of the library and of
+        every player structure, cache and index.
+
+        Large structures are sized from a sample of their entries, so this
+        is quick whatever the size of the catalogue. Videos and video_ids
+        belong to the library; the playlists, caches and indexes holding
+        them only count their own references.
+
+        Args:
+            sample: How many entries of every structure to size at most.
+
+        Returns:
+            A list of dicts with the name, number of entries and size in
+            bytes of every structure, those not built yet left out.
+        """
+
+        usage = []
+
+        def add(name, entries, size):
+            usage.append({"name": name, "count": len(entries), "bytes": size})
+
+        def sampled(items, size):
+            return sampled_size(items, size, sample)
+
+        library = self._video_library
+        if isinstance(library, VideoLibrary):
+            # A view of the library's dict, as get_all_videos copies it.
+            videos = library._videos.values()
+            add("Video library", videos, library.memory_usage(sample))
+            add("Videos", videos, sampled(
+                videos, lambda video: object_size(video, 2)))
+        else:
+            # Shared libraries return a lazy view of the catalogue.
+            videos = library.get_all_videos()
+            add("Shared catalogue", videos, library.memory_usage(sample))
+        add("Tag dictionary", TAGS, TAGS.memory_usage(sample))
+
+        playlists = list(self._playlists.values())
+        add("Playlists", playlists, sys.getsizeof(self._playlists) + sampled(
+            playlists, lambda playlist: object_size(playlist, 1)))
+        add("Flags", self._flagged, sys.getsizeof(self._flagged)
+            + sampled(self._flagged.values(), sys.getsizeof)
+            + sys.getsizeof(self._flag_timers)
+            + sampled(self._flag_timers.values(), sys.getsizeof))
+
+        def entry_size(key, value):
+            # Cached search results hold videos of the library.
+            return object_size(key, 1) + object_size(value, 1) - sum(
+                sys.getsizeof(item) for item in value
+                if isinstance(item, Video))
+
+        caches = [("Search cache", self._search_cache)]
+        if getattr(self._output, "row_cache", None) is not None:
+            caches.append(("Video rows", self._output.row_cache))
+        for name, cache in caches:
+            add(name, cache, cache.memory_usage(sample, entry_size))
+
+        title_index, tag_name_index = self._suggest_indexes or (None, None)
+        structures = [("Playlist name index", self._playlist_index),
+                      ("Title index", title_index),
+                      ("Tag name index", tag_name_index),
+                      ("Ranked search index", self._ranked_index),
+                      ("Related videos", self._related),
+                      ("Random play tables", self._sampler),
+                      ("Play history", self._history)]
+        for name, structure in structures:
+            if structure is not None:
+                add(name, structure, structure.memory_usage(sample))
+        add("Undo log", self._undo_log.changes(),
+            self._undo_log.memory_usage(sample))
+        return usage
+
+    def show_memory(self, sample=256):
+        """Displays the approximate memory footprint of the library and of
+        every player structure, cache and index.
+
+        Args:
+            sample: How many entries of every structure to size at most.
+        """
+
+        usage = self.memory_usage(sample)
+        self._emit("memory", total=sum(item["bytes"] for item in usage),
+                   items=iter(usage))
+
+    def show_memory_diff(self, count=10):
+        """Displays the allocation sites that grew or shrank the most since
+        the last call, starting to trace allocations on the first call.
+
+        Args:
+            count: The maximum number of allocation sites to display.
+        """
+
+        stats = self._tracer.diff(count)
+        if stats is None:
+            self._emit("memory.tracing")
+        elif len(stats) == 0:
+            self._emit("memory.no_changes")
+        else:
+            self._emit("memory_diff", items=(
+                {"location": f"{stat.traceback[0].filename}:"
+                             f"{stat.traceback[0].lineno}",
+                 "size_diff": stat.size_diff, "count_diff": stat.count_diff,
+                 "size": stat.size} for stat in stats))
+
+    def stop_memory_trace(self):
+        """Stops tracing allocations."""
+
+        self._tracer.stop()
+        self._emit("memory.trace_stopped")
+
+    def flag_video(self, video_id, flag_reason="", ttl=None):
         """Mark a video as flagged.
 
         Args:
             video_id: The video_id to be flagged.
             flag_reason: Reason for flagging the video.
+            ttl: Optional number of seconds on the playback clock after
+                which the flag is removed again.
         """
 
-        if video_id in self._flagged:
-            print("Cannot flag video: Video is already flagged")
-        elif self._video_library.get_video(video_id) == None:
-            print("Cannot flag video: Video does not exist")
-        else:
-            if self._current_video == self._video_library.get_video(video_id):
-                self.stop_video()
-            if flag_reason == "":
-                flag_reason = "Not supplied"
-            self._flagged[video_id] = flag_reason
-            print(
-                f"Successfully flagged video: {self._video_library.get_video(video_id).title} (reason: {flag_reason})")
+        with self._flag_lock:
+            video = self._video_library.get_video(video_id)
+            if video_id in self._flagged:
+                self._emit("flag.already_flagged")
+            elif video == None:
+                self._emit("flag.no_video")
+            else:
+                if flag_reason == "":
+                    flag_reason = "Not supplied"
+                with self._playback_lock:
+                    if self._current_video == video:
+                        self.stop_video()
+                    self._update_flags({video_id: flag_reason}, ttl=ttl)
+                self._undo_log.record(
+                    ("flag", video_id, flag_reason, self._expiry(ttl)))
+                self._invalidate_video(video)
+                if ttl is None:
+                    self._emit("video_flagged", title=video.title,
+                               reason=flag_reason)
+                else:
+                    self._emit("video_flagged_for", title=video.title,
+                               reason=flag_reason, ttl=ttl)
 
     def allow_video(self, video_id):
         """Removes a flag from a video.
@@ -325,11 +1157,223 @@ class VideoPlayer:
             video_id: The video_id to be allowed again.
         """
 
-        if self._video_library.get_video(video_id) == None:
-            print("Cannot remove flag from video: Video does not exist")
-        elif video_id not in self._flagged:
-            print("Cannot remove flag from video: Video is not flagged")
+        with self._flag_lock:
+            video = self._video_library.get_video(video_id)
+            if video == None:
+                self._emit("allow.no_video")
+            elif video_id not in self._flagged:
+                self._emit("allow.not_flagged")
+            else:
+                self._undo_log.record(
+                    ("allow", video_id, self._flagged[video_id], None))
+                self._update_flags(allowed=[video_id])
+                self._invalidate_video(video)
+                self._emit("video_allowed", title=video.title)
+
+    def flag_videos(self, entries, ttl=None):
+        """Flags many videos at once, e.g. in a moderation sweep.
+
+        The entries are checked in a single pass, the current video is
+        stopped at most once and the flags and caches are updated in one
+        batch. A summary is displayed instead of a line per video.
+
+        Args:
+            entries: An iterable of (video_id, flag_reason) pairs. An
+                empty reason is recorded as "Not supplied".
+            ttl: Optional number of seconds on the playback clock after
+                which the flags are removed again.
+        """
+
+        with self._flag_lock:
+            flagged = self._flagged
+            batch = {}
+            videos = []
+            already_flagged = missing = 0
+            for video_id, flag_reason in entries:
+                if video_id in flagged or video_id in batch:
+                    already_flagged += 1
+                    continue
+                video = self._video_library.get_video(video_id)
+                if video == None:
+                    missing += 1
+                    continue
+                batch[video_id] = flag_reason or "Not supplied"
+                videos.append(video)
+            if batch:
+                with self._playback_lock:
+                    if self._current_video != None and \
+                            self._current_video.video_id in batch:
+                        self.stop_video()
+                    self._update_flags(batch, ttl=ttl)
+                self._undo_log.record(
+                    ("flag_many", batch, self._expiry(ttl)))
+                self._invalidate_videos(videos)
+        self._emit("videos_flagged", count=len(batch),
+                   already_flagged=already_flagged, missing=missing)
+
+    def allow_videos(self, video_ids):
+        """Removes the flags from many videos at once, displaying a
+        summary.
+
+        Args:
+            video_ids: An iterable of video_ids to allow again.
+        """
+
+        with self._flag_lock:
+            flagged = self._flagged
+            batch = {}
+            videos = []
+            not_flagged = missing = 0
+            for video_id in video_ids:
+                if video_id in batch:
+                    continue
+                video = self._video_library.get_video(video_id)
+                if video == None:
+                    missing += 1
+                elif video_id not in flagged:
+                    not_flagged += 1
+                else:
+                    batch[video_id] = flagged[video_id]
+                    videos.append(video)
+            if batch:
+                self._update_flags(allowed=batch)
+                self._undo_log.record(("allow_many", batch, None))
+                self._invalidate_videos(videos)
+        self._emit("videos_allowed", count=len(batch),
+                   not_flagged=not_flagged, missing=missing)
+
+    def _expiry(self, ttl):
+        """Returns the playback clock time a flag with the given ttl
+        expires at, or None if it does not expire."""
+
+        return None if ttl is None else self._clock.now() + ttl
+
+    def _has_expired(self, change):
+        """Returns whether a recorded flag change was time-limited and
+        its time is up, so it can no longer be undone or redone."""
+
+        return change[0] in ("flag", "flag_many") and \
+            change[-1] is not None and change[-1] <= self._clock.now()
+
+    def undo(self):
+        """Reverses the most recent playlist or flag change."""
+
+        self._undo_log.discard(self._has_expired)
+        change = self._undo_log.pop_undo()
+        if change == None:
+            self._emit("undo.empty")
+        else:
+            self._apply_change(change, undo=True)
+            self._emit("undone", command=self._describe_change(change))
+
+    def redo(self):
+        """Makes the most recently undone change again."""
+
+        self._undo_log.discard(self._has_expired)
+        change = self._undo_log.pop_redo()
+        if change == None:
+            self._emit("redo.empty")
+        else:
+            self._apply_change(change, undo=False)
+            self._emit("redone", command=self._describe_change(change))
+
+    def _apply_change(self, change, undo):
+        """Reverses a change recorded in the undo log, or makes it again.
+
+        Videos the library no longer has, after reload_library, are left
+        out of the change. A time-limited flag that is made again only
+        gets the time it had left.
+
+        Args:
+            change: The recorded change.
+            undo: Whether to reverse the change instead of making it.
+        """
+
+        kind = change[0]
+        library = self._video_library
+        if kind in ("create", "delete"):
+            playlist = change[1]
+            with self._playlists_lock:
+                if (kind == "create") == undo:
+                    self._playlists.pop(playlist._key, None)
+                    self._playlist_index.remove(playlist._name)
+                else:
+                    self._playlists[playlist._key] = playlist
+                    self._playlist_index.add(playlist._name)
+        elif kind in ("add", "remove"):
+            playlist, video_id = change[1], change[2]
+            with playlist._lock:
+                videos = playlist._videos
+                if (kind == "add") == undo:
+                    videos.pop(video_id, None)
+                elif library.get_video(video_id) == None:
+                    return
+                elif kind == "add":
+                    videos[video_id] = next(self._playlist_order)
+                else:
+                    order = change[3]
+                    videos[video_id] = order
+                    # Moves the videos added after it behind it again.
+                    for key in [key for key, value in videos.items()
+                                if value > order]:
+                        videos.move_to_end(key)
+        elif kind == "clear":
+            playlist = change[1]
+            with playlist._lock:
+                playlist._videos = change[2] if undo else OrderedDict()
+        elif kind in ("flag_many", "allow_many"):
+            batch = {}
+            videos = []
+            for video_id, flag_reason in change[1].items():
+                video = library.get_video(video_id)
+                if video != None:
+                    batch[video_id] = flag_reason
+                    videos.append(video)
+            with self._flag_lock:
+                if (kind == "flag_many") == undo:
+                    self._update_flags(allowed=batch)
+                else:
+                    with self._playback_lock:
+                        if self._current_video != None and \
+                                self._current_video.video_id in batch:
+                            self.stop_video()
+                        self._update_flags(batch, ttl=self._time_left(change))
+                self._invalidate_videos(videos)
+        else:
+            video_id, flag_reason = change[1], change[2]
+            video = library.get_video(video_id)
+            if video == None:
+                return
+            with self._flag_lock:
+                if (kind == "flag") == undo:
+                    self._update_flags(allowed=[video_id])
+                else:
+                    with self._playback_lock:
+                        if self._current_video == video:
+                            self.stop_video()
+                        self._update_flags({video_id: flag_reason},
+                                           ttl=self._time_left(change))
+                self._invalidate_video(video)
+
+    def _time_left(self, change):
+        """Returns the seconds a recorded flag change has left before it
+        expires, or None if it does not expire."""
+
+        expires = change[-1]
+        return None if expires is None else expires - self._clock.now()
+
+    def _describe_change(self, change):
+        """Returns the command that made a recorded change."""
+
+        kind = change[0]
+        if kind in ("flag_many", "allow_many"):
+            return f"{_CHANGE_COMMANDS[kind]} ({len(change[1])} videos)"
+        if kind in ("flag", "allow"):
+            arguments = [change[1]]
+            if kind == "flag":
+                arguments.append(change[2])
         else:
-            self._flagged.pop(video_id)
-            print(
-                f"Successfully removed flag from video: {self._video_library.get_video(video_id).title}")
+            arguments = [change[1]._name]
+            if kind in ("add", "remove"):
+                arguments.append(change[2])
+        return " ".join([_CHANGE_COMMANDS[kind]] + arguments)
@@ -1,11 +1,20 @@
 """A video playlist class."""
 
 from collections import OrderedDict
+import contextlib
+import threading
+
+from .text_key import fold
 
 
 class Playlist:
     """A class used to represent a Playlist."""
-    def __init__(self, name: str):
+    def __init__(self, name: str, thread_safe: bool = False):
         self._videos = OrderedDict()
         self._name = name
+        # The key the player looks the playlist up by.
+        self._key = fold(name)
+        # Guards _videos when the player is shared between threads.
+        self._lock = threading.Lock() if thread_safe else \
+            contextlib.nullcontext()
 
@@ -0,0 +1,180 @@
+"""A random video sampler class."""
+
+import random
+import sys
+
+from .memory_usage import object_size, sampled_size
+from .tag_dictionary import TAGS
+
+# How many flagged videos a draw may skip before the sampler falls back
+# to a table without them.
+MAX_REJECTIONS = 16
+
+
+class AliasTable:
+    """A class used to draw items from a weighted distribution in O(1) time.
+
+    The table is built with Vose's alias method: every column holds an
+    item, the probability of keeping it and an alias to fall back on.
+    """
+
+    def __init__(self, items, weights=None):
+        """Builds the alias table.
+
+        Args:
+            items: The items to sample from.
+            weights: Optional non-negative weight for every item. Items are
+                sampled uniformly if no weights are given.
+        """
+        self._items = list(items)
+        count = len(self._items)
+        self._prob = [1.0] * count
+        self._alias = list(range(count))
+        if weights is None or count == 0:
+            return
+
+        total = float(sum(weights))
+        if total <= 0:
+            return
+        scaled = [weight * count / total for weight in weights]
+        small = [index for index, prob in enumerate(scaled) if prob < 1.0]
+        large = [index for index, prob in enumerate(scaled) if prob >= 1.0]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            self._prob[less] = scaled[less]
+            self._alias[less] = more
+            scaled[more] = scaled[more] + scaled[less] - 1.0
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+        # Whatever is left over is only off by floating point error.
+        for index in small + large:
+            self._prob[index] = 1.0
+
+    def __len__(self):
+        return len(self._items)
+
+    def __sizeof__(self):
+        return (object.__sizeof__(self) + sys.getsizeof(self._items)
+                + object_size(self._prob, 1) + object_size(self._alias, 1))
+
+    def sample(self, rng=random):
+        """Returns a random item, or None if the table is empty.
+
+        Args:
+            rng: The random number generator to draw from.
+        """
+        if not self._items:
+            return None
+        # A single draw picks both the column and the coin flip.
+        position = rng.random() * len(self._items)
+        column = int(position)
+        if position - column < self._prob[column]:
+            return self._items[column]
+        return self._items[self._alias[column]]
+
+
+class VideoSampler:
+    """A class used to pick random videos from a video library.
+
+    One alias table is kept per tag (and one for the whole library) in
+    both uniform and popularity weighted form, built on first use. The
+    tables hold flagged videos too, and a draw that picks one is
+    repeated, which keeps the distribution of the unflagged videos and
+    means flag changes never rebuild a table. Only when MAX_REJECTIONS
+    draws in a row are flagged is a table of the unflagged videos built;
+    those tables are dropped when a video in them changes.
+    """
+
+    def __init__(self, video_library, is_flagged):
+        """The VideoSampler class is initialized.
+
+        Args:
+            video_library: The library to sample videos from.
+            is_flagged: Callable returning True if a video_id is flagged.
+        """
+        self._video_library = video_library
+        self._is_flagged = is_flagged
+        self._tables = {}
+        self._unflagged_tables = {}
+        # Bumped on every invalidation so a table built from flags that
+        # changed in the meantime, on another thread, is not kept.
+        self._version = 0
+
+    def sample(self, video_tag=None, weighted=False, rng=random):
+        """Returns a random video that is not flagged.
+
+        Args:
+            video_tag: Optional tag the video must have.
+            weighted: Whether to weight videos by their popularity.
+            rng: The random number generator to draw from.
+
+        Returns:
+            A Video object, or None if no video is available.
+        """
+        key = (TAGS.fold(video_tag) if video_tag else None, weighted)
+        table = self._unflagged_tables.get(key)
+        if table is not None:
+            return table.sample(rng)
+        table = self._tables.get(key)
+        if table is None:
+            table = self._tables[key] = self._build_table(
+                video_tag, weighted, False)
+        for _ in range(MAX_REJECTIONS):
+            video = table.sample(rng)
+            if video is None or not self._is_flagged(video.video_id):
+                return video
+        version = self._version
+        table = self._build_table(video_tag, weighted, True)
+        self._unflagged_tables[key] = table
+        if version != self._version:
+            self._unflagged_tables.pop(key, None)
+        return table.sample(rng)
+
+    def __len__(self):
+        return len(self._tables) + len(self._unflagged_tables)
+
+    def memory_usage(self, sample=256):
+        """Returns the approximate size in bytes of the tables built so
+        far, leaving out the videos they hold.
+
+        Args:
+            sample: How many tables of each kind to size at most.
+        """
+        return sum(sys.getsizeof(tables) + sampled_size(
+            tables.values(), sys.getsizeof, sample)
+            for tables in (self._tables, self._unflagged_tables))
+
+    def invalidate_video(self, video):
+        """Drops the tables of unflagged videos the given video could
+        appear in.
+
+        Args:
+            video: The Video whose flag status changed.
+        """
+        self._version += 1
+        if not self._unflagged_tables:
+            return
+        for tag in [None] + [TAGS.key(tag_id) for tag_id in video.tag_ids]:
+            self._unflagged_tables.pop((tag, False), None)
+            self._unflagged_tables.pop((tag, True), None)
+
+    def invalidate_all(self):
+        """Drops every table of unflagged videos, e.g. after many flags
+        changed at once."""
+        self._version += 1
+        self._unflagged_tables.clear()
+
+    def _build_table(self, video_tag, weighted, unflagged):
+        if video_tag:
+            videos = self._video_library.get_videos_with_tag(video_tag)
+        else:
+            videos = self._video_library.get_all_videos()
+        if unflagged:
+            videos = [video for video in videos
+                      if not self._is_flagged(video.video_id)]
+        if weighted:
+            return AliasTable(videos, [video.popularity for video in videos])
+        return AliasTable(videos)
@@ -0,0 +1,85 @@
+import io
+from unittest import mock
+
+import pytest
+
+from src.command_parser import CommandException, CommandParser
+from src.player_output import RecordingRenderer
+from src.video_player import VideoPlayer
+
+
+def test_flag_many_from_file(tmp_path, capfd):
+    path = tmp_path / "sweep.txt"
+    path.write_text("# weekly sweep\n"
+                    "amazing_cats_video_id spam links\n"
+                    "\n"
+                    "funny_dogs_video_id\n"
+                    "amazing_cats_video_id duplicate\n"
+                    "another_cat_video_id  \n"
+                    "does_not_exist reason\n")
+    player = VideoPlayer()
+    parser = CommandParser(player)
+    parser.execute_command(["ALLOW_VIDEO", "another_cat_video_id"])
+    parser.execute_command(["FLAG_VIDEO", "another_cat_video_id", "old"])
+    parser.execute_command(["PLAY", "funny_dogs_video_id"])
+    capfd.readouterr()
+    parser.execute_command(["FLAG_MANY", str(path)])
+    out, err = capfd.readouterr()
+    assert out.splitlines() == [
+        "Stopping video: Funny Dogs",
+        "Successfully flagged 2 videos (2 already flagged, 1 not found)",
+    ]
+    assert player._flagged == {
+        "another_cat_video_id": "old",
+        "amazing_cats_video_id": "spam links",
+        "funny_dogs_video_id": "Not supplied",
+    }
+
+
+def test_allow_many_from_stdin_and_undo(capfd):
+    player = VideoPlayer()
+    parser = CommandParser(player)
+    player.flag_videos([("amazing_cats_video_id", "a"),
+                        ("funny_dogs_video_id", "b")])
+    capfd.readouterr()
+    stdin = io.StringIO("amazing_cats_video_id\n"
+                        "nothing_video_id\n"
+                        "funny_dogs_video_id\n"
+                        "\n"
+                        "not read\n")
+    with mock.patch("sys.stdin", stdin):
+        parser.execute_command(["ALLOW_MANY", "-"])
+    assert player._flagged == {}
+    parser.execute_command(["UNDO"])
+    out, err = capfd.readouterr()
+    assert out.splitlines() == [
+        "Successfully removed flags from 2 videos (1 not flagged, "
+        "0 not found)",
+        "Undid: ALLOW_MANY (2 videos)",
+    ]
+    assert player._flagged == {"amazing_cats_video_id": "a",
+                               "funny_dogs_video_id": "b"}
+
+
+def test_flag_many_invalidates_caches():
+    player = VideoPlayer(output=RecordingRenderer())
+    assert len(player.search_videos("cat", prompt=False)) == 2
+    assert len(player.search_videos_tag("#dog", prompt=False)) == 1
+    assert len(player.search_videos("google", prompt=False)) == 1
+    player.flag_videos([("another_cat_video_id", ""),
+                        ("funny_dogs_video_id", "")])
+    assert len(player.search_videos("cat", prompt=False)) == 1
+    assert len(player.search_videos_tag("#dog", prompt=False)) == 0
+    assert ("title", "google") in player._search_cache
+
+
+def test_flag_many_missing_file():
+    parser = CommandParser(VideoPlayer())
+    with pytest.raises(CommandException, match="Cannot read /does/not/exist"):
+        parser.execute_command(["FLAG_MANY", "/does/not/exist"])
+
+
+def test_flag_many_from_input_needs_an_interactive_parser():
+    parser = CommandParser(VideoPlayer(), interactive=False)
+    with pytest.raises(CommandException, match="give a file instead"):
+        parser.execute_command(["FLAG_MANY", "-"])
@@ -0,0 +1,44 @@
+import gzip
+
+import pytest
+
+from src.catalogue_source import IterableSource, load_sources
+from src.video import Video
+from src.video_library import VideoLibrary
+
+
+def test_library_from_gzip_file(tmp_path):
+    path = tmp_path / "videos.txt.gz"
+    with gzip.open(path, "wt") as video_file:
+        video_file.write("Funny Dogs | dogs_id | #dog , #animal | 2.5\n")
+    library = VideoLibrary(path)
+    video = library.get_video("dogs_id")
+    assert video.tags == ("#dog", "#animal")
+    assert video.popularity == 2.5
+
+
+def test_library_from_directory_of_shards(tmp_path):
+    (tmp_path / "part-0.txt").write_text("First | first_id | #a\n")
+    (tmp_path / "part-1.txt").write_text("Second | second_id |\n")
+    (tmp_path / ".hidden").write_text("Hidden | hidden_id |\n")
+    library = VideoLibrary(tmp_path)
+    assert [video.video_id for video in library.get_all_videos()] == [
+        "first_id", "second_id"]
+
+
+def test_library_merges_sources_in_order(tmp_path):
+    path = tmp_path / "videos.txt"
+    path.write_text("Old title | shared_id | #old\n")
+    library = VideoLibrary(
+        path,
+        IterableSource([("New title", "shared_id", ["#new"])]),
+        [Video("Other", "other_id", [])],
+    )
+    assert len(library.get_all_videos()) == 2
+    assert library.get_video("shared_id").title == "New title"
+    assert library.get_videos_with_tag("#old") == []
+
+
+def test_load_sources_missing_file(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_sources([tmp_path / "missing.txt", tmp_path / "other.txt"])
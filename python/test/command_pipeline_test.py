@@ -0,0 +1,122 @@
+import io
+import json
+import threading
+
+from src.command_pipeline import CommandPipeline
+
+
+def _replies(stream):
+    return {reply["id"]: reply["results"]
+            for reply in map(json.loads, stream.getvalue().splitlines())}
+
+
+def test_replies_are_tagged_with_request_ids():
+    stream = io.StringIO()
+    CommandPipeline(stream=stream).run([
+        "a NUMBER_OF_VIDEOS",
+        "b PLAY amazing_cats_video_id",
+        "",
+        "c SHOW_PLAYING",
+        "d NOT_A_COMMAND",
+        "EXIT",
+        "e NUMBER_OF_VIDEOS",
+    ])
+    replies = _replies(stream)
+    assert sorted(replies) == ["a", "b", "c", "d"]
+    assert replies["a"] == [{"result": "number_of_videos", "count": 5}]
+    assert replies["b"] == [{"result": "playing", "title": "Amazing Cats"}]
+    assert replies["c"][0]["video"]["video_id"] == "amazing_cats_video_id"
+    assert replies["d"] == [{"result": "invalid_command"}]
+
+
+def test_play_result_follows_a_search():
+    stream = io.StringIO()
+    CommandPipeline(stream=stream).run([
+        "1 SEARCH_VIDEOS_WITH_TAG #cat",
+        "2 PLAY_RESULT 1 2",
+        "3 PLAY_RESULT 1 3",
+        "4 PLAY_RESULT 7 1",
+        "5 PLAY_RESULT 1",
+    ])
+    replies = _replies(stream)
+    assert [item["video_id"] for item in replies["1"][0]["items"]] == [
+        "amazing_cats_video_id", "another_cat_video_id"]
+    assert replies["2"] == [
+        {"result": "playing", "title": "Another Cat Video"}]
+    assert replies["3"][0]["message"] == (
+        "Cannot play result: Search 1 has no result number 3")
+    assert replies["4"][0]["message"] == (
+        "Cannot play result: No search results for request 7")
+    assert replies["5"][0]["result"] == "error"
+
+
+def test_reads_run_concurrently():
+    stream = io.StringIO()
+    pipeline = CommandPipeline(stream=stream, max_workers=2)
+    # Each read can only finish once the other one is running too.
+    barrier = threading.Barrier(2, timeout=5)
+    number_of_videos = pipeline.player.number_of_videos
+
+    def wait_for_other_read():
+        barrier.wait()
+        number_of_videos()
+
+    pipeline.player.number_of_videos = wait_for_other_read
+    pipeline.run(["1 NUMBER_OF_VIDEOS", "2 NUMBER_OF_VIDEOS"])
+    assert len(_replies(stream)) == 2
+
+
+def test_finished_reads_are_not_kept():
+    pipeline = CommandPipeline(stream=io.StringIO())
+    first = pipeline.submit("1", ["NUMBER_OF_VIDEOS"])
+    first.result(timeout=5)
+    pipeline.submit("2", ["NUMBER_OF_VIDEOS"])
+    assert first not in pipeline._reads
+    pipeline.close()
+
+
+def test_writes_wait_for_earlier_requests():
+    stream = io.StringIO()
+    pipeline = CommandPipeline(stream=stream, max_workers=4)
+    video_ids = ["amazing_cats_video_id", "funny_dogs_video_id"]
+    lines = ["1 CREATE_PLAYLIST list"]
+    for index in range(2, 40, 2):
+        lines.append(f"{index} SHOW_PLAYLIST list")
+        lines.append(f"{index + 1} ADD_TO_PLAYLIST list "
+                     f"{video_ids[index % 4 // 2]}")
+    lines.append("40 CLEAR_PLAYLIST list")
+    lines.append("41 SHOW_PLAYLIST list")
+    pipeline.run(lines)
+    replies = _replies(stream)
+    assert len(replies["2"][0]["items"]) == 0
+    assert len(replies["4"][0]["items"]) == 1
+    assert len(replies["38"][0]["items"]) == 2
+    assert replies["40"] == [
+        {"result": "playlist_cleared", "playlist_name": "list"}]
+    assert replies["41"][0]["items"] == []
+
+
+def test_unexpected_errors_are_answered(caplog):
+    stream = io.StringIO()
+    pipeline = CommandPipeline(stream=stream, max_workers=2)
+
+    def fail():
+        raise ValueError("broken")
+
+    pipeline.player.number_of_videos = fail
+    pipeline.run(["1 NUMBER_OF_VIDEOS", "2 SHOW_PLAYLIST missing"])
+    replies = _replies(stream)
+    assert replies["1"] == [
+        {"result": "error", "message": "Internal error: ValueError"}]
+    assert replies["2"][0]["result"] == "show_playlist.no_playlist"
+    assert "Request 1 NUMBER_OF_VIDEOS failed" in caplog.text
+    assert "ValueError: broken" in caplog.text
+
+
+def test_flag_many_does_not_read_the_request_stream():
+    stream = io.StringIO()
+    pipeline = CommandPipeline(stream=stream)
+    pipeline.run(["1 FLAG_MANY -", "amazing_cats_video_id", "2 STOP"])
+    replies = _replies(stream)
+    assert replies["1"][0]["result"] == "error"
+    assert pipeline.player._flagged == {}
@@ -0,0 +1,62 @@
+import io
+import json
+import sys
+import time
+
+from src.command_parser import CommandParser
+from src.command_profiler import CommandProfiler
+
+
+class SlowPlayer:
+    def show_all_videos(self):
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            pass
+
+
+def _profile():
+    switch_interval = sys.getswitchinterval()
+    profiler = CommandProfiler(interval=0.001)
+    parser = CommandParser(SlowPlayer(), profiler=profiler)
+    parser.execute_command(["SHOW_ALL_VIDEOS"])
+    # Nothing is sampled outside commands.
+    time.sleep(0.01)
+    samples = profiler.samples
+    time.sleep(0.02)
+    assert profiler.samples == samples
+    profiler.close()
+    assert sys.getswitchinterval() == switch_interval
+    return profiler
+
+
+def test_collapsed_stacks_per_command():
+    profiler = _profile()
+    assert profiler.samples > 0
+    stream = io.StringIO()
+    profiler.write_collapsed(stream)
+    lines = stream.getvalue().splitlines()
+    assert lines
+    for line in lines:
+        stack, count = line.rsplit(" ", 1)
+        assert int(count) > 0
+        assert stack.startswith(
+            "SHOW_ALL_VIDEOS;command_parser.py:execute_command;"
+            "command_parser.py:_execute_command;"
+            "command_profiler_test.py:show_all_videos")
+
+
+def test_speedscope_profile_per_command(tmp_path):
+    profiler = _profile()
+    path = str(tmp_path / "profile.json")
+    profiler.write(path)
+    with open(path) as stream:
+        profile = json.load(stream)
+    frames = [frame["name"] for frame in profile["shared"]["frames"]]
+    assert [entry["name"] for entry in profile["profiles"]] == [
+        "SHOW_ALL_VIDEOS"]
+    entry = profile["profiles"][0]
+    assert entry["type"] == "sampled"
+    assert len(entry["samples"]) == len(entry["weights"])
+    assert sum(entry["weights"]) == entry["endValue"] > 0
+    assert frames[entry["samples"][0][0]] == \
+        "command_parser.py:execute_command"
@@ -0,0 +1,118 @@
+import os
+import subprocess
+import sys
+import threading
+from unittest import mock
+
+from src.command_parser import CommandException, CommandParser
+from src.command_stats import CommandStats
+from src.video_player import VideoPlayer
+
+
+def test_stats_disabled(capfd):
+    parser = CommandParser(VideoPlayer())
+    parser.execute_command(["STATS"])
+    out, err = capfd.readouterr()
+    assert "Command statistics are not enabled" in out
+
+
+@mock.patch('builtins.input', lambda *args: 'No')
+def test_stats_counts_calls_and_results(capfd):
+    stats = CommandStats()
+    parser = CommandParser(VideoPlayer(), stats)
+    parser.execute_command(["NUMBER_OF_VIDEOS"])
+    parser.execute_command(["SEARCH_VIDEOS", "cat"])
+    parser.execute_command(["search_videos", "dog"])
+    capfd.readouterr()
+
+    assert stats.get_metrics("NUMBER_OF_VIDEOS").calls == 1
+    search = stats.get_metrics("SEARCH_VIDEOS")
+    assert search.calls == 2
+    assert search.searches == 2
+    assert search.total_results == 3
+    assert sum(search.buckets) == 2
+
+    parser.execute_command(["STATS"])
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert "Showing command statistics:" in lines[0]
+    assert "NUMBER_OF_VIDEOS: 1 calls" in lines[1]
+    assert "SEARCH_VIDEOS: 2 calls" in lines[2]
+    assert "mean 1.5 results" in lines[2]
+
+
+def test_prometheus_file(tmp_path):
+    path = tmp_path / "metrics.prom"
+    stats = CommandStats(str(path))
+    stats.record("PLAY", 0.002)
+    stats.record("PLAY", 0.02)
+    stats.show_stats()
+    text = path.read_text()
+    assert 'yt_command_latency_seconds_bucket{command="PLAY",le="0.0025"} 1' in text
+    assert 'yt_command_latency_seconds_bucket{command="PLAY",le="+Inf"} 2' in text
+    assert 'yt_command_latency_seconds_count{command="PLAY"} 2' in text
+
+
+def test_concurrent_writers_use_their_own_temp_files(tmp_path):
+    path = tmp_path / "metrics.prom"
+    stats = CommandStats(str(path))
+    stats.record("PLAY", 0.002)
+    threads = [threading.Thread(target=stats.write_prometheus,
+                                args=(str(path),)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert os.listdir(tmp_path) == ["metrics.prom"]
+    assert path.read_text() == stats.to_prometheus()
+
+
+def test_search_latency_excludes_the_prompt(capfd):
+    stats = CommandStats()
+    parser = CommandParser(VideoPlayer(), stats)
+    recorded = []
+
+    def answer(*args):
+        # The search is timed before the user is asked.
+        recorded.append(stats.get_metrics("SEARCH_VIDEOS"))
+        return "No"
+
+    with mock.patch('builtins.input', answer):
+        parser.execute_command(["SEARCH_VIDEOS", "cat"])
+    out, err = capfd.readouterr()
+    assert "Would you like to play any of the above?" in out
+    assert recorded[0] is not None and recorded[0].calls == 1
+
+
+def test_unknown_commands_share_one_name(capfd):
+    stats = CommandStats()
+    parser = CommandParser(VideoPlayer(), stats)
+    for command in (["DANCE"], ["SING", "loudly"], []):
+        try:
+            parser.execute_command(command)
+        except CommandException:
+            pass
+    assert stats.get_metrics("INVALID").calls == 3
+    assert stats.get_metrics("DANCE") is None
+
+
+def test_prometheus_labels_are_escaped():
+    stats = CommandStats()
+    stats.record('A"B\\C\nD', 0.001)
+    text = stats.to_prometheus()
+    assert 'command="A\\"B\\\\C\\nD"' in text
+
+
+def test_run_writes_outputs_at_end_of_input(tmp_path):
+    metrics = tmp_path / "metrics.prom"
+    profile = tmp_path / "profile.txt"
+    completed = subprocess.run(
+        [sys.executable, "-m", "src.run", "--metrics-file", str(metrics),
+         "--profile", str(profile)],
+        input="NUMBER_OF_VIDEOS\n", capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert completed.returncode == 0
+    assert 'command="NUMBER_OF_VIDEOS"' in metrics.read_text()
+    assert profile.exists()
+    assert completed.stdout.splitlines()[-1].endswith(
+        "Thank you and goodbye!")
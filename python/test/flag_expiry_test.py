@@ -0,0 +1,102 @@
+from unittest import mock
+
+from src.command_parser import CommandParser
+from src.playback_clock import PlaybackClock
+from src.player_output import RecordingRenderer
+from src.video_player import VideoPlayer
+
+
+@mock.patch('builtins.input', lambda *args: 'No')
+def test_flag_expires_and_invalidates_caches(capfd):
+    player = VideoPlayer()
+    parser = CommandParser(player)
+    parser.execute_command(["SEARCH_VIDEOS", "cat"])
+    parser.execute_command(["FLAG_VIDEO_FOR", "amazing_cats_video_id", "60",
+                            "takedown"])
+    parser.execute_command(["SEARCH_VIDEOS", "cat"])
+    parser.execute_command(["ADVANCE", "59"])
+    parser.execute_command(["PLAY", "amazing_cats_video_id"])
+    capfd.readouterr()
+    parser.execute_command(["ADVANCE", "1"])
+    parser.execute_command(["SEARCH_VIDEOS", "cat"])
+    parser.execute_command(["PLAY", "amazing_cats_video_id"])
+    out, err = capfd.readouterr()
+    assert out.splitlines()[:3] == [
+        "Flag expired on video: Amazing Cats",
+        "Advanced the playback clock by 1 seconds",
+        "Here are the results for cat:",
+    ]
+    assert "  1) Amazing Cats (amazing_cats_video_id) [#cat #animal]" in out
+    assert out.splitlines()[-1] == "Playing video: Amazing Cats"
+    assert player._flagged == {}
+
+
+def test_allow_and_reflag_cancel_expiry():
+    clock = PlaybackClock()
+    player = VideoPlayer(output=RecordingRenderer(), clock=clock)
+    player.flag_video("amazing_cats_video_id", "a", ttl=10)
+    player.flag_video("funny_dogs_video_id", "b", ttl=10)
+    player.allow_video("amazing_cats_video_id")
+    player.flag_video("amazing_cats_video_id", "permanent")
+    assert len(clock) == 1
+    clock.advance(20)
+    assert player._flagged == {"amazing_cats_video_id": "permanent"}
+    assert len(clock) == 0
+
+
+def test_flag_many_with_ttl_and_undo():
+    clock = PlaybackClock()
+    output = RecordingRenderer()
+    player = VideoPlayer(output=output, clock=clock)
+    player.flag_videos([("amazing_cats_video_id", "a"),
+                        ("funny_dogs_video_id", "b")], ttl=30)
+    player.undo()
+    assert player._flagged == {}
+    assert len(clock) == 0
+    player.redo()
+    assert len(clock) == 2
+    clock.advance(30)
+    assert player._flagged == {}
+    assert [result.code for result in output.results][-2:] == [
+        "flag_expired", "flag_expired"]
+
+
+def test_expired_flags_leave_the_undo_log():
+    clock = PlaybackClock()
+    output = RecordingRenderer()
+    player = VideoPlayer(output=output, clock=clock)
+    player.create_playlist("list")
+    player.flag_video("amazing_cats_video_id", "a", ttl=10)
+    clock.advance(10)
+    player.undo()
+    assert output.results[-1].fields["command"] == "CREATE_PLAYLIST list"
+    player.redo()
+    assert output.results[-1].fields["command"] == "CREATE_PLAYLIST list"
+    player.redo()
+    assert output.results[-1].code == "redo.empty"
+    assert player._flagged == {}
+
+
+def test_redo_keeps_the_expiry_time_of_a_flag():
+    clock = PlaybackClock()
+    output = RecordingRenderer()
+    player = VideoPlayer(output=output, clock=clock)
+    player.flag_video("amazing_cats_video_id", "a", ttl=10)
+    clock.advance(4)
+    player.undo()
+    clock.advance(2)
+    player.redo()
+    clock.advance(3)
+    assert player._flagged == {"amazing_cats_video_id": "a"}
+    clock.advance(1)
+    assert player._flagged == {}
+    player.undo()
+    assert output.results[-1].code == "undo.empty"
+
+    player.flag_video("amazing_cats_video_id", "a", ttl=10)
+    player.undo()
+    clock.advance(10)
+    player.redo()
+    assert output.results[-1].code == "redo.empty"
+    assert player._flagged == {}
+    assert len(clock) == 0
@@ -0,0 +1,53 @@
+import asyncio
+import random
+import time
+
+from benchmark import load_harness
+from src.video_library import VideoLibrary
+
+
+def test_synthetic_session_follows_the_mix():
+    library = VideoLibrary()
+    session = load_harness.synthetic_session(
+        library, 200, {"play": 0, "search": 1, "playlist": 0, "flag": 0},
+        rate=100.0, rng=random.Random(3))
+    assert len(session) == 200
+    offsets = [offset for offset, command in session]
+    assert offsets == sorted(offsets) and offsets[0] > 0
+    assert set(command[0] for offset, command in session) <= {
+        "SEARCH_VIDEOS", "SEARCH_VIDEOS_WITH_TAG", "SEARCH_RANKED"}
+    assert session == load_harness.synthetic_session(
+        library, 200, {"play": 0, "search": 1, "playlist": 0, "flag": 0},
+        rate=100.0, rng=random.Random(3))
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 101))
+    assert load_harness.percentile(values, 0.5) == 50
+    assert load_harness.percentile(values, 0.99) == 99
+    assert load_harness.percentile(values, 0.999) == 100
+    assert load_harness.percentile([7], 0.0) == 7
+
+
+def test_latency_includes_the_wait_behind_slow_commands():
+    class SlowParser:
+        def execute_command(self, command):
+            time.sleep(0.05)
+
+    latencies = {}
+    # Both commands are due at once, so the second waits for the first.
+    asyncio.run(load_harness._replay(
+        SlowParser(), [(0.0, ["PLAY"]), (0.0, ["PLAY"])], 1.0, latencies,
+        {}))
+    assert latencies["PLAY"][1] >= 0.1
+
+
+def test_run_load_replays_every_command():
+    jobs = [("synthetic", 20, load_harness.DEFAULT_MIX, 10.0, seed)
+            for seed in range(2)]
+    latencies, errors, commands, elapsed = load_harness.run_load(
+        jobs, speed=0, workers=1)
+    assert commands == 40
+    assert sum(len(values) for values in latencies.values()) == 40
+    assert all(values == sorted(values) for values in latencies.values())
+    assert elapsed > 0
@@ -0,0 +1,58 @@
+from src.lru_cache import LRUCache
+from src.video_player import VideoPlayer
+
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    assert cache.put("c", 3) == ("b", 2)
+    assert "b" not in cache
+    assert cache.get("b") is None
+    assert len(cache) == 2
+    assert cache.hits == 1
+    assert cache.misses == 1
+    assert cache.hit_rate() == 0.5
+
+
+def test_pop_and_clear():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    assert cache.pop("a") == 1
+    assert cache.pop("a") is None
+    cache.put("b", 2)
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_cached_rows_follow_flags(capfd):
+    player = VideoPlayer(row_cache_size=2)
+    player.show_all_videos()
+    player.flag_video("amazing_cats_video_id", "dont_like_cats")
+    player.show_all_videos()
+    player.allow_video("amazing_cats_video_id")
+    player.show_all_videos()
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert len(lines) == 20
+    assert "Amazing Cats (amazing_cats_video_id) [#cat #animal]" == lines[1]
+    assert ("Amazing Cats (amazing_cats_video_id) [#cat #animal] - FLAGGED "
+            "(reason: dont_like_cats)") == lines[8]
+    assert "Amazing Cats (amazing_cats_video_id) [#cat #animal]" == lines[15]
+
+
+def test_thread_safe_reads_do_not_wait_for_the_lock():
+    cache = LRUCache(2, thread_safe=True)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    with cache._lock:
+        # A writer holds the lock, the read goes ahead without
+        # reordering.
+        assert cache.get("a") == 1
+        assert cache.get("c") is None
+    assert cache.put("c", 3) == ("a", 1)
+    assert cache.get("b") == 2
+    assert cache.put("d", 4) == ("c", 3)
+    assert cache.hits == 2
+    assert cache.misses == 1
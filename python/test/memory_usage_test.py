@@ -0,0 +1,90 @@
+import random
+import sys
+from unittest import mock
+
+from src.command_parser import CommandParser
+from src.memory_usage import AllocationTracer, object_size, sampled_size
+from src.player_output import RecordingRenderer
+from src.video_player import VideoPlayer
+
+
+def test_object_size_counts_contents_once():
+    title = "x" * 1000
+    pair = [title, title]
+    assert object_size(pair, 0) == sys.getsizeof(pair)
+    assert object_size(pair, 1) == sys.getsizeof(pair) + sys.getsizeof(title)
+    assert object_size({"key": pair}, 2) == (
+        sys.getsizeof({"key": pair}) + sys.getsizeof("key")
+        + object_size(pair, 1))
+
+
+def test_sampled_size_scales_the_sample():
+    items = ["x" * 100] * 10000
+    assert sampled_size(items, sys.getsizeof, sample=10,
+                        rng=random.Random(0)) == \
+        10000 * sys.getsizeof(items[0])
+    assert sampled_size({}, sys.getsizeof) == 0
+    assert sampled_size({"a": 1, "b": 2}.keys(), lambda key: 3) == 6
+
+
+def test_sampled_size_leaves_the_global_generator_alone():
+    random.seed(5)
+    expected = random.random()
+    random.seed(5)
+    sampled_size(list(range(1000)), sys.getsizeof, sample=10)
+    assert random.random() == expected
+
+
+def test_memory_usage_follows_the_player():
+    player = VideoPlayer(output=RecordingRenderer())
+    before = {item["name"]: item for item in player.memory_usage()}
+    assert before["Videos"]["count"] == 5
+    assert "Ranked search index" not in before
+
+    player.create_playlist("list")
+    player.add_to_playlist("list", "amazing_cats_video_id")
+    player.flag_video("funny_dogs_video_id", "x" * 10000)
+    player.search_ranked("cat", prompt=False)
+    after = {item["name"]: item for item in player.memory_usage()}
+    assert after["Playlists"]["count"] == 1
+    assert after["Playlists"]["bytes"] > before["Playlists"]["bytes"]
+    assert after["Flags"]["bytes"] > before["Flags"]["bytes"] + 10000
+    assert after["Undo log"]["count"] == 3
+    assert after["Ranked search index"]["count"] > 0
+
+
+def test_memory_usage_does_not_copy_the_library():
+    player = VideoPlayer(output=RecordingRenderer())
+    with mock.patch.object(player._video_library, "get_all_videos",
+                           side_effect=AssertionError):
+        usage = {item["name"]: item for item in player.memory_usage()}
+    assert usage["Videos"]["count"] == 5
+
+
+def test_memory_diff_reports_growth():
+    tracer = AllocationTracer()
+    try:
+        assert tracer.diff() is None
+        kept = [bytearray(100000)]
+        stats = tracer.diff()
+        assert any(stat.size_diff >= 100000 for stat in stats)
+    finally:
+        tracer.stop()
+    del kept
+
+
+def test_memory_commands(capfd):
+    parser = CommandParser(VideoPlayer())
+    parser.execute_command(["MEMORY"])
+    parser.execute_command(["MEMORY", "diff"])
+    parser.execute_command(["MEMORY", "STOP"])
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert lines[0].startswith("Showing approximate memory usage (")
+    assert lines[1].startswith("  Video library: ")
+    assert lines[1].endswith(" (5 entries)")
+    assert lines[-2:] == [
+        "Tracing memory allocations, enter MEMORY DIFF again to see what "
+        "changed",
+        "Stopped tracing memory allocations",
+    ]
@@ -235,3 +235,17 @@ def test_delete_playlist_nonexistent(capfd):
     lines = out.splitlines()
     assert len(lines) == 1
     assert "Cannot delete playlist my_cool_playlist: Playlist does not exist" in lines[0]
+
+
+def test_clear_playlist_with_several_videos(capfd):
+    player = VideoPlayer()
+    player.create_playlist("my_cool_playlist")
+    player.add_to_playlist("my_cool_playlist", "amazing_cats_video_id")
+    player.add_to_playlist("my_cool_playlist", "funny_dogs_video_id")
+    player.clear_playlist("my_cool_playlist")
+    player.show_playlist("my_cool_playlist")
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert len(lines) == 6
+    assert "Successfully removed all videos from my_cool_playlist" in lines[3]
+    assert "No videos here yet" in lines[5]
@@ -0,0 +1,107 @@
+from src.command_parser import CommandParser
+from src.playback_clock import PlaybackClock, PlaybackSession
+from src.player_output import RecordingRenderer
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+
+def test_timers_fire_in_order_at_their_time():
+    clock = PlaybackClock()
+    fired = []
+    for delay in (5, 1, 3, 3):
+        clock.schedule(delay, lambda delay=delay: fired.append(
+            (delay, clock.now())))
+    cancelled = clock.schedule(2, lambda: fired.append("cancelled"))
+    clock.cancel(cancelled)
+    assert len(clock) == 4
+    assert clock.advance(3) == 3
+    assert fired == [(1, 1), (3, 3), (3, 3)]
+    assert clock.now() == 3
+    assert clock.advance(10) == 1
+    assert clock.now() == 13
+    assert len(clock) == 0
+
+
+def test_session_position_and_elapsed():
+    clock = PlaybackClock()
+    ended = []
+    session = PlaybackSession(clock, ended.append, lambda video: 100)
+    video = VideoLibrary().get_video("amazing_cats_video_id")
+    session.start(video)
+    clock.advance(30)
+    session.pause()
+    clock.advance(50)
+    assert session.position == 30
+    assert session.paused
+    session.resume()
+    clock.advance(60)
+    assert ended == []
+    clock.advance(10)
+    assert ended == [video]
+    assert session.position == 100
+    assert session.elapsed == 100
+    assert clock.now() == 150
+
+
+def test_many_sessions_share_one_clock():
+    clock = PlaybackClock()
+    library = VideoLibrary()
+    players = []
+    for index in range(1000):
+        player = VideoPlayer(library, output=RecordingRenderer(), clock=clock,
+                             video_duration=lambda video: 60 + index % 7)
+        player.create_playlist("list")
+        player.add_to_playlist("list", "amazing_cats_video_id")
+        player.add_to_playlist("list", "funny_dogs_video_id")
+        player.play_playlist("list")
+        players.append(player)
+    assert len(clock) == 1000
+    clock.advance(70)
+    assert all(player._current_video.video_id == "funny_dogs_video_id"
+               for player in players)
+    clock.advance(70)
+    assert all(player._current_video == None for player in players)
+    assert len(clock) == 0
+
+
+def test_position_commands(capfd):
+    parser = CommandParser(VideoPlayer(video_duration=lambda video: 90))
+    parser.execute_command(["SHOW_POSITION"])
+    parser.execute_command(["PLAY", "amazing_cats_video_id"])
+    parser.execute_command(["ADVANCE", "30"])
+    parser.execute_command(["PAUSE"])
+    parser.execute_command(["ADVANCE", "30"])
+    parser.execute_command(["SHOW_POSITION"])
+    parser.execute_command(["CONTINUE"])
+    parser.execute_command(["ADVANCE", "60.5"])
+    parser.execute_command(["SHOW_PLAYING"])
+    out, err = capfd.readouterr()
+    assert out.splitlines() == [
+        "No video is currently playing",
+        "Playing video: Amazing Cats",
+        "Advanced the playback clock by 30 seconds",
+        "Pausing video: Amazing Cats",
+        "Advanced the playback clock by 30 seconds",
+        "Position: 0:30 of 1:30 in Amazing Cats (played 0:30 in total) "
+        "- PAUSED",
+        "Continuing video: Amazing Cats",
+        "Stopping video: Amazing Cats",
+        "Advanced the playback clock by 60.5 seconds",
+        "No video is currently playing",
+    ]
+
+
+def test_playing_after_a_paused_stop_is_not_paused(capfd):
+    parser = CommandParser(VideoPlayer(video_duration=lambda video: 90))
+    parser.execute_command(["PLAY", "amazing_cats_video_id"])
+    parser.execute_command(["PAUSE"])
+    parser.execute_command(["STOP"])
+    parser.execute_command(["PLAY", "funny_dogs_video_id"])
+    parser.execute_command(["ADVANCE", "10"])
+    parser.execute_command(["SHOW_POSITION"])
+    parser.execute_command(["PAUSE"])
+    out, err = capfd.readouterr()
+    assert out.splitlines()[-2:] == [
+        "Position: 0:10 of 1:30 in Funny Dogs (played 0:10 in total)",
+        "Pausing video: Funny Dogs",
+    ]
@@ -0,0 +1,81 @@
+import pytest
+
+from src.playback_history import PlaybackHistory, PLAY, PAUSE, STOP
+from src.video import Video
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+
+def test_ring_buffer_keeps_latest_events():
+    ticks = iter(range(100))
+    history = PlaybackHistory(capacity=3, clock=lambda: next(ticks))
+    video = Video("Title", "video_id", ["#tag"])
+    for event in (PLAY, PAUSE, STOP, PLAY, STOP):
+        history.record(event, video)
+    assert len(history) == 3
+    assert history.recent() == [
+        (4.0, "STOP", "video_id"),
+        (3.0, "PLAY", "video_id"),
+        (2.0, "STOP", "video_id"),
+    ]
+    assert history.play_count("video_id") == 2
+    assert history.tag_play_counts() == [("#tag", 2)]
+
+
+def test_ring_buffer_rejects_empty_capacity():
+    with pytest.raises(ValueError):
+        PlaybackHistory(capacity=0)
+
+
+def test_show_top_played(capfd):
+    player = VideoPlayer()
+    player.play_video("amazing_cats_video_id")
+    player.play_video("funny_dogs_video_id")
+    player.play_video("amazing_cats_video_id")
+    player.show_top_played(2)
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert "Showing most played videos:" in lines[5]
+    assert "1) Amazing Cats (amazing_cats_video_id) - 2 plays" in lines[6]
+    assert "2) Funny Dogs (funny_dogs_video_id) - 1 plays" in lines[7]
+
+
+def test_show_tag_plays_and_history(capfd):
+    player = VideoPlayer()
+    player.play_video("amazing_cats_video_id")
+    player.pause_video()
+    player.show_tag_plays()
+    player.show_history()
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert "Showing plays per tag:" in lines[2]
+    assert "#cat: 1 plays" in out
+    assert "#animal: 1 plays" in out
+    assert "Showing playback history:" in lines[5]
+    assert "PAUSE Amazing Cats" in lines[6]
+    assert "PLAY Amazing Cats" in lines[7]
+
+
+def test_show_history_empty(capfd):
+    player = VideoPlayer()
+    player.show_history()
+    player.show_top_played()
+    out, err = capfd.readouterr()
+    assert out.splitlines() == ["No playback history yet",
+                                "No videos have been played yet"]
+
+
+def test_history_after_reload_leaves_out_removed_videos(capfd):
+    player = VideoPlayer()
+    player.play_video("amazing_cats_video_id")
+    player.play_video("funny_dogs_video_id")
+    library = player._video_library
+    player.reload_library(VideoLibrary([
+        video for video in library.get_all_videos()
+        if video.video_id != "amazing_cats_video_id"]))
+    capfd.readouterr()
+    player.show_history()
+    player.show_top_played()
+    out, err = capfd.readouterr()
+    assert "Amazing Cats" not in out
+    assert "1) Funny Dogs (funny_dogs_video_id) - 1 plays" in out
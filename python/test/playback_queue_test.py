@@ -0,0 +1,138 @@
+import random
+
+from src.command_parser import CommandParser
+from src.playback_queue import PlaybackQueue, REPEAT_ALL
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+from src.video_playlist import Playlist
+
+VIDEO_IDS = ["amazing_cats_video_id", "another_cat_video_id",
+             "funny_dogs_video_id", "life_at_google_video_id",
+             "nothing_video_id"]
+
+
+def _playlist(video_ids=VIDEO_IDS):
+    playlist = Playlist("list")
+    for video_id in video_ids:
+        playlist._videos[video_id] = True
+    return playlist
+
+
+def _play_all(queue):
+    played = []
+    while True:
+        video = queue.next()
+        if video is None:
+            return played
+        played.append(video.video_id)
+
+
+def test_plays_in_order_and_back():
+    queue = PlaybackQueue(_playlist(), VideoLibrary(), lambda video_id: False,
+                          prefetch=2)
+    assert queue.next().video_id == VIDEO_IDS[0]
+    assert queue.next().video_id == VIDEO_IDS[1]
+    assert queue.next().video_id == VIDEO_IDS[2]
+    assert queue.previous().video_id == VIDEO_IDS[1]
+    assert queue.previous().video_id == VIDEO_IDS[0]
+    assert queue.previous() is None
+    assert [video.video_id for video in queue.upcoming()] == VIDEO_IDS[1:]
+    assert _play_all(queue) == VIDEO_IDS[1:]
+
+
+def test_skips_flagged_and_follows_changes():
+    flagged = {"another_cat_video_id"}
+    playlist = _playlist()
+    queue = PlaybackQueue(playlist, VideoLibrary(),
+                          lambda video_id: video_id in flagged, prefetch=1)
+    assert queue.next().video_id == "amazing_cats_video_id"
+    flagged.add("funny_dogs_video_id")
+    # The playlist is changed while the queue walks it.
+    playlist._videos.pop("nothing_video_id")
+    playlist._videos["nothing_video_id"] = True
+    playlist._videos.move_to_end("life_at_google_video_id")
+    assert _play_all(queue) == ["nothing_video_id", "life_at_google_video_id"]
+
+
+def test_removing_prefetched_videos_keeps_the_rest():
+    playlist = _playlist()
+    queue = PlaybackQueue(playlist, VideoLibrary(), lambda video_id: False,
+                          prefetch=1)
+    assert queue.next().video_id == VIDEO_IDS[0]
+    playlist._videos.pop(VIDEO_IDS[1])
+    assert _play_all(queue) == VIDEO_IDS[2:]
+
+    playlist = _playlist()
+    queue = PlaybackQueue(playlist, VideoLibrary(), lambda video_id: False,
+                          prefetch=2)
+    assert queue.next().video_id == VIDEO_IDS[0]
+    # Both prefetched videos and the current one are gone.
+    for video_id in VIDEO_IDS[:3]:
+        playlist._videos.pop(video_id)
+    assert [video.video_id for video in queue.upcoming()] == VIDEO_IDS[3:]
+    assert _play_all(queue) == VIDEO_IDS[3:]
+
+
+def test_shuffle_and_repeat():
+    queue = PlaybackQueue(_playlist(), VideoLibrary(), lambda video_id: False,
+                          shuffle=True, rng=random.Random(1))
+    played = _play_all(queue)
+    assert sorted(played) == sorted(VIDEO_IDS)
+
+    queue = PlaybackQueue(_playlist(VIDEO_IDS[:2]), VideoLibrary(),
+                          lambda video_id: False, repeat=REPEAT_ALL)
+    assert [queue.next().video_id for _ in range(5)] == [
+        VIDEO_IDS[0], VIDEO_IDS[1], VIDEO_IDS[0], VIDEO_IDS[1], VIDEO_IDS[0]]
+
+
+def test_playlist_commands(capfd):
+    player = VideoPlayer()
+    parser = CommandParser(player)
+    parser.execute_command(["NEXT"])
+    parser.execute_command(["CREATE_PLAYLIST", "list"])
+    parser.execute_command(["PLAY_PLAYLIST", "list"])
+    for video_id in VIDEO_IDS[:3]:
+        parser.execute_command(["ADD_TO_PLAYLIST", "list", video_id])
+    parser.execute_command(["FLAG_VIDEO", "another_cat_video_id"])
+    capfd.readouterr()
+
+    parser.execute_command(["PLAY_PLAYLIST", "LIST"])
+    parser.execute_command(["SHOW_QUEUE"])
+    parser.execute_command(["NEXT"])
+    parser.execute_command(["NEXT"])
+    parser.execute_command(["PREVIOUS"])
+    parser.execute_command(["REPEAT", "one"])
+    parser.execute_command(["NEXT"])
+    out, err = capfd.readouterr()
+    assert out.splitlines() == [
+        "Playing video: Amazing Cats",
+        "Up next in list (shuffle off, repeat off):",
+        "  1) Funny Dogs (funny_dogs_video_id) [#dog #animal]",
+        "Stopping video: Amazing Cats",
+        "Playing video: Funny Dogs",
+        "Cannot play next video: Reached the end of list",
+        "Stopping video: Funny Dogs",
+        "Playing video: Amazing Cats",
+        "Repeat is now one",
+        "Stopping video: Amazing Cats",
+        "Playing video: Amazing Cats",
+    ]
+
+
+def test_playlist_command_errors(capfd):
+    parser = CommandParser(VideoPlayer())
+    parser.execute_command(["CREATE_PLAYLIST", "list"])
+    capfd.readouterr()
+    parser.execute_command(["PLAY_PLAYLIST", "missing"])
+    parser.execute_command(["PLAY_PLAYLIST", "list"])
+    parser.execute_command(["PREVIOUS"])
+    parser.execute_command(["SHOW_QUEUE"])
+    parser.execute_command(["SHUFFLE", "on"])
+    out, err = capfd.readouterr()
+    assert out.splitlines() == [
+        "Cannot play playlist missing: Playlist does not exist",
+        "Cannot play playlist list: No videos to play",
+        "Cannot play previous video: No playlist is playing",
+        "No playlist is playing",
+        "Shuffle is now on",
+    ]
@@ -0,0 +1,121 @@
+import io
+import json
+import os
+import subprocess
+import sys
+from unittest import mock
+
+from src.command_parser import CommandParser
+from src.player_output import JsonRenderer, RecordingRenderer, Result
+from src.player_output import TextRenderer
+from src.video_player import VideoPlayer
+
+
+def _json_lines(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_json_messages():
+    stream = io.StringIO()
+    player = VideoPlayer(output=JsonRenderer(stream))
+    player.number_of_videos()
+    player.play_video("amazing_cats_video_id")
+    player.play_video("does_not_exist")
+    assert _json_lines(stream) == [
+        {"result": "number_of_videos", "count": 5},
+        {"result": "playing", "title": "Amazing Cats"},
+        {"result": "play.not_found"},
+    ]
+
+
+def test_json_listing_items():
+    stream = io.StringIO()
+    player = VideoPlayer(output=JsonRenderer(stream))
+    player.flag_video("funny_dogs_video_id", "dont_like_dogs")
+    player.show_all_videos()
+    lines = _json_lines(stream)
+    assert len(lines) == 2
+    assert lines[1]["result"] == "all_videos"
+    assert len(lines[1]["items"]) == 5
+    assert lines[1]["items"][0] == {
+        "title": "Amazing Cats", "video_id": "amazing_cats_video_id",
+        "tags": ["#cat", "#animal"], "flag_reason": None}
+    assert lines[1]["items"][2]["flag_reason"] == "dont_like_dogs"
+
+
+def test_json_listing_is_streamed():
+    stream = io.StringIO()
+    renderer = JsonRenderer(stream)
+    written = []
+
+    def items():
+        for plays in (1, 2):
+            written.append(stream.getvalue())
+            yield {"tag": "#cat", "plays": plays}
+
+    renderer.render(Result("tag_plays", items=items()))
+    assert written[0] == '{"result":"tag_plays","items":['
+    assert json.loads(stream.getvalue())["items"][1]["plays"] == 2
+
+
+@mock.patch('builtins.input', lambda *args: 'No')
+def test_json_search_and_errors():
+    stream = io.StringIO()
+    player = VideoPlayer(output=JsonRenderer(stream))
+    parser = CommandParser(player)
+    parser.execute_command(["SEARCH_VIDEOS", "cat"])
+    parser.execute_command(["NOT_A_COMMAND"])
+    lines = _json_lines(stream)
+    assert lines[0]["result"] == "search_results"
+    assert lines[0]["search_term"] == "cat"
+    assert [item["video_id"] for item in lines[0]["items"]] == [
+        "amazing_cats_video_id", "another_cat_video_id"]
+    assert lines[1] == {"result": "search.prompt"}
+    assert lines[2] == {"result": "invalid_command"}
+
+
+def test_recording_renderer():
+    output = RecordingRenderer()
+    player = VideoPlayer(output=output)
+    player.create_playlist("my_playlist")
+    player.add_to_playlist("my_playlist", "amazing_cats_video_id")
+    player.show_playlist("my_playlist")
+    assert [result.code for result in output.results] == [
+        "playlist_created", "added_to_playlist", "playlist"]
+    video, flag_reason = output.results[2].fields["items"][0]
+    assert video.video_id == "amazing_cats_video_id"
+    assert flag_reason == None
+
+
+def test_text_renderer_stream():
+    stream = io.StringIO()
+    player = VideoPlayer(output=TextRenderer(stream))
+    player.play_video("amazing_cats_video_id")
+    player.pause_video()
+    player.show_playing()
+    assert stream.getvalue().splitlines() == [
+        "Playing video: Amazing Cats",
+        "Pausing video: Amazing Cats",
+        "Currently playing: Amazing Cats (amazing_cats_video_id) "
+        "[#cat #animal] - PAUSED",
+    ]
+
+
+def test_run_json_writes_only_json_lines():
+    completed = subprocess.run(
+        [sys.executable, "-m", "src.run", "--json"],
+        input="NUMBER_OF_VIDEOS\nEXIT\n", capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert [json.loads(line) for line in completed.stdout.splitlines()] == [
+        {"result": "number_of_videos", "count": 5}]
+
+
+def test_run_json_searches_do_not_read_the_next_command():
+    completed = subprocess.run(
+        [sys.executable, "-m", "src.run", "--json"],
+        input="SEARCH_VIDEOS cat\nNUMBER_OF_VIDEOS\nEXIT\n",
+        capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    results = [json.loads(line) for line in completed.stdout.splitlines()]
+    assert [result["result"] for result in results] == [
+        "search_results", "number_of_videos"]
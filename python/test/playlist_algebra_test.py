@@ -0,0 +1,74 @@
+from src.command_parser import CommandParser
+from src.video_player import VideoPlayer
+
+
+def _parser_with_playlists():
+    player = VideoPlayer()
+    parser = CommandParser(player)
+    playlists = {
+        "a": ["funny_dogs_video_id", "amazing_cats_video_id",
+              "another_cat_video_id"],
+        "b": ["life_at_google_video_id", "another_cat_video_id",
+              "amazing_cats_video_id"],
+        "c": ["amazing_cats_video_id", "nothing_video_id"],
+    }
+    for name, video_ids in playlists.items():
+        parser.execute_command(["CREATE_PLAYLIST", name])
+        for video_id in video_ids:
+            parser.execute_command(["ADD_TO_PLAYLIST", name, video_id])
+    return player, parser
+
+
+def _playlist(player, name):
+    return list(player._playlists[name]._videos)
+
+
+def test_union_keeps_first_seen_order(capfd):
+    player, parser = _parser_with_playlists()
+    capfd.readouterr()
+    parser.execute_command(["PLAYLIST_UNION", "A", "b", "c", "->", "all"])
+    out, err = capfd.readouterr()
+    assert out == "Successfully created new playlist: all (5 videos)\n"
+    assert _playlist(player, "all") == [
+        "funny_dogs_video_id", "amazing_cats_video_id",
+        "another_cat_video_id", "life_at_google_video_id", "nothing_video_id"]
+    parser.execute_command(["ADD_TO_PLAYLIST", "all", "funny_dogs_video_id"])
+    out, err = capfd.readouterr()
+    assert out == "Cannot add video to all: Video already added\n"
+
+
+def test_intersect_and_diff():
+    player, parser = _parser_with_playlists()
+    parser.execute_command(["PLAYLIST_INTERSECT", "a", "b", "->", "ab"])
+    parser.execute_command(["PLAYLIST_INTERSECT", "a", "b", "c", "->", "abc"])
+    parser.execute_command(["PLAYLIST_DIFF", "a", "c", "->", "a_not_c"])
+    parser.execute_command(["PLAYLIST_DIFF", "b", "a", "c", "->", "b_only"])
+    assert _playlist(player, "ab") == [
+        "amazing_cats_video_id", "another_cat_video_id"]
+    assert _playlist(player, "abc") == ["amazing_cats_video_id"]
+    assert _playlist(player, "a_not_c") == [
+        "funny_dogs_video_id", "another_cat_video_id"]
+    assert _playlist(player, "b_only") == ["life_at_google_video_id"]
+
+
+def test_flagged_videos_are_left_out(capfd):
+    player, parser = _parser_with_playlists()
+    parser.execute_command(["FLAG_VIDEO", "amazing_cats_video_id"])
+    parser.execute_command(["PLAYLIST_UNION", "a", "c", "->", "all"])
+    assert _playlist(player, "all") == [
+        "funny_dogs_video_id", "another_cat_video_id", "nothing_video_id"]
+    parser.execute_command(["UNDO"])
+    assert "all" not in player._playlists
+
+
+def test_combine_errors(capfd):
+    player, parser = _parser_with_playlists()
+    capfd.readouterr()
+    parser.execute_command(["PLAYLIST_UNION", "a", "missing", "->", "new"])
+    parser.execute_command(["PLAYLIST_DIFF", "a", "b", "->", "C"])
+    out, err = capfd.readouterr()
+    assert out.splitlines() == [
+        "Cannot create playlist new: Playlist missing does not exist",
+        "Cannot create playlist: A playlist with the same name already exists",
+    ]
+    assert "new" not in player._playlists
@@ -0,0 +1,47 @@
+from src.command_parser import CommandParser
+from src.prefix_index import PrefixIndex
+from src.video_player import VideoPlayer
+
+
+def test_complete_is_case_insensitive_and_bounded():
+    index = PrefixIndex(["Apple", "apricot", "Banana", "apple pie"])
+    assert [word for key, word in index.complete("AP")] == [
+        "Apple", "apple pie", "apricot"]
+    assert [word for key, word in index.complete("ap", 1)] == ["Apple"]
+    assert index.complete("c") == []
+
+
+def test_add_and_remove():
+    index = PrefixIndex()
+    index.add("one")
+    index.add("one")
+    index.add("other")
+    assert len(index) == 2
+    index.remove("one")
+    index.remove("missing")
+    assert [word for key, word in index.complete("o")] == ["other"]
+
+
+def test_suggest_titles_tags_and_playlists():
+    player = VideoPlayer()
+    player.create_playlist("Animal_Videos")
+    assert player.suggest("a") == [
+        ("Amazing Cats", "title"),
+        ("Animal_Videos", "playlist"),
+        ("Another Cat Video", "title"),
+    ]
+    assert player.suggest("#ca") == [("#career", "tag"), ("#cat", "tag")]
+    player.delete_playlist("animal_videos")
+    assert ("Animal_Videos", "playlist") not in player.suggest("a")
+
+
+def test_suggest_command(capfd):
+    parser = CommandParser(VideoPlayer())
+    parser.execute_command(["SUGGEST", "li"])
+    parser.execute_command(["SUGGEST", "xyz"])
+    out, err = capfd.readouterr()
+    assert out.splitlines() == [
+        "Here are the suggestions for li:",
+        "  Life at Google (title)",
+        "No suggestions for xyz",
+    ]
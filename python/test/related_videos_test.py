@@ -0,0 +1,63 @@
+from src.command_parser import CommandParser
+from src.related_videos import RelatedVideos
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+
+def _library(tmp_path):
+    path = tmp_path / "videos.txt"
+    path.write_text(
+        "Rare Pair One | one | #rare, #common\n"
+        "Rare Pair Two | two | #rare, #common\n"
+        "Common Only | three | #common\n"
+        "Common And Other | four | #COMMON, #other\n"
+        "Untagged | five | \n")
+    return VideoLibrary(str(path))
+
+
+def test_rare_tags_count_for_more(tmp_path):
+    related = RelatedVideos(_library(tmp_path))
+    ranked = related.related("one", count=10)
+    assert [video.video_id for video, score in ranked] == [
+        "two", "three", "four"]
+    assert ranked[0][1] > 0.99
+    assert ranked[1][1] > ranked[2][1]
+    assert related.related("five") == []
+    assert related.related("missing") == []
+
+
+def test_flags_and_precomputed_neighbours(tmp_path):
+    related = RelatedVideos(_library(tmp_path))
+    related.precompute(["one"], count=1)
+    flagged = {"two"}
+    ranked = related.related("one", count=2,
+                             is_flagged=lambda video_id: video_id in flagged)
+    assert [video.video_id for video, score in ranked] == ["three", "four"]
+    assert [video.video_id for video, score in related.related("one", 1)] \
+        == ["two"]
+
+
+def test_related_command(capfd):
+    parser = CommandParser(VideoPlayer())
+    parser.execute_command(["FLAG_VIDEO", "funny_dogs_video_id"])
+    capfd.readouterr()
+    parser.execute_command(["RELATED", "amazing_cats_video_id"])
+    parser.execute_command(["RELATED", "another_cat_video_id", "1"])
+    parser.execute_command(["RELATED", "nothing_video_id"])
+    parser.execute_command(["RELATED", "missing"])
+    out, err = capfd.readouterr()
+    assert out.splitlines() == [
+        "Here are the videos related to Amazing Cats:",
+        "  1) Another Cat Video (another_cat_video_id) [#cat #animal]",
+        "Here are the videos related to Another Cat Video:",
+        "  1) Amazing Cats (amazing_cats_video_id) [#cat #animal]",
+        "No related videos for Video about nothing",
+        "Cannot show related videos: Video does not exist",
+    ]
+
+
+def test_precompute_related_uses_most_played(capfd):
+    player = VideoPlayer()
+    player.play_video("amazing_cats_video_id")
+    player.precompute_related(count=1)
+    assert list(player._related._neighbours) == ["amazing_cats_video_id"]
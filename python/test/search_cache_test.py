@@ -0,0 +1,105 @@
+from unittest import mock
+
+from src.video import Video
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+
+@mock.patch('builtins.input', lambda *args: 'No')
+def test_repeated_search_hits_cache(capfd):
+    player = VideoPlayer()
+    first = player.search_videos("cat")
+    second = player.search_videos("CAT")
+    capfd.readouterr()
+    assert first == second
+    assert player._search_cache.hits == 1
+    assert player._search_cache.misses == 1
+
+
+@mock.patch('builtins.input', lambda *args: 'No')
+def test_flag_only_invalidates_touched_results(capfd):
+    player = VideoPlayer()
+    player.search_videos("cat")
+    player.search_videos("dog")
+    player.search_videos_tag("#animal")
+    player.search_videos_tag("#google")
+    player.flag_video("amazing_cats_video_id")
+    assert set(player._search_cache.keys()) == {
+        ("title", "dog"), ("tag", "#google")}
+
+    results = player.search_videos("cat")
+    assert [video.video_id for video in results] == ["another_cat_video_id"]
+    player.allow_video("amazing_cats_video_id")
+    assert len(player.search_videos_tag("#ANIMAL")) == 3
+    capfd.readouterr()
+
+
+@mock.patch('builtins.input', lambda *args: 'No')
+def test_reload_library_clears_caches(capfd):
+    player = VideoPlayer()
+    player.create_playlist("my_playlist")
+    player.add_to_playlist("my_playlist", "amazing_cats_video_id")
+    player.add_to_playlist("my_playlist", "funny_dogs_video_id")
+    player.flag_video("funny_dogs_video_id")
+    player.play_video("amazing_cats_video_id")
+    player.search_videos("cat")
+    player.reload_library(VideoLibrary([Video("New Cats", "new_cats_id", [])]))
+    assert [video.video_id for video in player.search_videos("cat")] == [
+        "new_cats_id"]
+    player.show_playlist("my_playlist")
+    out, err = capfd.readouterr()
+    assert "Stopping video: Amazing Cats" in out
+    assert out.splitlines()[-1] == "No videos here yet"
+    assert player._flagged == {}
+
+
+@mock.patch('builtins.input', lambda *args: 'No')
+def test_reload_library_keeps_unchanged_searches(capfd):
+    library = VideoLibrary()
+    player = VideoPlayer(library)
+    player.search_videos("cat")
+    player.search_videos("dog")
+    player.search_videos_tag("#animal")
+    player.search_videos_tag("#google")
+    videos = [video for video in library.get_all_videos()
+              if video.video_id != "life_at_google_video_id"]
+    player.reload_library(VideoLibrary(
+        videos + [Video("Funny Dogs 2", "funny_dogs_2_id", ["#dog"])]))
+    cache = player._search_cache
+    assert ("title", "cat") in cache
+    assert ("tag", "#animal") in cache
+    assert ("title", "dog") not in cache
+    assert ("tag", "#google") not in cache
+    assert [video.video_id for video in player.search_videos("dog")] == [
+        "funny_dogs_video_id", "funny_dogs_2_id"]
+    assert player.search_videos_tag("#google") == []
+    capfd.readouterr()
+
+
+def test_show_cache_stats(capfd):
+    player = VideoPlayer()
+    player.show_all_videos()
+    player.show_all_videos()
+    player.show_cache_stats()
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert "Showing cache statistics:" in lines[12]
+    assert "Search results: 0 entries, 0 hits, 0 misses, 0.0% hit rate" \
+        in lines[13]
+    assert "Video rows: 5 entries, 5 hits, 5 misses, 50.0% hit rate" \
+        in lines[14]
+
+
+def test_reload_library_drops_rows_of_changed_videos(capfd):
+    library = VideoLibrary()
+    player = VideoPlayer(library)
+    player.show_all_videos()
+    videos = [Video("Renamed Cats", video.video_id, video.tags)
+              if video.video_id == "amazing_cats_video_id" else video
+              for video in library.get_all_videos()]
+    player.reload_library(VideoLibrary(videos))
+    capfd.readouterr()
+    player.show_all_videos()
+    out, err = capfd.readouterr()
+    assert "Renamed Cats (amazing_cats_video_id) [#cat #animal]" in out
+    assert "Amazing Cats" not in out
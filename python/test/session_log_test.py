@@ -0,0 +1,41 @@
+import itertools
+
+from src.command_parser import CommandParser
+from src.command_pipeline import CommandPipeline
+from src.session_log import SessionRecorder, read_session
+from src.video_player import VideoPlayer
+
+
+def test_parser_records_commands(tmp_path, capfd):
+    path = str(tmp_path / "session.log")
+    times = itertools.count(100.0, 0.5)
+    recorder = SessionRecorder(path, clock=lambda: next(times))
+    parser = CommandParser(VideoPlayer(), recorder=recorder)
+    parser.execute_command(["PLAY", "amazing_cats_video_id"])
+    parser.execute_command(["FLAG_VIDEO", "funny_dogs_video_id", "bad"])
+    recorder.close()
+    assert read_session(path) == [
+        (0.5, ["PLAY", "amazing_cats_video_id"]),
+        (1.0, ["FLAG_VIDEO", "funny_dogs_video_id", "bad"]),
+    ]
+
+
+def test_pipeline_records_commands(tmp_path, capfd):
+    path = str(tmp_path / "session.log")
+    recorder = SessionRecorder(path)
+    CommandPipeline(recorder=recorder).run(
+        ["1 NUMBER_OF_VIDEOS\n", "2 SEARCH_VIDEOS cat\n",
+         "3 PLAY_RESULT 2 1\n"])
+    recorder.close()
+    session = read_session(path)
+    assert sorted(command for offset, command in session) == [
+        ["NUMBER_OF_VIDEOS"], ["SEARCH_VIDEOS", "cat"]]
+    assert all(offset >= 0 for offset, command in session)
+
+
+def test_recorded_commands_are_readable_before_close(tmp_path):
+    path = str(tmp_path / "session.log")
+    recorder = SessionRecorder(path, clock=lambda: 0.0)
+    recorder.record(["NUMBER_OF_VIDEOS"])
+    assert read_session(path) == [(0.0, ["NUMBER_OF_VIDEOS"])]
+    recorder.close()
@@ -0,0 +1,78 @@
+import multiprocessing
+
+from src.shared_catalogue import SharedVideoLibrary, attach, publish
+from src.video import Video
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+
+def _count_videos(name, queue):
+    catalogue = attach(name=name)
+    queue.put(len(SharedVideoLibrary(catalogue).get_all_videos()))
+    catalogue.close()
+
+
+def test_publish_to_file_and_attach(tmp_path):
+    path = tmp_path / "catalogue.bin"
+    publish(VideoLibrary(), path=path).close()
+    catalogue = attach(path=path)
+    library = SharedVideoLibrary(catalogue)
+
+    assert len(library.get_all_videos()) == 5
+    video = library.get_video("amazing_cats_video_id")
+    assert video.title == "Amazing Cats"
+    assert video.title_key == "amazing cats"
+    assert library.get_video("nothing_video_id").title_key == \
+        "video about nothing"
+    assert video.tags == ("#cat", "#animal")
+    assert video.popularity == 1.0
+    assert library.get_video("missing") is None
+    assert library.get_video("nothing_video_id").tags == ()
+    assert [video.video_id for video in library.get_videos_with_tag("#CAT")] \
+        == ["amazing_cats_video_id", "another_cat_video_id"]
+    assert library.get_videos_with_tag("#missing") == []
+    del video
+    catalogue.close()
+
+
+def test_publish_to_shared_memory_for_other_process():
+    library = VideoLibrary([Video("Title", f"id_{index}", ["#tag"])
+                            for index in range(100)])
+    catalogue = publish(library)
+    try:
+        queue = multiprocessing.Queue()
+        worker = multiprocessing.Process(
+            target=_count_videos, args=(catalogue._owner.name, queue))
+        worker.start()
+        worker.join()
+        assert queue.get(timeout=5) == 100
+    finally:
+        catalogue.close()
+        catalogue.unlink()
+
+
+def test_player_over_shared_library(tmp_path, capfd):
+    path = tmp_path / "catalogue.bin"
+    publish(VideoLibrary(), path=path).close()
+    player = VideoPlayer(SharedVideoLibrary(attach(path=path)))
+    player.play_video("funny_dogs_video_id")
+    player.flag_video("funny_dogs_video_id", "dont_like_dogs")
+    player.show_playing()
+    out, err = capfd.readouterr()
+    assert out.splitlines() == [
+        "Playing video: Funny Dogs",
+        "Stopping video: Funny Dogs",
+        "Successfully flagged video: Funny Dogs (reason: dont_like_dogs)",
+        "No video is currently playing",
+    ]
+
+
+def test_title_keys_are_published(tmp_path):
+    path = tmp_path / "catalogue.bin"
+    publish(VideoLibrary([Video("already folded", "a_id", []),
+                          Video("Straße", "b_id", [])]), path=path).close()
+    catalogue = attach(path=path)
+    library = SharedVideoLibrary(catalogue)
+    assert library.get_video("a_id").title_key == "already folded"
+    assert library.get_video("b_id").title_key == "strasse"
+    catalogue.close()
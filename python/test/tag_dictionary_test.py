@@ -0,0 +1,35 @@
+from src.tag_dictionary import TagDictionary
+from src.video import Video
+from src.video_library import VideoLibrary
+
+
+def test_tags_are_stored_once():
+    tags = TagDictionary()
+    first = tags.add("#animal")
+    assert tags.add("".join(["#ani", "mal"])) == first
+    assert len(tags) == 1
+    assert tags.decode(tags.encode(["#animal", "#cat"])) == ("#animal", "#cat")
+
+
+def test_tags_differing_in_case_share_a_group():
+    tags = TagDictionary()
+    lower = tags.add("#cat")
+    upper = tags.add("#CAT")
+    assert lower != upper
+    assert tags.group(lower) == tags.group(upper) == tags.find_group("#Cat")
+    assert tags.find_group("#dog") is None
+    assert tags.key(lower) == tags.key(upper) == "#cat"
+
+
+def test_video_tags_round_trip():
+    video = Video("Title", "video_id", ["#One", "#two"])
+    assert video.tags == ("#One", "#two")
+    assert len(video.tag_ids) == 2
+    assert Video("Title", "video_id", []).tags == ()
+
+
+def test_library_tag_index():
+    library = VideoLibrary()
+    assert [video.video_id for video in library.get_videos_with_tag("#CAT")] \
+        == ["amazing_cats_video_id", "another_cat_video_id"]
+    assert library.get_videos_with_tag("#nothing") == []
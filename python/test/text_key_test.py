@@ -0,0 +1,56 @@
+from unittest import mock
+
+from src.command_parser import CommandParser
+from src.text_key import fold
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+
+def test_fold():
+    assert fold("Amazing Cats") == "amazing cats"
+    assert fold("Straße") == fold("STRASSE") == "strasse"
+    assert fold("ＣＡＴＳ") == "cats"
+    assert fold("ǅemal") == fold("DŽEMAL")
+    # Composed and decomposed accents get the same key.
+    assert fold("Café") == fold("Café") == "café"
+
+
+def _player(tmp_path):
+    path = tmp_path / "videos.txt"
+    path.write_text(
+        "Die Straße | strasse | #Straße\n"
+        "ＣＡＴＳ in Tokyo | cats | #ねこ\n"
+        "Ordinary | ordinary | #STRASSE\n", encoding="utf-8")
+    return VideoPlayer(VideoLibrary(str(path)))
+
+
+def test_search_compares_folded_keys(tmp_path, capfd):
+    player = _player(tmp_path)
+    with mock.patch('builtins.input', lambda _: "no"):
+        assert [video.video_id for video in player.search_videos(
+            "STRASSE")] == ["strasse"]
+        assert [video.video_id for video in player.search_videos(
+            "cats")] == ["cats"]
+        assert [video.video_id for video in player.search_videos_tag(
+            "#strasse")] == ["strasse", "ordinary"]
+    assert player.suggest("die str") == [("Die Straße", "title")]
+
+
+def test_playlist_names_compare_folded_keys(tmp_path, capfd):
+    parser = CommandParser(_player(tmp_path))
+    parser.execute_command(["CREATE_PLAYLIST", "Straße"])
+    parser.execute_command(["CREATE_PLAYLIST", "STRASSE"])
+    parser.execute_command(["ADD_TO_PLAYLIST", "strasse", "cats"])
+    parser.execute_command(["DELETE_PLAYLIST", "STRAßE"])
+    parser.execute_command(["UNDO"])
+    parser.execute_command(["SHOW_PLAYLIST", "strasse"])
+    out, err = capfd.readouterr()
+    assert out.splitlines() == [
+        "Successfully created new playlist: Straße",
+        "Cannot create playlist: A playlist with the same name already exists",
+        "Added video to strasse: ＣＡＴＳ in Tokyo",
+        "Deleted playlist: STRAßE",
+        "Undid: DELETE_PLAYLIST Straße",
+        "Showing playlist: strasse",
+        "  ＣＡＴＳ in Tokyo (cats) [#ねこ]",
+    ]
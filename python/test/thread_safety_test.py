@@ -0,0 +1,68 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from src.video import Video
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+
+def _library(size):
+    return VideoLibrary([Video(f"Video {index}", f"video_{index}",
+                               ["#even" if index % 2 == 0 else "#odd"])
+                         for index in range(size)])
+
+
+def test_concurrent_playlist_adds(capfd):
+    player = VideoPlayer(_library(400), thread_safe=True)
+    player.create_playlist("shared")
+
+    def add_videos(start):
+        for index in range(start, 400, 8):
+            player.add_to_playlist("shared", f"video_{index}")
+
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(add_videos, range(8)))
+    capfd.readouterr()
+    assert len(player._playlists["shared"]._videos) == 400
+
+
+@mock.patch('builtins.input', lambda *args: 'No')
+def test_concurrent_searches_and_flags(capfd):
+    player = VideoPlayer(_library(200), thread_safe=True)
+
+    def flag_and_allow(start):
+        for index in range(start, 200, 4):
+            player.flag_video(f"video_{index}")
+            player.search_videos_tag("#even")
+            player.search_videos("video 1")
+            player.play_random_video("#odd")
+        for index in range(start, 200, 8):
+            player.allow_video(f"video_{index}")
+
+    with ThreadPoolExecutor(4) as executor:
+        list(executor.map(flag_and_allow, range(4)))
+    capfd.readouterr()
+    assert len(player._flagged) == 100
+    expected = [f"video_{index}" for index in range(200)
+                if index % 2 == 0 and f"video_{index}" not in player._flagged]
+    assert [video.video_id for video in
+            player.search_videos_tag("#even")] == expected
+    assert player._current_video is None or \
+        player._current_video.video_id not in player._flagged
+    capfd.readouterr()
+
+
+def test_flag_copy_on_write():
+    player = VideoPlayer(thread_safe=True)
+    snapshot = player._flagged
+    player.flag_video("amazing_cats_video_id")
+    assert snapshot == {}
+    assert "amazing_cats_video_id" in player._flagged
+
+
+def test_concurrent_first_suggestions():
+    player = VideoPlayer(_library(2000), thread_safe=True)
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(
+            lambda _: player.suggest("#", 2), range(16)))
+    assert results == [[("#even", "tag"), ("#odd", "tag")]] * 16
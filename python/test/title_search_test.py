@@ -0,0 +1,64 @@
+from unittest import mock
+
+import pytest
+
+from src.command_parser import CommandException, CommandParser
+from src.title_search import TitleSearch, _decode, _encode, stem, tokenize
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+
+def test_tokenize_and_stem():
+    assert tokenize("Playing with PUPPIES, running-cats!") == [
+        "play", "with", "puppy", "run", "cat"]
+    assert [stem(word) for word in ("class", "games", "boxes", "is")] == [
+        "class", "game", "box", "is"]
+
+
+def test_varint_postings_round_trip():
+    data = bytearray()
+    _encode([0, 1, 127, 128, 300, 2 ** 35], data)
+    assert len(data) == 1 + 1 + 1 + 2 + 2 + 6
+    assert list(_decode(data)) == [0, 1, 127, 128, 300, 2 ** 35]
+
+
+def test_bm25_ranks_rare_and_repeated_words_first(tmp_path):
+    path = tmp_path / "videos.txt"
+    path.write_text(
+        "Cat | one | #animal\n"
+        "Cat Cat Cat | two | #animal\n"
+        "A Very Long Title About A Cat | three | #animal\n"
+        "Dog | four | #animal\n"
+        "Rare Dog | five | #animal\n")
+    search = TitleSearch(VideoLibrary(str(path)))
+    ranked = [video.video_id for video, score in search.search("cats")]
+    assert ranked == ["two", "one", "three"]
+    ranked = search.search("rare dog", count=2)
+    assert [video.video_id for video, score in ranked] == ["five", "four"]
+    assert ranked[0][1] > ranked[1][1]
+    assert [video.video_id for video, score in search.search(
+        "cat", is_flagged=lambda video_id: video_id == "two")] == [
+            "one", "three"]
+    assert search.search("animal", count=2)[0][0].video_id == "one"
+    assert search.search("zebra") == []
+
+
+def test_search_ranked_command(capfd):
+    parser = CommandParser(VideoPlayer())
+    with mock.patch('builtins.input', lambda _: "2"):
+        parser.execute_command(["SEARCH_RANKED", "cats"])
+    parser.execute_command(["FLAG_VIDEO", "amazing_cats_video_id"])
+    capfd.readouterr()
+    with mock.patch('builtins.input', lambda _: "no"):
+        parser.execute_command(["SEARCH_RANKED", "cats"])
+        parser.execute_command(["SEARCH_RANKED", "zebra"])
+    out, err = capfd.readouterr()
+    assert out.splitlines() == [
+        "Here are the results for cats:",
+        "  1) Another Cat Video (another_cat_video_id) [#cat #animal]",
+        "Would you like to play any of the above? If yes, specify the number of the video.",
+        "If your answer is not a valid number, we will assume it's a no.",
+        "No search results for zebra",
+    ]
+    with pytest.raises(CommandException):
+        parser.execute_command(["SEARCH_RANKED"])
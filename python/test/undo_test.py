@@ -0,0 +1,154 @@
+from src.command_parser import CommandParser
+from src.player_output import RecordingRenderer
+from src.undo_log import UndoLog
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+
+def _playlist(player, name):
+    return list(player._playlists[name]._videos)
+
+
+def test_undo_and_redo_playlist_changes(capfd):
+    player = VideoPlayer()
+    player.create_playlist("my_PLAYlist")
+    player.add_to_playlist("my_playlist", "amazing_cats_video_id")
+    player.add_to_playlist("my_playlist", "funny_dogs_video_id")
+    capfd.readouterr()
+
+    player.undo()
+    assert _playlist(player, "my_playlist") == ["amazing_cats_video_id"]
+    player.undo()
+    player.undo()
+    assert "my_playlist" not in player._playlists
+    player.undo()
+    out, err = capfd.readouterr()
+    assert out.splitlines() == [
+        "Undid: ADD_TO_PLAYLIST my_PLAYlist funny_dogs_video_id",
+        "Undid: ADD_TO_PLAYLIST my_PLAYlist amazing_cats_video_id",
+        "Undid: CREATE_PLAYLIST my_PLAYlist",
+        "Cannot undo: Nothing to undo",
+    ]
+
+    player.redo()
+    player.redo()
+    assert _playlist(player, "my_playlist") == ["amazing_cats_video_id"]
+    player.show_all_playlists()
+    out, err = capfd.readouterr()
+    assert "  my_PLAYlist" in out
+
+
+def test_undo_remove_restores_position():
+    player = VideoPlayer(output=RecordingRenderer())
+    player.create_playlist("list")
+    video_ids = ["amazing_cats_video_id", "another_cat_video_id",
+                 "funny_dogs_video_id", "life_at_google_video_id"]
+    for video_id in video_ids:
+        player.add_to_playlist("list", video_id)
+    player.remove_from_playlist("list", "another_cat_video_id")
+    player.undo()
+    assert _playlist(player, "list") == video_ids
+    player.redo()
+    assert "another_cat_video_id" not in _playlist(player, "list")
+
+
+def test_undo_removes_in_any_order_restores_positions():
+    player = VideoPlayer(output=RecordingRenderer())
+    player.create_playlist("list")
+    video_ids = ["amazing_cats_video_id", "another_cat_video_id",
+                 "funny_dogs_video_id", "life_at_google_video_id"]
+    for video_id in video_ids:
+        player.add_to_playlist("list", video_id)
+    player.remove_from_playlist("list", "funny_dogs_video_id")
+    player.remove_from_playlist("list", "amazing_cats_video_id")
+    player.remove_from_playlist("list", "life_at_google_video_id")
+    player.undo()
+    player.undo()
+    assert _playlist(player, "list") == [
+        "amazing_cats_video_id", "another_cat_video_id",
+        "life_at_google_video_id"]
+    player.undo()
+    assert _playlist(player, "list") == video_ids
+
+
+def test_undo_clear_does_not_copy():
+    player = VideoPlayer(output=RecordingRenderer())
+    player.create_playlist("list")
+    player.add_to_playlist("list", "amazing_cats_video_id")
+    player.add_to_playlist("list", "funny_dogs_video_id")
+    videos = player._playlists["list"]._videos
+    player.clear_playlist("list")
+    assert _playlist(player, "list") == []
+    player.undo()
+    assert player._playlists["list"]._videos is videos
+    player.redo()
+    assert _playlist(player, "list") == []
+
+
+def test_undo_delete_and_flags(capfd):
+    player = VideoPlayer()
+    parser = CommandParser(player)
+    parser.execute_command(["CREATE_PLAYLIST", "list"])
+    parser.execute_command(["ADD_TO_PLAYLIST", "list", "funny_dogs_video_id"])
+    parser.execute_command(["DELETE_PLAYLIST", "list"])
+    parser.execute_command(["PLAY", "amazing_cats_video_id"])
+    parser.execute_command(["FLAG_VIDEO", "amazing_cats_video_id", "bad"])
+    parser.execute_command(["ALLOW_VIDEO", "amazing_cats_video_id"])
+    capfd.readouterr()
+
+    parser.execute_command(["UNDO"])
+    assert player._flagged == {"amazing_cats_video_id": "bad"}
+    parser.execute_command(["UNDO"])
+    assert player._flagged == {}
+    parser.execute_command(["UNDO"])
+    parser.execute_command(["SHOW_PLAYLIST", "list"])
+    out, err = capfd.readouterr()
+    assert out.splitlines() == [
+        "Undid: ALLOW_VIDEO amazing_cats_video_id",
+        "Undid: FLAG_VIDEO amazing_cats_video_id bad",
+        "Undid: DELETE_PLAYLIST list",
+        "Showing playlist: list",
+        "  Funny Dogs (funny_dogs_video_id) [#dog #animal]",
+    ]
+
+    parser.execute_command(["REDO"])
+    parser.execute_command(["REDO"])
+    assert player._flagged == {"amazing_cats_video_id": "bad"}
+    parser.execute_command(["CREATE_PLAYLIST", "other"])
+    parser.execute_command(["REDO"])
+    out, err = capfd.readouterr()
+    assert out.splitlines()[-1] == "Cannot redo: Nothing to redo"
+
+
+def test_undo_log_depth():
+    log = UndoLog(depth=2)
+    for change in range(5):
+        log.record(change)
+    assert len(log) == 2
+    assert log.pop_undo() == 4
+    assert log.pop_undo() == 3
+    assert log.pop_undo() == None
+    assert log.pop_redo() == 3
+    assert not UndoLog(depth=0).enabled
+
+
+def test_undo_after_reload_skips_removed_videos(capfd):
+    player = VideoPlayer()
+    player.flag_video("amazing_cats_video_id")
+    player.create_playlist("list")
+    player.add_to_playlist("list", "amazing_cats_video_id")
+    player.add_to_playlist("list", "funny_dogs_video_id")
+    player.clear_playlist("list")
+    library = VideoLibrary([video for video in player._video_library
+                            .get_all_videos()
+                            if video.video_id != "amazing_cats_video_id"])
+    player.reload_library(library)
+    for _ in range(5):
+        player.undo()
+    assert "list" not in player._playlists
+    for _ in range(5):
+        player.redo()
+    assert _playlist(player, "list") == []
+    player.undo()
+    assert _playlist(player, "list") == ["funny_dogs_video_id"]
+    assert player._flagged == {}
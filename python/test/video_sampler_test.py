@@ -0,0 +1,91 @@
+import random
+
+import pytest
+
+from src.command_parser import CommandParser
+from src.video import Video
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+from src.video_sampler import AliasTable, VideoSampler
+
+
+def test_alias_table_follows_weights():
+    table = AliasTable(["a", "b", "c"], [1, 2, 7])
+    rng = random.Random(42)
+    samples = [table.sample(rng) for _ in range(20000)]
+    assert abs(samples.count("a") / 20000 - 0.1) < 0.02
+    assert abs(samples.count("b") / 20000 - 0.2) < 0.02
+    assert abs(samples.count("c") / 20000 - 0.7) < 0.02
+
+
+def test_alias_table_empty():
+    assert AliasTable([]).sample() is None
+
+
+def test_sampler_skips_flagged_videos_with_tag():
+    flagged = {"amazing_cats_video_id"}
+    sampler = VideoSampler(VideoLibrary(), lambda video_id: video_id in flagged)
+    for _ in range(50):
+        video = sampler.sample("#CAT")
+        assert video.video_id == "another_cat_video_id"
+
+
+def test_flag_changes_keep_the_library_tables():
+    flagged = set()
+    library = VideoLibrary()
+    sampler = VideoSampler(library, lambda video_id: video_id in flagged)
+    rng = random.Random(1)
+    sampler.sample(rng=rng)
+    table = sampler._tables[(None, False)]
+    flagged.add("amazing_cats_video_id")
+    sampler.invalidate_video(library.get_video("amazing_cats_video_id"))
+    for _ in range(200):
+        assert sampler.sample(rng=rng).video_id != "amazing_cats_video_id"
+    assert sampler._tables[(None, False)] is table
+
+
+def test_sampler_falls_back_when_nearly_everything_is_flagged():
+    library = VideoLibrary()
+    flagged = set(video.video_id for video in library.get_all_videos())
+    flagged.discard("funny_dogs_video_id")
+    sampler = VideoSampler(library, lambda video_id: video_id in flagged)
+    rng = random.Random(2)
+    for _ in range(50):
+        assert sampler.sample(rng=rng).video_id == "funny_dogs_video_id"
+    flagged.add("funny_dogs_video_id")
+    sampler.invalidate_video(library.get_video("funny_dogs_video_id"))
+    assert sampler.sample(rng=rng) is None
+
+
+def test_negative_popularity_is_rejected():
+    with pytest.raises(ValueError):
+        Video("Bad", "bad_id", [], -1.0)
+    with pytest.raises(ValueError):
+        VideoLibrary([("Bad", "bad_id", [], float("nan"))])
+
+
+def test_play_random_with_tag(capfd):
+    player = VideoPlayer()
+    player.play_random_video("#dog")
+    out, err = capfd.readouterr()
+    assert out.splitlines() == ["Playing video: Funny Dogs"]
+
+
+def test_play_random_with_tag_after_flag_and_allow(capfd):
+    player = VideoPlayer()
+    player.flag_video("funny_dogs_video_id")
+    player.play_random_video("#dog")
+    player.allow_video("funny_dogs_video_id")
+    player.play_random_video("#dog", weighted=True)
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert len(lines) == 4
+    assert "No videos available" in lines[1]
+    assert "Playing video: Funny Dogs" in lines[3]
+
+
+def test_play_random_popular_command(capfd):
+    parser = CommandParser(VideoPlayer())
+    parser.execute_command(["PLAY_RANDOM_POPULAR", "#google"])
+    out, err = capfd.readouterr()
+    assert "Playing video: Life at Google" in out